@@ -0,0 +1,117 @@
+"""
+Compare the candidate-window deadline extractor with find_application_deadline.
+
+The extractors are compared on the labeled statements in
+fixtures/deadline_statements.json and on the descriptions in
+fixtures/descriptions.json. Texts labeled with one of INTENDED_DIVERGENCES must
+give different deadlines, all other texts identical deadlines. On synthetic
+descriptions the agreement rate is reported, together with a sample of the
+disagreements.
+
+Run from the job_radar directory: python -m benchmarks.bench_deadline_extraction
+"""
+import os
+import json
+import time
+from collections import Counter
+
+from deadline_extraction import DeadlineExtractor
+from rate_jobposts import find_application_deadline
+from benchmarks.synthetic_corpus import make_descriptions
+
+NUM_DESCRIPTIONS = 2_000
+FIXTURE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+INTENDED_DIVERGENCES = {
+    "every_deadline_word": "every deadline word is searched, not only the first",
+    "danish_words": "Danish deadline words and month names are recognized",
+    "optional_window": "a deadline word needs no 60 characters after it",
+    "numeric_dates": "numeric dates are parsed - the old extractor strips their "
+    "punctuation",
+}
+# the diverging descriptions of fixtures/descriptions.json, by index
+DESCRIPTION_DIVERGENCES = {
+    1: "numeric_dates",
+    4: "numeric_dates",
+    9: "numeric_dates",
+}
+
+
+def compare_with_reference(labeled_texts) -> Counter:
+    """Assert that each text gives the same deadline with both extractors,
+    unless labeled with an intended divergence. Returns the count per label."""
+    counts = Counter()
+    for text, divergence in labeled_texts:
+        reference = find_application_deadline(text)
+        deadline = DeadlineExtractor().extract(text)
+        if divergence is None:
+            assert deadline == reference, (text, reference, deadline)
+        else:
+            assert divergence in INTENDED_DIVERGENCES, divergence
+            assert deadline != reference, (divergence, text, deadline)
+        counts[divergence] += 1
+    return counts
+
+
+def main():
+    with open(
+        os.path.join(FIXTURE_DIRECTORY, "deadline_statements.json"), encoding="utf-8"
+    ) as f:
+        statements = json.load(f)
+    with open(
+        os.path.join(FIXTURE_DIRECTORY, "descriptions.json"), encoding="utf-8"
+    ) as f:
+        fixture_descriptions = json.load(f)
+
+    counts = compare_with_reference(
+        [(statement["text"], statement["divergence"]) for statement in statements]
+    )
+    counts += compare_with_reference(
+        [
+            (text, DESCRIPTION_DIVERGENCES.get(idx))
+            for idx, text in enumerate(fixture_descriptions)
+        ]
+    )
+    print(f"fixture texts:         {sum(counts.values())}")
+    print(f"identical:             {counts[None]}")
+    for divergence, description in INTENDED_DIVERGENCES.items():
+        print(f"{divergence + ':':<22} {counts[divergence]} - {description}")
+
+    descriptions = make_descriptions(NUM_DESCRIPTIONS)
+
+    start_time = time.perf_counter()
+    reference_deadlines = [find_application_deadline(text) for text in descriptions]
+    reference_time = time.perf_counter() - start_time
+
+    extractor = DeadlineExtractor()
+    start_time = time.perf_counter()
+    deadlines = [extractor.extract(text) for text in descriptions]
+    extraction_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    [extractor.extract(text) for text in descriptions]
+    memoized_time = time.perf_counter() - start_time
+
+    disagreements = [
+        (text, reference, deadline)
+        for text, reference, deadline in zip(
+            descriptions, reference_deadlines, deadlines
+        )
+        if reference != deadline
+    ]
+
+    print(f"descriptions:          {NUM_DESCRIPTIONS}")
+    print(f"datefinder:            {reference_time:.3f} s")
+    print(f"candidate windows:     {extraction_time:.3f} s")
+    print(f"memoized:              {memoized_time:.3f} s")
+    print(f"speed-up:              {reference_time / extraction_time:.1f}x")
+    print(
+        f"agreement:             "
+        f"{1 - len(disagreements) / NUM_DESCRIPTIONS:.1%} of descriptions"
+    )
+    for text, reference, deadline in disagreements[:5]:
+        print(f"\n{reference} -> {deadline}\n{text[:300]}")
+
+
+if __name__ == "__main__":
+    main()
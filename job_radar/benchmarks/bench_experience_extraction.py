@@ -0,0 +1,94 @@
+"""
+Compare the regex based years-of-experience extractor with the former NLTK
+sentence tokenization path, for accuracy on the labeled statements in
+fixtures/experience_statements.json and for speed on synthetic descriptions.
+The regex extractor must find the labeled range of every statement.
+
+Run from the job_radar directory: python -m benchmarks.bench_experience_extraction
+"""
+import os
+import re
+import json
+import time
+
+from nltk.tokenize import sent_tokenize
+
+from experience_extraction import extract_years_of_experience
+from benchmarks.synthetic_corpus import make_descriptions
+
+NUM_DESCRIPTIONS = 10_000
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "fixtures",
+    "experience_statements.json",
+)
+
+
+def find_year_of_experience_nltk(text):
+    # the former implementation in calc_competence_score
+    sentences = sent_tokenize(text)
+    years_of_experience = 0
+    for sentence in sentences:
+        if "experience" in sentence.lower() and "years" in sentence.lower():
+            try:
+                years_of_experience = int(re.findall(r"\b\d+\b", sentence)[0])
+            except Exception:
+                try:
+                    if re.findall(r"couple of years", sentence)[0]:
+                        years_of_experience = 2
+                except Exception:
+                    pass
+
+    if years_of_experience >= 10:
+        years_of_experience = 0
+
+    return years_of_experience
+
+
+def find_year_of_experience_regex(text):
+    required_experience = extract_years_of_experience(text)
+    return required_experience.min_years if required_experience else 0
+
+
+def main():
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        statements = json.load(f)
+
+    for name, find_years in [
+        ("nltk", find_year_of_experience_nltk),
+        ("regex", find_year_of_experience_regex),
+    ]:
+        num_correct = sum(
+            find_years(statement["text"]) == (statement["min_years"] or 0)
+            for statement in statements
+        )
+        print(f"{name:6s} correct minimum:  {num_correct} / {len(statements)}")
+
+    num_correct_ranges = 0
+    for statement in statements:
+        required_experience = extract_years_of_experience(statement["text"])
+        expected = (statement["min_years"], statement["max_years"])
+        found = tuple(required_experience) if required_experience else (None, None)
+        num_correct_ranges += found == expected
+    print(f"regex  correct ranges:   {num_correct_ranges} / {len(statements)}")
+    assert num_correct_ranges == len(statements), "regex ranges differ from labels"
+
+    descriptions = make_descriptions(NUM_DESCRIPTIONS)
+    sent_tokenize("Load the tokenizer. Before timing.")
+
+    start_time = time.perf_counter()
+    [find_year_of_experience_nltk(text) for text in descriptions]
+    nltk_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    [extract_years_of_experience(text) for text in descriptions]
+    regex_time = time.perf_counter() - start_time
+
+    print(f"descriptions:           {NUM_DESCRIPTIONS}")
+    print(f"nltk:                   {nltk_time:.3f} s")
+    print(f"regex:                  {regex_time:.3f} s")
+    print(f"speed-up:               {nltk_time / regex_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
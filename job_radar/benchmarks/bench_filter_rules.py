@@ -0,0 +1,70 @@
+"""
+Filter the titles of 10k synthetic listed job posts with the example rules of
+config/filter_rules.example.json - one card at a time and a result page at a
+time - and the attributes of the synthetic job posts in one batch, and verify
+that both ways of title filtering agree.
+
+Run from the job_radar directory: python -m benchmarks.bench_filter_rules
+"""
+import os
+import time
+import random
+
+from filter_rules import FilterRuleEngine, load_filter_rules
+from search_result_loader import PAGE_SIZE
+from benchmarks.synthetic_corpus import make_jobpost_dataframe
+
+NUM_JOBPOSTS = 10_000
+RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "config",
+    "filter_rules.example.json",
+)
+
+
+def make_titles(num_titles: int, seed: int = 0):
+    rng = random.Random(seed)
+    roles = ["Data Scientist", "ML Engineer", "Data Analyst", "Developer", "Nurse"]
+    prefixes = ["", "", "", "Senior ", "Junior ", "Lead "]
+    suffixes = ["", "", " (Internship)", " - Copenhagen"]
+    return [
+        rng.choice(prefixes) + rng.choice(roles) + rng.choice(suffixes)
+        for _ in range(num_titles)
+    ]
+
+
+def main():
+    rules = load_filter_rules(RULES_PATH)
+    titles = make_titles(NUM_JOBPOSTS)
+
+    engine = FilterRuleEngine.from_rules(rules)
+    start_time = time.perf_counter()
+    per_card = [engine.filter_titles([title], 0)[0] for title in titles]
+    per_card_time = time.perf_counter() - start_time
+
+    engine = FilterRuleEngine.from_rules(rules)
+    start_time = time.perf_counter()
+    per_page = []
+    for start in range(0, len(titles), PAGE_SIZE):
+        per_page += engine.filter_titles(titles[start : start + PAGE_SIZE], 0).tolist()
+    per_page_time = time.perf_counter() - start_time
+
+    assert per_card == per_page
+
+    df = make_jobpost_dataframe(NUM_JOBPOSTS)
+    start_time = time.perf_counter()
+    is_relevant = engine.filter_attributes(df)
+    attribute_time = time.perf_counter() - start_time
+
+    print(f"titles:                {NUM_JOBPOSTS}")
+    print(f"per card:              {per_card_time:.3f} s")
+    print(f"per page ({PAGE_SIZE}):         {per_page_time:.3f} s")
+    print(f"speed-up:              {per_card_time / per_page_time:.1f}x")
+    print(f"relevant titles:       {sum(per_page)}")
+    print(f"attributes in batch:   {attribute_time:.3f} s")
+    print(f"relevant job posts:    {int(is_relevant.sum())}")
+    engine.log_statistics()
+
+
+if __name__ == "__main__":
+    main()
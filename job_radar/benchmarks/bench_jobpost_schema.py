@@ -0,0 +1,46 @@
+"""
+Report the memory used by a synthetic corpus of job posts, once as read from
+Google Sheets - every column held as Python objects - and once with the typed
+job post columns of apply_jobpost_dtypes.
+
+Run from the job_radar directory: python -m benchmarks.bench_jobpost_schema
+"""
+import time
+
+from jobpost_schema import apply_jobpost_dtypes
+from benchmarks.synthetic_corpus import make_jobpost_dataframe
+
+NUM_ROWS = 100_000
+
+
+def main():
+    df_untyped = make_jobpost_dataframe(NUM_ROWS).astype(object)
+
+    start_time = time.perf_counter()
+    df_typed = apply_jobpost_dtypes(df_untyped)
+    typing_time = time.perf_counter() - start_time
+
+    memory_untyped = df_untyped.memory_usage(deep=True, index=False)
+    memory_typed = df_typed.memory_usage(deep=True, index=False)
+
+    print(f"{'column':18s} {'dtype':16s} {'untyped MB':>11s} {'typed MB':>9s}")
+    for column in df_untyped.columns:
+        print(
+            f"{column:18s} {str(df_typed[column].dtype):16s} "
+            f"{memory_untyped[column] / 1e6:11.2f} {memory_typed[column] / 1e6:9.2f}"
+        )
+    print(
+        f"{'total':35s}"
+        f"{memory_untyped.sum() / 1e6:11.2f} {memory_typed.sum() / 1e6:9.2f}"
+    )
+    typed_columns = [column for column in df_untyped.columns if column != "description"]
+    print(
+        f"{'total w/o description':35s}"
+        f"{memory_untyped[typed_columns].sum() / 1e6:11.2f} "
+        f"{memory_typed[typed_columns].sum() / 1e6:9.2f}"
+    )
+    print(f"\ntyping {NUM_ROWS} rows took {typing_time:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare the batch keyword scorer with keyword-by-keyword scoring of each
+description on 10k synthetic descriptions, and verify that the general and
+competence scores are identical.
+
+Run from the job_radar directory: python -m benchmarks.bench_keyword_scoring
+"""
+import time
+
+from config.score_markers import score_markers
+from keyword_scoring import KeywordScorer
+from rate_jobposts import batch_keyword_scoring, find_years_of_experience
+from benchmarks.synthetic_corpus import make_descriptions
+
+NUM_DESCRIPTIONS = 10_000
+
+
+def score_one_by_one(descriptions):
+    scores = []
+    for text in descriptions:
+        general_score, competence_score = 0, 0
+        for key, score in score_markers[0].items():
+            if key in text:
+                general_score += score
+        for key, score in score_markers[1].items():
+            if key in text:
+                competence_score += score
+        scores.append((general_score, competence_score))
+    return scores
+
+
+def main():
+    descriptions = make_descriptions(NUM_DESCRIPTIONS)
+
+    start_time = time.perf_counter()
+    reference_scores = score_one_by_one(descriptions)
+    reference_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    scorer = KeywordScorer([score_markers[0], score_markers[1]])
+    compile_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    group_scores, _ = scorer.score(descriptions)
+    batch_time = time.perf_counter() - start_time
+
+    assert [tuple(scores) for scores in group_scores.tolist()] == reference_scores
+
+    # the complete general and competence score components must match as well
+    # - without the automaton, rating scores one description at a time instead
+    keyword_score_list = batch_keyword_scoring(descriptions)
+    for (general_score, competence_score), keyword_scores, text in zip(
+        reference_scores, keyword_score_list, descriptions
+    ):
+        if scorer.automaton is None:
+            assert keyword_scores is None
+            continue
+        num_years_exp = find_years_of_experience(text)
+        assert keyword_scores["General Score"]["score"] == general_score * 3
+        assert keyword_scores["Competence Score"]["score"] == (
+            (competence_score - 10 * num_years_exp) * 2
+        )
+
+    engine = "automaton" if scorer.automaton is not None else "search"
+    print(f"descriptions:          {NUM_DESCRIPTIONS}")
+    print(f"one by one:            {reference_time:.3f} s")
+    print(f"batch ({engine}):  {batch_time:.3f} s (compile {compile_time:.3f} s)")
+    print(f"speed-up:              {reference_time / batch_time:.1f}x")
+    print("scores identical:      yes")
+    if scorer.automaton is None:
+        print("rating:                one by one - pyahocorasick is not installed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Deliver cool job notifications through the outbox to a local SMTP server and
+check delivery, backoff and de-duplication - without sending real emails.
+
+The server is a minimal SMTP sink from the standard library, listening on
+localhost and able to reject messages, so the check needs neither aiosmtpd nor
+a mail account. The outbox first fails to reach the server, then has a digest
+rejected, and finally delivers every notification exactly once.
+
+Run from the job_radar directory: python -m benchmarks.bench_notification_outbox
+"""
+import os
+import re
+import time
+import email
+import threading
+import socketserver
+
+from local_storage import get_local_storage_path
+from notification_outbox import NotificationOutbox
+
+OUTBOX_FILE_NAME = "bench_notification_outbox.sqlite"
+MAX_JOBS_PER_DIGEST = 10
+BACKOFF_BASE = 0.5
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib to send messages."""
+
+    def _reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if line in (b".\r\n", b""):
+                return b"".join(lines)
+            # undo the dot-stuffing of lines starting with a dot
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+    def handle(self):
+        self._reply("220 localhost SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self._reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                message = email.message_from_bytes(self._read_data())
+                if self.server.accept(message):
+                    self._reply("250 OK")
+                else:
+                    self._reply("451 Try again later")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Collects the received messages - rejecting the next num_rejections."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("localhost", 0), SmtpSinkHandler, bind_and_activate=False)
+        self.server_bind()
+        self.port = self.server_address[1]
+        self.messages = []
+        self.num_rejections = 0
+        self._lock = threading.Lock()
+        self._is_serving = False
+
+    def accept(self, message) -> bool:
+        with self._lock:
+            if self.num_rejections:
+                self.num_rejections -= 1
+                return False
+            self.messages.append(message)
+            return True
+
+    def start(self):
+        self.server_activate()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self._is_serving = True
+
+    def stop(self):
+        if self._is_serving:
+            self.shutdown()
+        self.server_close()
+
+
+def delivered_job_ids(messages) -> list:
+    job_ids = []
+    for message in messages:
+        body = message.get_payload()[0].get_payload()
+        job_ids += re.findall(r"\('(job_\d+)',", body)
+    return job_ids
+
+
+def main():
+    outbox_path = get_local_storage_path(OUTBOX_FILE_NAME)
+    if os.path.exists(outbox_path):
+        os.remove(outbox_path)
+
+    sink = SmtpSink()
+    outbox = NotificationOutbox(
+        file_name=OUTBOX_FILE_NAME,
+        email_config={
+            "email": "job_radar@localhost",
+            "smtp_host": "localhost",
+            "smtp_port": sink.port,
+            "starttls": False,
+        },
+        max_jobs_per_digest=MAX_JOBS_PER_DIGEST,
+        send_interval=0.1,
+        backoff_base=BACKOFF_BASE,
+    )
+    try:
+        cool_jobs = [(f"job_{idx}", f"Data Scientist {idx}") for idx in range(30)]
+        outbox.enqueue(cool_jobs[:25])
+        outbox.enqueue(cool_jobs[:10] + cool_jobs[25:])
+        assert len(outbox.get_pending_jobs()) == 30, "enqueued twice"
+
+        # the server is not listening yet - nothing is delivered, and nothing
+        # is due again before the backoff has passed
+        assert outbox.deliver_due() == 0
+        assert outbox.num_failed_attempts == 1
+        assert outbox.deliver_due() == 0
+        assert outbox.num_failed_attempts == 1, "retried before the backoff"
+
+        # the server rejects the first digest
+        sink.start()
+        sink.num_rejections = 1
+        time.sleep(BACKOFF_BASE)
+        start_time = time.perf_counter()
+        num_delivered = outbox.deliver_due()
+        delivery_time = time.perf_counter() - start_time
+        assert num_delivered == 20, num_delivered
+        assert outbox.num_failed_attempts == 2
+        assert len(sink.messages) == 2
+        assert outbox.deliver_due() == 0, "rejected digest retried before backoff"
+
+        # the backoff of the rejected digest doubles
+        time.sleep(2 * BACKOFF_BASE)
+        assert outbox.deliver_due() == 10
+        assert not outbox.get_pending_jobs()
+
+        # delivered notifications are never enqueued again
+        outbox.enqueue(cool_jobs)
+        assert outbox.deliver_due() == 0
+
+        # the background sender makes a last delivery attempt when stopped
+        outbox.start()
+        outbox.enqueue([("job_30", "ML Engineer")])
+        outbox.stop()
+        assert not outbox.get_pending_jobs()
+
+        job_ids = delivered_job_ids(sink.messages)
+        assert sorted(job_ids) == sorted(f"job_{idx}" for idx in range(31)), job_ids
+        assert all(
+            message["Subject"] == f"Cool jobs found: {MAX_JOBS_PER_DIGEST}"
+            for message in sink.messages[:3]
+        )
+    finally:
+        sink.stop()
+        os.remove(outbox_path)
+
+    print(f"notifications:         {len(job_ids)} delivered once")
+    print(f"digests:               {len(sink.messages)}")
+    print(f"failed attempts:       {outbox.num_failed_attempts}")
+    print(f"delivery of 2 digests: {delivery_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare the bytes, resources and time of loading LinkedIn pages in full and in
+lean mode, where images, fonts, media and trackers are blocked. Needs a GoLogin
+browser session.
+
+Run from the job_radar directory:
+
+    python -m benchmarks.bench_resource_blocking [url ...]
+
+Without urls, the first job search and the first job page listed by it are
+compared.
+"""
+import re
+import sys
+import logging
+
+from helper_classes import BrowserManager
+from resource_blocking import compare_page_loads
+from scrape_jobposts import make_job_search_url
+
+
+def main(urls):
+    logging.basicConfig(level=logging.INFO)
+    browser_manager = BrowserManager(is_lean=False)
+    browser_manager.start_browser_session()
+    try:
+        if not urls:
+            search_url = make_job_search_url(0, 0)
+            browser_manager.driver.get(search_url)
+            jobpage_urls = re.findall(
+                r'href="(https://[^"]*linkedin\.com/jobs/view/[^"]*)"',
+                browser_manager.driver.page_source,
+            )
+            urls = [search_url] + jobpage_urls[:1]
+
+        comparisons = compare_page_loads(browser_manager.resource_blocker, urls)
+    finally:
+        browser_manager.stop_browser_session()
+
+    print(f"{'kB saved':>9s} {'resources':>9s} {'s saved':>8s}  url")
+    for comparison in comparisons:
+        print(
+            f"{comparison['bytes_saved'] / 1e3:9.0f} "
+            f"{comparison['resources_saved']:9d} "
+            f"{comparison['seconds_saved']:8.2f}  {comparison['url'][:80]}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
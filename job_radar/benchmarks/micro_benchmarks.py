@@ -0,0 +1,256 @@
+"""
+Micro-benchmarks of the CPU-bound hot paths, run offline on the checked-in
+fixtures in benchmarks/fixtures and on synthetic job posts. The throughput of
+each function is reported in items (descriptions, html elements or rows) per
+second, as the best of several repeats.
+
+The html fixtures follow the markup of LinkedIn's public job pages, which the
+tag and class lists in config.scraping_paths target.
+
+Results can be saved and later compared against, failing if the throughput of
+any benchmark dropped by more than the tolerance:
+
+    python -m benchmarks.micro_benchmarks --save baseline.json
+    python -m benchmarks.micro_benchmarks --compare baseline.json --tolerance 0.2
+    python -m benchmarks.micro_benchmarks --filter deadline
+
+Run from the job_radar directory.
+"""
+import os
+import re
+import sys
+import json
+import timeit
+import argparse
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.synthetic_corpus import make_descriptions, make_jobpost_dataframe
+
+FIXTURE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# registered benchmarks: name -> setup function returning the function to time
+# and the number of items it processes per call
+BENCHMARKS: Dict[str, Callable[[], Tuple[Callable[[], object], int]]] = {}
+
+
+def benchmark(name: str):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+def read_fixture(file_name: str) -> str:
+    with open(os.path.join(FIXTURE_DIRECTORY, file_name), encoding="utf-8") as f:
+        return f.read()
+
+
+def load_descriptions(num_descriptions: int) -> List[str]:
+    """The checked-in descriptions, topped up with synthetic descriptions."""
+    descriptions = json.loads(read_fixture("descriptions.json"))
+    return descriptions + make_descriptions(num_descriptions - len(descriptions))
+
+
+def make_storage_frames(num_rows: int) -> Tuple:
+    """An existing and a new frame of job posts sharing half of their IDs."""
+    df_old = make_jobpost_dataframe(num_rows, seed=1)
+    df_new = make_jobpost_dataframe(num_rows, seed=2)
+    df_new.loc[: num_rows // 2, "id"] = df_old.loc[: num_rows // 2, "id"].to_numpy()
+    return df_old, df_new
+
+
+############################################################################
+# Rating
+############################################################################
+
+
+@benchmark("keyword_matching_scoring")
+def setup_keyword_matching_scoring():
+    from rate_jobposts import keyword_matching_scoring
+
+    df = make_jobpost_dataframe(200)
+    df["description"] = load_descriptions(200)
+    rows = [row for _, row in df.iterrows()]
+    return lambda: [keyword_matching_scoring(row, "Data") for row in rows], len(rows)
+
+
+@benchmark("batch_keyword_scoring")
+def setup_batch_keyword_scoring():
+    from rate_jobposts import batch_keyword_scoring
+
+    descriptions = load_descriptions(2_000)
+    return lambda: batch_keyword_scoring(descriptions), len(descriptions)
+
+
+@benchmark("find_application_deadline")
+def setup_find_application_deadline():
+    from rate_jobposts import find_application_deadline
+
+    descriptions = load_descriptions(200)
+    return (
+        lambda: [find_application_deadline(text) for text in descriptions],
+        len(descriptions),
+    )
+
+
+@benchmark("deadline_extractor")
+def setup_deadline_extractor():
+    from deadline_extraction import DeadlineExtractor
+
+    descriptions = load_descriptions(2_000)
+
+    def run():
+        # a new extractor per call, so the parsed date cache starts out empty
+        extractor = DeadlineExtractor()
+        return [extractor.extract(text) for text in descriptions]
+
+    return run, len(descriptions)
+
+
+############################################################################
+# Scraping
+############################################################################
+
+
+@benchmark("find_job_id")
+def setup_find_job_id():
+    from scrape_jobposts import JobElementHandler
+
+    card_html_list = re.findall(
+        r"<li>.*?</li>", read_fixture("jobposts_listed.html"), re.DOTALL
+    )
+    job_element_handler = JobElementHandler(None)
+    return (
+        lambda: [
+            job_element_handler.find_job_id(html, element_type="listed")
+            for html in card_html_list
+        ],
+        len(card_html_list),
+    )
+
+
+@benchmark("parse_job_attributes")
+def setup_parse_job_attributes():
+    from scrape_jobposts import parse_job_attributes
+
+    html_list = [read_fixture(f"jobpost_extended_{idx}.html") for idx in [1, 2, 3]]
+    return lambda: [parse_job_attributes(html) for html in html_list], len(html_list)
+
+
+############################################################################
+# Storage and organization of job posts
+############################################################################
+
+
+@benchmark("update_existing_dataframe")
+def setup_update_existing_dataframe():
+    from manage_jobposts import JobStorageManager
+
+    # skip the constructor, which connects to Google Sheets
+    job_storage_manager = JobStorageManager.__new__(JobStorageManager)
+    df_old, df_new = make_storage_frames(2_000)
+
+    # the frames are modified in place, so each call gets copies
+    return (
+        lambda: job_storage_manager.update_existing_dataframe(
+            df_old.copy(), df_new.copy()
+        ),
+        df_old.shape[0] + df_new.shape[0],
+    )
+
+
+@benchmark("determine_df_destination_indices")
+def setup_determine_df_destination_indices():
+    from manage_jobposts import JobPostOrganizer
+
+    job_post_organizer = JobPostOrganizer.__new__(JobPostOrganizer)
+    df = make_jobpost_dataframe(10_000)
+    return (
+        lambda: job_post_organizer.determine_df_destination_indices(df, 0),
+        df.shape[0],
+    )
+
+
+@benchmark("repartition_jobposts")
+def setup_repartition_jobposts():
+    from manage_jobposts import JobPostOrganizer
+
+    job_post_organizer = JobPostOrganizer.__new__(JobPostOrganizer)
+    df_all_domains_list = [
+        make_jobpost_dataframe(1_000, seed=seed) for seed in range(6)
+    ]
+    # repost some job posts in other domains
+    for domain_idx in range(1, 6):
+        df_all_domains_list[domain_idx].loc[:100, "id"] = (
+            df_all_domains_list[0].loc[:100, "id"].to_numpy()
+        )
+    return (
+        lambda: job_post_organizer.repartition_jobposts(df_all_domains_list),
+        sum(df.shape[0] for df in df_all_domains_list),
+    )
+
+
+def run_benchmarks(name_filter: str = "", repeat: int = 5) -> Dict[str, Dict]:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if name_filter not in name:
+            continue
+        func, num_items = setup()
+        func()  # warm up caches and lazy imports
+        best_time = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[name] = {
+            "items": num_items,
+            "seconds": best_time,
+            "items_per_second": num_items / best_time,
+        }
+        print(f"{name:35s} {num_items:7d} items  {num_items / best_time:12.0f} items/s")
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float
+) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["items_per_second"] / baseline[name]["items_per_second"]
+        if ratio < 1 - tolerance:
+            regressions.append(f"{name}: {ratio:.2f}x of baseline throughput")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the micro-benchmarks.")
+    parser.add_argument("--filter", default="", help="only run matching benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats per benchmark")
+    parser.add_argument("--save", help="save the results as json")
+    parser.add_argument("--compare", help="json results to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed throughput drop"
+    )
+    args = parser.parse_args(argv)
+
+    # the hot paths log per item, which would dominate the timings
+    logging.disable(logging.CRITICAL)
+    results = run_benchmarks(args.filter, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
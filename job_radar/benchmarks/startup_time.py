@@ -0,0 +1,67 @@
+"""
+Measure the import time of each job radar stage with python -X importtime.
+
+Every stage is imported in a fresh interpreter, the same way cli.py imports it,
+and the cumulative import time of the slowest top-level packages is reported.
+
+Run from the job_radar directory: python -m benchmarks.startup_time
+"""
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+STAGE_IMPORTS = {
+    "cli": "import cli",
+    "scrape": "from scrape_jobposts import scrape_and_store_new_jobposts",
+    "check-liveness / archive / reorganize": "import manage_jobposts",
+    "rate": "from rate_jobposts import rate_all_jobpost",
+    "notify": "from rate_jobposts import check_for_cool_jobs; import send_mail",
+    "all (main.py)": "import main",
+}
+
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def measure_import_time(statement: str):
+    """Return the total import time (s) and the cumulative import time (s) per
+    top-level package imported directly by the statement."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    package_times = defaultdict(float)
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        # only count the outermost imports - nested imports are included in them
+        if match and len(match.group(3)) == 1:
+            package = match.group(4).split(".")[0]
+            package_times[package] += int(match.group(2)) / 1e6
+    return sum(package_times.values()), package_times
+
+
+def main():
+    # imports done by any interpreter at startup are not part of a stage
+    _, startup_package_times = measure_import_time("pass")
+
+    for stage, statement in STAGE_IMPORTS.items():
+        try:
+            _, package_times = measure_import_time(statement)
+        except RuntimeError as e:
+            print(f"{stage:40s} failed: {e}")
+            continue
+        for package in startup_package_times:
+            package_times.pop(package, None)
+        total_time = sum(package_times.values())
+        slowest = sorted(package_times.items(), key=lambda x: x[1], reverse=True)[:5]
+        print(f"{stage:40s} {total_time:6.3f} s")
+        for package, package_time in slowest:
+            print(f"    {package:36s} {package_time:6.3f} s")
+
+
+if __name__ == "__main__":
+    main()
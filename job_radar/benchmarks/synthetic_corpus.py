@@ -0,0 +1,109 @@
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+import pandas as pd
+
+from config.score_markers import score_markers
+
+############################################################################
+# Synthetic job posts for offline benchmarks
+############################################################################
+"""
+Job post descriptions are assembled from the keywords of the score markers,
+filler sentences and the kinds of experience and deadline statements found in
+real job posts, so the benchmarks exercise the same code paths as live data.
+"""
+
+FILLER_SENTENCES = [
+    "You will join a cross-functional team working on our core products.",
+    "We offer a flexible workplace with a strong focus on learning.",
+    "The position is based in our Copenhagen office with hybrid options.",
+    "You thrive in a fast paced environment and take ownership of your work.",
+    "Vi tilbyder en spændende stilling i et uformelt og ambitiøst miljø.",
+    "Du får mulighed for at arbejde med nye teknologier og dygtige kollegaer.",
+    "Our customers range from small start-ups to global enterprises.",
+    "Collaboration and knowledge sharing are essential parts of our culture.",
+]
+
+EXPERIENCE_SENTENCES = [
+    "You have {n} years of experience with similar tasks.",
+    "We expect {n}-{m} years of relevant experience.",
+    "At least {n} years of professional experience is required.",
+    "You have a couple of years of experience from industry.",
+    "Du har {n} års erfaring med lignende opgaver.",
+    "Experience is an advantage but not a requirement.",
+]
+
+DEADLINE_SENTENCES = [
+    "Application deadline: {date:%d %B %Y}.",
+    "Deadline for applications is {date:%d.%m.%Y}.",
+    "Please apply as soon as possible and no later than {date:%B %d, %Y}.",
+    "Ansøgningsfrist: {date:%d-%m-%Y}.",
+    "We review applications on an ongoing basis.",
+    "The position starts on {date:%d %B %Y}.",
+]
+
+
+def make_descriptions(num_descriptions: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    keywords = list(score_markers[0]) + list(score_markers[1])
+    today = datetime.now()
+
+    descriptions = []
+    for _ in range(num_descriptions):
+        sentences = rng.sample(FILLER_SENTENCES, 4)
+        sentences += [
+            f"Experience with {' and '.join(rng.sample(keywords, 3))} is a plus."
+            for _ in range(rng.randint(1, 4))
+        ]
+        sentences.append(
+            rng.choice(EXPERIENCE_SENTENCES).format(
+                n=rng.randint(1, 6), m=rng.randint(6, 9)
+            )
+        )
+        sentences.append(
+            rng.choice(DEADLINE_SENTENCES).format(
+                date=today + timedelta(days=rng.randint(-20, 60))
+            )
+        )
+        rng.shuffle(sentences)
+        descriptions.append(" ".join(sentences * rng.randint(1, 3)))
+    return descriptions
+
+
+def make_jobpost_dataframe(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    today = datetime.now()
+    industries = list(score_markers[4]) or ["IT Services and IT Consulting"]
+    job_functions = list(score_markers[5]) or ["Engineering"]
+    seniority_levels = list(score_markers[6]) or ["Entry level"]
+
+    return pd.DataFrame(
+        {
+            "id": rng.sample(range(3_000_000_000, 4_000_000_000), num_rows),
+            "jobpost_title": [
+                rng.choice(["Data Scientist", "ML Engineer", "Analyst", "Developer"])
+                for _ in range(num_rows)
+            ],
+            "company": [f"Company {rng.randint(0, 2000)}" for _ in range(num_rows)],
+            "location": [
+                rng.choice(["Copenhagen", "Aarhus", "Odense", "Aalborg"])
+                for _ in range(num_rows)
+            ],
+            "date": [
+                (today - timedelta(days=rng.randint(0, 60))).strftime("%Y-%m-%d")
+                for _ in range(num_rows)
+            ],
+            "href": [
+                f"https://www.linkedin.com/jobs/view/{idx}" for idx in range(num_rows)
+            ],
+            "num_applicants": [rng.randint(0, 200) for _ in range(num_rows)],
+            "description": make_descriptions(num_rows, seed),
+            "Seniority level": [rng.choice(seniority_levels) for _ in range(num_rows)],
+            "Employment type": ["Full-time"] * num_rows,
+            "Job function": [rng.choice(job_functions) for _ in range(num_rows)],
+            "Industries": [rng.choice(industries) for _ in range(num_rows)],
+            "is_active": [1] * num_rows,
+        }
+    )
@@ -0,0 +1,229 @@
+import time
+import random
+import socket
+from typing import Dict, List, NamedTuple, Optional
+import logging
+
+import psutil
+
+from local_storage import get_local_storage_path, sqlite_transaction
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Browser profile and debugging port allocator
+############################################################################
+"""
+Concurrent browser sessions - e.g. of several scrape workers on one host - must
+neither share a GoLogin profile nor a remote debugging port. The allocator
+leases each session a profile and a free port, recorded in a SQLite file shared
+by the processes on the host, and tracks the health of each profile: the share
+of its page loads that were blocked, the share of its sessions that crashed and
+its mean page load time. The healthiest free profile is leased first.
+
+A lease is renewed whenever the session records a page load and expires after
+lease_duration seconds otherwise, so the profiles of crashed processes are
+freed again. The browser processes of an expired lease are terminated before
+its profile is leased anew.
+"""
+
+PORT_RANGE = (49152, 65535)
+
+
+class BrowserLease(NamedTuple):
+    profile_id: str
+    port: int
+
+
+def is_port_free(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
+
+
+def terminate_browser_processes(port: int):
+    """Terminate the browser processes started with the remote debugging port,
+    and their child processes - other browser sessions are left running."""
+    port_argument = f"--remote-debugging-port={port}"
+    for process in psutil.process_iter(["pid", "cmdline"]):
+        if port_argument not in (process.info["cmdline"] or []):
+            continue
+        try:
+            for child in process.children(recursive=True):
+                child.terminate()
+            process.terminate()
+            logger.info(f"Terminated browser process {process.pid} on port {port}")
+        except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+            logger.warning(f"Error terminating browser process {process.pid}: {e}")
+
+
+class BrowserProfileAllocator:
+    """Leases GoLogin profiles and debugging ports to browser sessions."""
+
+    def __init__(
+        self,
+        profile_id_list: Optional[List[str]] = None,
+        file_name: str = "browser_profiles.sqlite",
+        lease_duration: float = 3600.0,
+    ):
+        if profile_id_list is None:
+            from config.tokens import gologin_tokens
+
+            profile_id_list = gologin_tokens["profile_id_list"]
+        self.profile_id_list = list(profile_id_list)
+        self.file_path = get_local_storage_path(file_name)
+        self.lease_duration = lease_duration
+
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS profiles (
+                    profile_id TEXT PRIMARY KEY,
+                    owner TEXT,
+                    port INTEGER,
+                    lease_expires_at REAL,
+                    num_sessions INTEGER DEFAULT 0,
+                    num_crashes INTEGER DEFAULT 0,
+                    num_page_loads INTEGER DEFAULT 0,
+                    num_blocks INTEGER DEFAULT 0,
+                    page_load_seconds REAL DEFAULT 0,
+                    last_used REAL DEFAULT 0
+                )"""
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO profiles (profile_id) VALUES (?)",
+                [(profile_id,) for profile_id in self.profile_id_list],
+            )
+
+    def _find_free_port(self, leased_ports: set) -> int:
+        for _ in range(100):
+            port = random.randint(*PORT_RANGE)
+            if port not in leased_ports and is_port_free(port):
+                return port
+        raise RuntimeError("No free remote debugging port found")
+
+    def lease(self, owner: str, timeout: float = 600.0) -> BrowserLease:
+        """Lease the healthiest free profile and a free port - waiting up to
+        timeout seconds for a profile to be released."""
+        deadline = time.time() + timeout
+        while True:
+            lease = self._try_lease(owner)
+            if lease is not None:
+                return lease
+            if time.time() > deadline:
+                raise RuntimeError("No free browser profile")
+            logger.info("All browser profiles are leased - waiting")
+            time.sleep(10)
+
+    def _try_lease(self, owner: str) -> Optional[BrowserLease]:
+        now = time.time()
+        placeholders = ", ".join("?" * len(self.profile_id_list))
+        with sqlite_transaction(self.file_path) as connection:
+            leased_ports = {
+                port
+                for (port,) in connection.execute(
+                    "SELECT port FROM profiles WHERE lease_expires_at >= ?", (now,)
+                )
+            }
+            row = connection.execute(
+                "SELECT profile_id, port, lease_expires_at FROM profiles "
+                f"WHERE profile_id IN ({placeholders}) "
+                "AND (lease_expires_at IS NULL OR lease_expires_at < ?) "
+                "ORDER BY "
+                "CAST(num_blocks AS REAL) / MAX(num_page_loads, 1) "
+                "+ CAST(num_crashes AS REAL) / MAX(num_sessions, 1), "
+                "page_load_seconds / MAX(num_page_loads, 1), "
+                "last_used "
+                "LIMIT 1",
+                (*self.profile_id_list, now),
+            ).fetchone()
+            if row is None:
+                return None
+            profile_id, stale_port, stale_lease_expires_at = row
+
+            port = self._find_free_port(leased_ports)
+            connection.execute(
+                "UPDATE profiles SET owner = ?, port = ?, lease_expires_at = ?, "
+                "num_sessions = num_sessions + 1, last_used = ? WHERE profile_id = ?",
+                (owner, port, now + self.lease_duration, now, profile_id),
+            )
+
+        # clean up after a session whose lease expired without release
+        if stale_lease_expires_at is not None and stale_port is not None:
+            terminate_browser_processes(stale_port)
+
+        logger.info(f"Browser profile {profile_id} leased - port {port}")
+        return BrowserLease(profile_id, port)
+
+    def release(self, lease: BrowserLease, owner: str):
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                "UPDATE profiles SET lease_expires_at = NULL "
+                "WHERE profile_id = ? AND owner = ?",
+                (lease.profile_id, owner),
+            )
+
+    def record_page_load(self, lease: BrowserLease, owner: str, seconds: float):
+        """Record the latency of a page load and renew the lease."""
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                "UPDATE profiles SET num_page_loads = num_page_loads + 1, "
+                "page_load_seconds = page_load_seconds + ?, lease_expires_at = ? "
+                "WHERE profile_id = ? AND owner = ?",
+                (seconds, time.time() + self.lease_duration, lease.profile_id, owner),
+            )
+
+    def record_block(self, lease: BrowserLease):
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                "UPDATE profiles SET num_blocks = num_blocks + 1 WHERE profile_id = ?",
+                (lease.profile_id,),
+            )
+
+    def record_crash(self, lease: BrowserLease):
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                "UPDATE profiles SET num_crashes = num_crashes + 1 "
+                "WHERE profile_id = ?",
+                (lease.profile_id,),
+            )
+
+    def get_profile_health(self) -> List[Dict]:
+        with sqlite_transaction(self.file_path) as connection:
+            rows = connection.execute(
+                "SELECT profile_id, num_sessions, num_crashes, num_page_loads, "
+                "num_blocks, page_load_seconds, lease_expires_at >= ? FROM profiles",
+                (time.time(),),
+            ).fetchall()
+        return [
+            {
+                "profile_id": profile_id,
+                "sessions": num_sessions,
+                "crash_rate": num_crashes / max(num_sessions, 1),
+                "page_loads": num_page_loads,
+                "block_rate": num_blocks / max(num_page_loads, 1),
+                "mean_page_load_seconds": page_load_seconds / max(num_page_loads, 1),
+                "is_leased": bool(is_leased),
+            }
+            for (
+                profile_id,
+                num_sessions,
+                num_crashes,
+                num_page_loads,
+                num_blocks,
+                page_load_seconds,
+                is_leased,
+            ) in rows
+        ]
+
+    def log_statistics(self):
+        for health in self.get_profile_health():
+            logger.info(
+                f"Browser profile {health['profile_id']} - "
+                f"sessions: {health['sessions']} - "
+                f"crash rate: {health['crash_rate']:.2f} - "
+                f"block rate: {health['block_rate']:.2f} - "
+                f"mean page load: {health['mean_page_load_seconds']:.2f} s"
+            )
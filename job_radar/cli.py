@@ -0,0 +1,278 @@
+import argparse
+import logging
+from datetime import datetime
+
+from log_helpers import setup_log_file
+from metrics import metrics, export_run_metrics
+
+############################################################################
+# Command line interface
+############################################################################
+"""
+Run the whole job radar pipeline or a single stage of it, e.g.
+
+    python cli.py rate --workers 4 --cool-score 50
+    python cli.py notify
+    python cli.py daemon --scrape-interval 1800 --status-port 8765
+    python cli.py scrape-coordinator --queue /shared/task_queue.sqlite
+    python cli.py scrape-worker --queue /shared/task_queue.sqlite
+    python cli.py filter-report --rules candidate_filter_rules.json
+
+Each stage imports only the modules it needs, so e.g. rating and notification
+do not pay for importing the browser stack.
+"""
+
+
+def run_scrape(args: argparse.Namespace):
+    from scrape_jobposts import scrape_and_store_new_jobposts
+
+    scrape_and_store_new_jobposts()
+
+
+def run_scrape_coordinator(args: argparse.Namespace):
+    from scrape_workers import run_coordinator
+    from task_queue import TaskQueue
+
+    run_coordinator(
+        TaskQueue(args.queue, lease_duration=args.lease_duration),
+        poll_interval=args.poll_interval,
+    )
+
+
+def run_scrape_worker(args: argparse.Namespace):
+    from scrape_workers import run_worker
+    from task_queue import TaskQueue
+
+    run_worker(
+        TaskQueue(args.queue, lease_duration=args.lease_duration),
+        worker_id=args.worker_id,
+        idle_timeout=args.idle_timeout,
+        poll_interval=args.poll_interval,
+    )
+
+
+def run_stream(args: argparse.Namespace):
+    from streaming_pipeline import run_streaming_pipeline
+
+    run_streaming_pipeline(
+        flush_size=args.flush_size,
+        flush_interval=args.flush_interval,
+        cool_score=args.cool_score,
+    )
+
+
+def run_check_liveness(args: argparse.Namespace):
+    from manage_jobposts import JobStorageManager
+
+    JobStorageManager(spreadsheet_name="Job_radar_aktiv").find_inactive_jobposts()
+
+
+def run_archive(args: argparse.Namespace):
+    from manage_jobposts import JobStorageManager
+
+    JobStorageManager(spreadsheet_name="Job_radar_aktiv").archive_inactive_jobposts()
+
+
+def run_reorganize(args: argparse.Namespace):
+    from manage_jobposts import JobPostOrganizer
+
+    JobPostOrganizer(spreadsheet_name="Job_radar_aktiv").reorganize_jobposts()
+
+
+def run_rate(args: argparse.Namespace):
+    from rate_jobposts import rate_all_jobpost
+
+    rate_all_jobpost(
+        num_workers=args.workers,
+        cool_score=args.cool_score,
+        cool_similarity=args.cool_similarity,
+    )
+
+
+def run_notify(args: argparse.Namespace):
+    from rate_jobposts import check_for_cool_jobs
+    from send_mail import send_mail_with_notification
+    from notification_store import NotificationStore
+    from notification_outbox import NotificationOutbox
+
+    notification_outbox = NotificationOutbox()
+    notification_outbox.start()
+    notification_store = NotificationStore()
+    cool_job_list = check_for_cool_jobs(notification_store)
+    if cool_job_list:
+        send_mail_with_notification(
+            cool_job_list, notification_store, notification_outbox
+        )
+    notification_outbox.stop()
+
+
+def run_filter_report(args: argparse.Namespace):
+    from filter_rules import report_filter_rules
+
+    report_filter_rules(args.rules)
+
+
+def run_all(args: argparse.Namespace):
+    for run_stage in [
+        run_stream if args.streaming else run_scrape,
+        run_check_liveness,
+        run_archive,
+        run_reorganize,
+        run_rate,
+        run_notify,
+    ]:
+        with metrics.timer(f"stage.{run_stage.__name__[len('run_'):]}"):
+            run_stage(args)
+
+
+def run_daemon(args: argparse.Namespace):
+    from daemon import JobRadarDaemon
+
+    JobRadarDaemon(
+        scrape_interval=args.scrape_interval,
+        liveness_interval=args.liveness_interval,
+        num_workers=args.workers,
+        cool_score=args.cool_score,
+        cool_similarity=args.cool_similarity,
+        status_port=args.status_port,
+    ).run()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="job_radar", description="Run the job radar pipeline or one stage of it."
+    )
+    subparsers = parser.add_subparsers(dest="stage", required=True)
+
+    stages = [
+        ("scrape", run_scrape, "scrape and store new, relevant job posts"),
+        (
+            "scrape-coordinator",
+            run_scrape_coordinator,
+            "queue searches for scrape workers and store their results",
+        ),
+        ("scrape-worker", run_scrape_worker, "run queued scrape tasks"),
+        ("stream", run_stream, "scrape, store, rate and notify concurrently"),
+        ("check-liveness", run_check_liveness, "mark job posts no longer active"),
+        ("archive", run_archive, "move inactive job posts to the archive"),
+        ("reorganize", run_reorganize, "move job posts to their correct domain"),
+        ("rate", run_rate, "analyze and rate stored job posts"),
+        ("notify", run_notify, "notify by email if cool jobs appear"),
+        (
+            "filter-report",
+            run_filter_report,
+            "count the hits of each filter rule on the stored job posts",
+        ),
+        ("all", run_all, "run the whole pipeline"),
+        ("daemon", run_daemon, "run the pipeline stages on a schedule"),
+    ]
+    for name, run_stage, help_text in stages:
+        stage_parser = subparsers.add_parser(name, help=help_text)
+        stage_parser.set_defaults(run_stage=run_stage)
+        if name in ["stream", "all"]:
+            stage_parser.add_argument(
+                "--flush-size",
+                type=int,
+                default=25,
+                help="number of streamed job posts stored at a time",
+            )
+            stage_parser.add_argument(
+                "--flush-interval",
+                type=float,
+                default=300.0,
+                help="max. seconds between storing streamed job posts",
+            )
+        if name == "all":
+            stage_parser.add_argument(
+                "--streaming",
+                action="store_true",
+                help="scrape with the streaming pipeline",
+            )
+        if name in ["scrape-coordinator", "scrape-worker"]:
+            stage_parser.add_argument(
+                "--queue",
+                default=None,
+                help="path of the shared task queue file (default: local storage)",
+            )
+            stage_parser.add_argument(
+                "--lease-duration",
+                type=float,
+                default=300.0,
+                help="seconds a task stays leased to a worker without heartbeat",
+            )
+            stage_parser.add_argument(
+                "--poll-interval",
+                type=float,
+                default=10.0 if name == "scrape-coordinator" else 5.0,
+                help="seconds between polls of the task queue",
+            )
+        if name == "scrape-worker":
+            stage_parser.add_argument(
+                "--worker-id", default=None, help="default: <hostname>-<pid>"
+            )
+            stage_parser.add_argument(
+                "--idle-timeout",
+                type=float,
+                default=None,
+                help="stop after this many seconds without tasks",
+            )
+        if name == "filter-report":
+            stage_parser.add_argument(
+                "--rules",
+                default=None,
+                help="rule file to evaluate (default: config/filter_rules.json)",
+            )
+        if name == "daemon":
+            stage_parser.add_argument(
+                "--scrape-interval",
+                type=float,
+                default=1800.0,
+                help="seconds between scraping new job posts",
+            )
+            stage_parser.add_argument(
+                "--liveness-interval",
+                type=float,
+                default=6 * 3600.0,
+                help="seconds between checking if job posts are still active",
+            )
+            stage_parser.add_argument(
+                "--status-port",
+                type=int,
+                default=8765,
+                help="local port serving /status and /metrics",
+            )
+        if name in ["stream", "rate", "all", "daemon"]:
+            stage_parser.add_argument(
+                "--cool-score", type=int, default=50, help="score of a cool job"
+            )
+        if name in ["rate", "all", "daemon"]:
+            stage_parser.add_argument(
+                "--workers", type=int, default=4, help="number of rating processes"
+            )
+            stage_parser.add_argument(
+                "--cool-similarity",
+                type=float,
+                default=None,
+                help="similarity score (0-100) of a cool job",
+            )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    setup_log_file()
+    logging.info(
+        f'Job radar started: {datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}'
+        f" - stage: {args.stage}"
+    )
+    try:
+        with metrics.timer(f"stage.{args.stage.replace('-', '_')}"):
+            args.run_stage(args)
+    finally:
+        export_run_metrics(args.stage)
+    logging.info("Job radar end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import json
+import time
+import signal
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+import logging
+
+from log_helpers import log_big_separator
+from metrics import metrics, export_run_metrics
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Job radar daemon
+############################################################################
+"""
+Run the job radar as a long-running process, which keeps the Google Sheets
+client, language and rating models, the near-duplicate index, the browser
+session and the notification outbox warm between runs. The stages are scheduled
+internally at independent cadences: scraping and liveness checks on fixed
+intervals, rating whenever new job posts were stored or archived.
+
+The status of the daemon and its stages is served as json on
+http://localhost:<status_port>/status and its metrics in the Prometheus text
+format on /metrics. On SIGTERM or SIGINT the running stage is allowed to finish,
+after which pending notifications are sent, the metrics are written and the
+browser is stopped.
+"""
+
+
+class ScheduledStage:
+    """A pipeline stage run every interval seconds - or only when triggered, if
+    no interval is given."""
+
+    def __init__(self, name: str, run: Callable[[], None], interval: Optional[float]):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.next_run_time = time.time() if interval is not None else None
+        self.is_triggered = False
+        self.num_runs = 0
+        self.num_failures = 0
+        self.last_start_time = None
+        self.last_duration = None
+        self.last_error = None
+
+    def trigger(self):
+        self.is_triggered = True
+
+    def is_due(self, now: float) -> bool:
+        return self.is_triggered or (
+            self.next_run_time is not None and now >= self.next_run_time
+        )
+
+    def execute(self):
+        self.is_triggered = False
+        self.last_start_time = time.time()
+        try:
+            with metrics.timer(f"stage.{self.name}"):
+                self.run()
+            self.last_error = None
+        # the scraper may exit on errors it cannot recover from - which must
+        # not end the daemon, only fail this run of the stage
+        except (Exception, SystemExit) as e:
+            logger.exception(f"Stage {self.name} failed")
+            self.num_failures += 1
+            self.last_error = repr(e)
+        self.num_runs += 1
+        self.last_duration = time.time() - self.last_start_time
+        if self.interval is not None:
+            self.next_run_time = self.last_start_time + self.interval
+
+    def status(self) -> Dict:
+        def _isoformat(timestamp):
+            if timestamp is None:
+                return None
+            return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.num_runs,
+            "failures": self.num_failures,
+            "last_start": _isoformat(self.last_start_time),
+            "last_duration_seconds": self.last_duration,
+            "last_error": self.last_error,
+            "next_run": "on new data"
+            if self.interval is None
+            else _isoformat(self.next_run_time),
+            "is_triggered": self.is_triggered,
+        }
+
+
+class JobRadarDaemon:
+    """Scheduler running the pipeline stages in one long-lived process."""
+
+    def __init__(
+        self,
+        scrape_interval: float = 30 * 60,
+        liveness_interval: float = 6 * 3600,
+        num_workers: int = 4,
+        cool_score: int = 50,
+        cool_similarity: Optional[float] = None,
+        status_port: int = 8765,
+    ):
+        self.num_workers = num_workers
+        self.cool_score = cool_score
+        self.cool_similarity = cool_similarity
+        self.status_port = status_port
+        self.start_time = time.time()
+        self.stop_event = threading.Event()
+        self.running_stage = None
+
+        self.stages: List[ScheduledStage] = [
+            ScheduledStage("scrape", self.run_scrape, scrape_interval),
+            ScheduledStage("liveness", self.run_liveness, liveness_interval),
+            ScheduledStage("rate", self.run_rate, None),
+        ]
+        self.stages_by_name = {stage.name: stage for stage in self.stages}
+
+        self.near_duplicate_index = None
+        self.browser_manager = None
+        self.notification_outbox = None
+        self.status_server = None
+
+    ############################################################################
+    # Stages
+    ############################################################################
+
+    def run_scrape(self):
+        from scrape_jobposts import scrape_and_store_new_jobposts
+
+        num_stored = scrape_and_store_new_jobposts(
+            self.near_duplicate_index, self.browser_manager
+        )
+        if num_stored:
+            self.stages_by_name["rate"].trigger()
+
+    def run_liveness(self):
+        from manage_jobposts import JobStorageManager, JobPostOrganizer
+
+        job_storage_manager = JobStorageManager(
+            spreadsheet_name="Job_radar_aktiv", browser_manager=self.browser_manager
+        )
+        job_storage_manager.find_inactive_jobposts()
+        job_storage_manager.archive_inactive_jobposts()
+        JobPostOrganizer(spreadsheet_name="Job_radar_aktiv").reorganize_jobposts()
+        self.stages_by_name["rate"].trigger()
+
+    def run_rate(self):
+        from rate_jobposts import rate_all_jobpost, check_for_cool_jobs
+        from notification_store import NotificationStore
+        from send_mail import send_mail_with_notification
+
+        rate_all_jobpost(
+            num_workers=self.num_workers,
+            cool_score=self.cool_score,
+            cool_similarity=self.cool_similarity,
+        )
+
+        notification_store = NotificationStore()
+        cool_job_list = check_for_cool_jobs(notification_store)
+        if cool_job_list:
+            send_mail_with_notification(
+                cool_job_list, notification_store, self.notification_outbox
+            )
+
+    ############################################################################
+    # Lifecycle
+    ############################################################################
+
+    def warm_up(self):
+        """Load the clients, models and indices used by the stages once."""
+        from helper_classes import BrowserManager
+        from manage_jobposts import get_gspread_client
+        from near_duplicates import NearDuplicateIndex
+        from notification_outbox import NotificationOutbox
+        from rate_jobposts import (
+            detect_language,
+            get_keyword_scorer,
+            get_deadline_extractor,
+        )
+
+        with metrics.timer("daemon.warm_up"):
+            get_gspread_client()
+            detect_language("warm up")
+            get_keyword_scorer()
+            get_deadline_extractor()
+            self.near_duplicate_index = NearDuplicateIndex()
+            self.browser_manager = BrowserManager()
+            self.notification_outbox = NotificationOutbox()
+            self.notification_outbox.start()
+
+    def status(self) -> Dict:
+        return {
+            "started": datetime.fromtimestamp(self.start_time).isoformat(
+                timespec="seconds"
+            ),
+            "uptime_seconds": time.time() - self.start_time,
+            "running_stage": self.running_stage,
+            "is_stopping": self.stop_event.is_set(),
+            "stages": {stage.name: stage.status() for stage in self.stages},
+        }
+
+    def start_status_server(self):
+        daemon = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/status":
+                    body = json.dumps(daemon.status(), indent=2).encode()
+                    content_type = "application/json"
+                elif self.path == "/metrics":
+                    body = metrics.to_prometheus(daemon.start_time).encode()
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        # only listen locally - the status is not meant to be public
+        self.status_server = ThreadingHTTPServer(
+            ("127.0.0.1", self.status_port), StatusHandler
+        )
+        threading.Thread(
+            target=self.status_server.serve_forever, name="status_server", daemon=True
+        ).start()
+        logger.info(f"Status served on http://127.0.0.1:{self.status_port}/status")
+
+    def request_stop(self, signum=None, frame=None):
+        logger.info(f"Stop requested (signal {signum}) - finishing running stage")
+        self.stop_event.set()
+
+    def shutdown(self):
+        """Flush pending writes and release the warm resources."""
+        log_big_separator(logger, "JOB RADAR DAEMON STOPPING")
+        if self.near_duplicate_index is not None:
+            self.near_duplicate_index.save()
+        if self.notification_outbox is not None:
+            self.notification_outbox.stop()
+        if self.browser_manager is not None and self.browser_manager.driver:
+            self.browser_manager.stop_browser_session()
+        export_run_metrics("daemon")
+        if self.status_server is not None:
+            self.status_server.shutdown()
+            self.status_server.server_close()
+
+    def run(self):
+        log_big_separator(logger, "JOB RADAR DAEMON STARTED")
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        self.start_status_server()
+        try:
+            self.warm_up()
+            while not self.stop_event.is_set():
+                now = time.time()
+                due_stages = [stage for stage in self.stages if stage.is_due(now)]
+                if not due_stages:
+                    next_run_times = [
+                        stage.next_run_time
+                        for stage in self.stages
+                        if stage.next_run_time is not None
+                    ]
+                    self.stop_event.wait(max(0, min(next_run_times) - now))
+                    continue
+
+                # stages run one at a time - they share the browser and sheets
+                stage = due_stages[0]
+                self.running_stage = stage.name
+                stage.execute()
+                self.running_stage = None
+        finally:
+            self.shutdown()
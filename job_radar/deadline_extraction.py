@@ -0,0 +1,169 @@
+import re
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional
+import logging
+
+from dateutil import parser as date_parser
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Application deadline extraction
+############################################################################
+"""
+Instead of searching the full description for anything that resembles a date,
+candidate windows are located with precompiled regular expressions: deadline
+words in English and Danish, "no later than"-like phrases and the shapes of
+numeric and month-name dates. Dates are only parsed inside those windows, and
+the result is memoized per description hash.
+
+The rules follow find_application_deadline in rate_jobposts: a date following a
+deadline word is preferred, "as soon as possible" without a following date gives
+"asap", and otherwise the date closest to today - if not more than 90 days old -
+is assumed to be the deadline.
+"""
+
+_MONTHS = {
+    "january": "january",
+    "januar": "january",
+    "jan": "january",
+    "february": "february",
+    "februar": "february",
+    "feb": "february",
+    "march": "march",
+    "marts": "march",
+    "mar": "march",
+    "april": "april",
+    "apr": "april",
+    "may": "may",
+    "maj": "may",
+    "june": "june",
+    "juni": "june",
+    "jun": "june",
+    "july": "july",
+    "juli": "july",
+    "jul": "july",
+    "august": "august",
+    "aug": "august",
+    "september": "september",
+    "sept": "september",
+    "sep": "september",
+    "october": "october",
+    "oktober": "october",
+    "oct": "october",
+    "okt": "october",
+    "november": "november",
+    "nov": "november",
+    "december": "december",
+    "dec": "december",
+}
+_MONTH_ALTERNATIVES = "|".join(sorted(_MONTHS, key=len, reverse=True))
+
+DATE_SHAPE_PATTERN = re.compile(
+    rf"""
+    \b\d{{4}}-\d{{1,2}}-\d{{1,2}}\b                                # 2024-03-05
+    | \b\d{{1,2}}[./-]\d{{1,2}}[./-](?:\d{{4}}|\d{{2}})\b          # 05.03.2024
+    | \b\d{{1,2}}(?:st|nd|rd|th|\.)?\s+(?:of\s+)?
+      (?:{_MONTH_ALTERNATIVES})\b\.?,?(?:\s+\d{{4}}\b)?            # 5th of March 2024
+    | \b(?:{_MONTH_ALTERNATIVES})\b\.?\s+\d{{1,2}}
+      (?:st|nd|rd|th)?\b,?(?:\s+\d{{4}}\b)?                        # March 5, 2024
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+_ISO_DATE_PATTERN = re.compile(r"\d{4}-\d{1,2}-\d{1,2}")
+_MONTH_PATTERN = re.compile(rf"\b(?:{_MONTH_ALTERNATIVES})\b", re.IGNORECASE)
+_ORDINAL_PATTERN = re.compile(r"(?<=\d)(?:st|nd|rd|th|\.)(?=\s)", re.IGNORECASE)
+
+DEADLINE_WORD_PATTERN = re.compile(
+    r"\b(?:application\s+deadline|deadline|closing\s+date|apply\s+(?:by|before)"
+    r"|ansøgningsfrist|frist)\b",
+    re.IGNORECASE,
+)
+ASAP_PATTERN = re.compile(r"as soon as possible|hurtigst muligt", re.IGNORECASE)
+FOLLOWUP_PATTERN = re.compile(
+    r"\b(?:no later than|at the latest|senest)\b(.{0,35})", re.IGNORECASE
+)
+
+DEADLINE_WINDOW_SIZE = 60
+MAX_DEADLINE_AGE = timedelta(days=90)
+
+
+def parse_date(date_str: str) -> Optional[datetime]:
+    """Parse a string with a date shape - numeric dates are read day first, except
+    for ISO dates."""
+    if _ISO_DATE_PATTERN.fullmatch(date_str):
+        try:
+            return datetime.strptime(date_str, "%Y-%m-%d")
+        except ValueError:
+            return None
+    date_str = _MONTH_PATTERN.sub(lambda m: _MONTHS[m.group(0).lower()], date_str)
+    date_str = _ORDINAL_PATTERN.sub("", date_str)
+    try:
+        return date_parser.parse(date_str, dayfirst=True, fuzzy=True)
+    except (ValueError, OverflowError):
+        return None
+
+
+def find_dates(text: str) -> List[datetime]:
+    dates = [parse_date(match.group(0)) for match in DATE_SHAPE_PATTERN.finditer(text)]
+    return [date for date in dates if date is not None]
+
+
+class DeadlineExtractor:
+    """Extract application deadlines from job descriptions, memoizing the result
+    of each description."""
+
+    def __init__(self, max_cache_size: int = 20000):
+        self.max_cache_size = max_cache_size
+        self.cache = OrderedDict()
+
+    def extract(self, text: str) -> str:
+        """Return the deadline as "dd-mm-YYYY", "asap" or "N/A"."""
+        text_hash = hashlib.sha1(str(text).encode("utf-8")).digest()
+        if text_hash in self.cache:
+            self.cache.move_to_end(text_hash)
+            return self.cache[text_hash]
+
+        deadline = self._extract(str(text))
+
+        self.cache[text_hash] = deadline
+        if len(self.cache) > self.max_cache_size:
+            self.cache.popitem(last=False)
+        return deadline
+
+    def _extract(self, text: str) -> str:
+        def _find_date_or_asap(window: str):
+            if ASAP_PATTERN.search(window):
+                followup_match = FOLLOWUP_PATTERN.search(window)
+                followup_dates = []
+                if followup_match:
+                    followup_dates = find_dates(followup_match.group(1))
+                return followup_dates[0] if followup_dates else "asap"
+            dates = find_dates(window)
+            return dates[0] if dates else None
+
+        # first search after deadline using a potential deadline word
+        for match in DEADLINE_WORD_PATTERN.finditer(text):
+            window = text[match.end() : match.end() + DEADLINE_WINDOW_SIZE]
+            deadline_date = _find_date_or_asap(window)
+            if deadline_date == "asap":
+                return deadline_date
+            if deadline_date is not None:
+                return deadline_date.strftime("%d-%m-%Y")
+
+        # second, find the closest date and assume it to be the deadline
+        if ASAP_PATTERN.search(text):
+            followup_match = FOLLOWUP_PATTERN.search(text)
+            dates = find_dates(followup_match.group(1)) if followup_match else []
+        else:
+            dates = find_dates(text)
+        if not dates:
+            return "N/A"
+
+        current_date = datetime.now()
+        nearest_date = min(dates, key=lambda date: abs(date - current_date))
+        if current_date - nearest_date > MAX_DEADLINE_AGE:
+            return "N/A"
+        return nearest_date.strftime("%d-%m-%Y")
@@ -0,0 +1,122 @@
+import re
+from typing import NamedTuple, Optional
+
+############################################################################
+# Years of experience extraction
+############################################################################
+"""
+Statements on the required years of experience are found with one compiled
+regular expression, directly in the description and without sentence
+tokenization. Single numbers ("5+ years of experience"), ranges ("3-5 years of
+relevant experience", "erfaring på 3-5 år") and number words ("five years of
+experience", "tre års erfaring") are recognized in English and Danish. The Danish
+number words "et", "to", "ni" and "ti" are also common words, so they only count
+if the word for experience follows in the same clause ("to års relevant
+erfaring") or precedes them ("erfaring på mindst to år").
+"""
+
+_NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "a couple of": 2,
+    "couple of": 2,
+    "et": 1,
+    "to": 2,
+    "tre": 3,
+    "fire": 4,
+    "fem": 5,
+    "seks": 6,
+    "syv": 7,
+    "otte": 8,
+    "ni": 9,
+    "ti": 10,
+}
+_EN_NUMBER = (
+    r"\d{1,2}|one|two|three|four|five|six|seven|eight|nine|ten|a couple of|couple of"
+)
+_DA_NUMBER = r"\d{1,2}|et|to|tre|fire|fem|seks|syv|otte|ni|ti"
+# two-letter number words that are also common words ("et år siden", "ti år")
+_DA_SHORT_NUMBER = r"et|to|ni|ti"
+_DA_LONG_NUMBER = r"\d{1,2}|tre|fire|fem|seks|syv|otte"
+
+
+def _years_statement(
+    number: str, years: str, name: str, max_number: Optional[str] = None
+) -> str:
+    # e.g. "3", "3+", "3-5", "3 to 5", "five (5)" followed by the word for years
+    max_number = max_number or number
+    return (
+        rf"\b(?P<{name}_min>{number})(?:\s*\(\d{{1,2}}\))?\s*\+?"
+        rf"(?:\s*(?:-|–|to|til)\s*(?P<{name}_max>{max_number}))?\s*\+?"
+        rf"\s*(?:or more\s+|eller mere\s+)?{years}"
+    )
+
+
+EXPERIENCE_PATTERN = re.compile(
+    "|".join(
+        [
+            # "5+ years of relevant experience"
+            _years_statement(_EN_NUMBER, r"years?\b'?", "en")
+            + r"[^.!?\n]{0,50}?\bexperience",
+            # "experience: minimum 3-5 years"
+            r"\bexperience\b[^.!?\n]{0,40}?"
+            + _years_statement(_EN_NUMBER, r"years?\b", "en_after"),
+            # "mindst 3 års relevant erfaring"
+            _years_statement(_DA_LONG_NUMBER, r"års?\b", "da", _DA_NUMBER)
+            + r"[^.!?\n]{0,40}?\berfaring",
+            # "erfaring på 3-5 år"
+            r"\berfaring\b[^.!?\n]{0,40}?"
+            + _years_statement(_DA_LONG_NUMBER, r"års?\b", "da_after", _DA_NUMBER),
+            # "to års relevant erfaring" - within the same clause
+            _years_statement(_DA_SHORT_NUMBER, r"års?", "da_short", _DA_NUMBER)
+            + r"(?:\s+\w+){0,2}?\s+erfaring\b",
+            # "erfaring på mindst to år"
+            r"\berfaring\s+(?:på|af)\s+(?:mindst\s+|minimum\s+)?"
+            + _years_statement(
+                _DA_SHORT_NUMBER, r"års?\b", "da_short_after", _DA_NUMBER
+            ),
+        ]
+    ),
+    re.IGNORECASE,
+)
+
+# statements above this are rather about the company than the candidate
+MAX_YEARS_OF_EXPERIENCE = 9
+
+
+class ExperienceRange(NamedTuple):
+    min_years: int
+    max_years: int
+
+
+def _to_years(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    value = value.lower()
+    return int(value) if value.isdigit() else _NUMBER_WORDS[value]
+
+
+def extract_years_of_experience(text: str) -> Optional[ExperienceRange]:
+    """Find the required years of experience stated in a text. If several
+    statements are found, the one with the highest minimum is returned."""
+
+    required_experience = None
+    for match in EXPERIENCE_PATTERN.finditer(str(text)):
+        for name in ["en", "en_after", "da", "da_after", "da_short", "da_short_after"]:
+            min_years = _to_years(match.group(f"{name}_min"))
+            if min_years is not None:
+                max_years = _to_years(match.group(f"{name}_max")) or min_years
+                break
+        if min_years > MAX_YEARS_OF_EXPERIENCE:
+            continue
+        if required_experience is None or min_years > required_experience.min_years:
+            required_experience = ExperienceRange(min_years, max(min_years, max_years))
+    return required_experience
@@ -0,0 +1,268 @@
+import os
+import re
+import json
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+import logging
+
+import numpy as np
+import pandas as pd
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Filter rule engine
+############################################################################
+"""
+The title filtering of listed job posts and the attribute filtering of scraped
+job posts are given as declarative rules in config/filter_rules.json:
+
+    {
+        "title_rules": [
+            {"name": "data_roles", "require": "title",
+             "contains": ["data", "analyst"], "domains": [0, 1]},
+            {"name": "no_seniors", "exclude": "title", "pattern": "\\bsenior\\b"}
+        ],
+        "attribute_rules": [
+            {"name": "no_internships", "exclude": "Employment type",
+             "contains": ["Internship"]},
+            {"name": "few_applicants", "require": "num_applicants", "max": 200}
+        ]
+    }
+
+A rule names its field with its action: a job post must match every require
+rule and no exclude rule. Text rules match if the field contains any of the
+"contains" keywords or matches the "pattern" regex - case-insensitive unless
+"case_sensitive" is set. Numeric rules match if the field lies within "min" and
+"max". Rules only judge job posts with a value in their field, and title rules
+only the domains listed in "domains", if given.
+
+The rules are compiled once into one regex per rule and evaluated with pandas
+over a list of titles or a whole frame at once. The engine counts per rule how
+many job posts it evaluated, matched and rejected, so the criteria can be tuned
+from the counts of a run - or by evaluating rules against the stored job posts
+with report_filter_rules.
+
+Without a rule file, or without title or attribute rules in it, the engine
+wraps title_filtering and attribute_filtering of search_criteria as one rule
+each - still evaluated a result page or a frame at once, but a function call
+per job post. Copied to config/filter_rules.json and adapted to the criteria of
+search_criteria, config/filter_rules.example.json replaces them with compiled
+rules.
+"""
+
+
+class FilterRule:
+    """A declarative rule compiled into a matcher."""
+
+    def __init__(self, rule: Dict):
+        actions = [action for action in ["require", "exclude"] if action in rule]
+        if len(actions) != 1:
+            raise ValueError(f"Filter rule needs either require or exclude: {rule}")
+        self.action = actions[0]
+        self.field = rule[self.action]
+        self.name = rule.get("name", f"{self.action}_{self.field}")
+        self.domains = set(rule["domains"]) if "domains" in rule else None
+
+        pattern_list = [re.escape(keyword) for keyword in rule.get("contains", [])]
+        if "pattern" in rule:
+            pattern_list.append(rule["pattern"])
+        flags = 0 if rule.get("case_sensitive") else re.IGNORECASE
+        self.regex = re.compile("|".join(pattern_list), flags) if pattern_list else None
+        self.minimum = rule.get("min")
+        self.maximum = rule.get("max")
+        if self.regex is None and self.minimum is None and self.maximum is None:
+            raise ValueError(f"Filter rule {self.name} matches nothing: {rule}")
+
+    def applies_to(self, domain_idx: Optional[int]) -> bool:
+        return self.domains is None or domain_idx is None or domain_idx in self.domains
+
+    def match(self, df: pd.DataFrame, domain_idx: Optional[int] = None):
+        """Returns which rows match and which rows have a value to judge."""
+        if self.field not in df.columns:
+            is_judged = np.zeros(len(df), dtype=bool)
+            return is_judged, is_judged
+
+        values = df[self.field]
+        if self.regex is not None:
+            # searched value by value with the compiled regex - on the few job
+            # posts of a result page the pandas string methods cost far more
+            search = self.regex.search
+            texts = values.tolist()
+            is_judged = np.fromiter(
+                (not pd.isna(text) for text in texts), dtype=bool, count=len(texts)
+            )
+            is_match = np.fromiter(
+                (
+                    bool(is_text_judged) and search(str(text)) is not None
+                    for text, is_text_judged in zip(texts, is_judged)
+                ),
+                dtype=bool,
+                count=len(texts),
+            )
+        else:
+            is_judged = values.notna().to_numpy(copy=True)
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+            is_judged = is_judged & ~np.isnan(numbers)
+            is_match = is_judged.copy()
+            if self.minimum is not None:
+                is_match &= numbers >= self.minimum
+            if self.maximum is not None:
+                is_match &= numbers <= self.maximum
+        return is_match, is_judged
+
+
+class LegacyFilterRule:
+    """Wraps a filter function of search_criteria as a require rule."""
+
+    action = "require"
+
+    def __init__(
+        self,
+        name: str,
+        is_relevant: Callable[[pd.DataFrame, Optional[int]], Iterable[bool]],
+    ):
+        self.name = name
+        self.is_relevant = is_relevant
+
+    def applies_to(self, domain_idx: Optional[int]) -> bool:
+        return True
+
+    def match(self, df: pd.DataFrame, domain_idx: Optional[int] = None):
+        is_match = np.fromiter(
+            self.is_relevant(df, domain_idx), dtype=bool, count=len(df)
+        )
+        return is_match, np.ones(len(df), dtype=bool)
+
+
+def _legacy_title_rule() -> LegacyFilterRule:
+    from search_criteria import title_filtering
+
+    # the titles are passed on directly, without indexing the frame per row
+    return LegacyFilterRule(
+        "title_filtering",
+        lambda df, domain_idx: (
+            bool(title_filtering(title, domain_idx)) for title in df["title"].tolist()
+        ),
+    )
+
+
+def _legacy_attribute_rule() -> LegacyFilterRule:
+    from search_criteria import attribute_filtering
+
+    return LegacyFilterRule(
+        "attribute_filtering",
+        lambda df, domain_idx: (
+            bool(attribute_filtering(df, row_idx)) for row_idx in df.index
+        ),
+    )
+
+
+class FilterRuleEngine:
+    """Evaluates compiled title and attribute rules in batches and counts the
+    hits of each rule."""
+
+    def __init__(self, title_rules: List, attribute_rules: List):
+        self.title_rules = title_rules
+        self.attribute_rules = attribute_rules
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {
+            rule.name: {"evaluated": 0, "matched": 0, "rejected": 0}
+            for rule in title_rules + attribute_rules
+        }
+
+    @classmethod
+    def from_rules(cls, rules: Dict[str, List[Dict]]) -> "FilterRuleEngine":
+        """Compile rules given as in config/filter_rules.json - falling back to
+        search_criteria for a missing kind of rules."""
+        if "title_rules" in rules:
+            title_rules = [FilterRule(rule) for rule in rules["title_rules"]]
+        else:
+            title_rules = [_legacy_title_rule()]
+        if "attribute_rules" in rules:
+            attribute_rules = [FilterRule(rule) for rule in rules["attribute_rules"]]
+        else:
+            attribute_rules = [_legacy_attribute_rule()]
+        return cls(title_rules, attribute_rules)
+
+    def _evaluate(
+        self, rules: List, df: pd.DataFrame, domain_idx: Optional[int]
+    ) -> np.ndarray:
+        is_relevant = np.ones(len(df), dtype=bool)
+        for rule in rules:
+            if not rule.applies_to(domain_idx):
+                continue
+            is_match, is_judged = rule.match(df, domain_idx)
+            if rule.action == "require":
+                is_rejected = is_judged & ~is_match
+            else:
+                is_rejected = is_judged & is_match
+            is_relevant &= ~is_rejected
+
+            num_rejected = int(is_rejected.sum())
+            with self._lock:
+                stats = self.stats[rule.name]
+                stats["evaluated"] += int(is_judged.sum())
+                stats["matched"] += int(is_match.sum())
+                stats["rejected"] += num_rejected
+            metrics.increment(f"filter.{rule.name}.rejected", num_rejected)
+        return is_relevant
+
+    def filter_titles(
+        self, titles: Sequence[str], domain_idx: Optional[int] = None
+    ) -> np.ndarray:
+        """Which of the titles of listed job posts are relevant for the domain"""
+        return self._evaluate(
+            self.title_rules, pd.DataFrame({"title": list(titles)}), domain_idx
+        )
+
+    def filter_attributes(self, df: pd.DataFrame) -> np.ndarray:
+        """Which rows of a frame of scraped job posts are relevant"""
+        return self._evaluate(self.attribute_rules, df, None)
+
+    def log_statistics(self):
+        with self._lock:
+            stats = {name: dict(rule_stats) for name, rule_stats in self.stats.items()}
+        for name, rule_stats in stats.items():
+            logger.info(
+                f"Filter rule {name} - evaluated: {rule_stats['evaluated']} - "
+                f"matched: {rule_stats['matched']} - "
+                f"rejected: {rule_stats['rejected']}"
+            )
+
+
+def load_filter_rules(rules_path: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """The rules of config/filter_rules.json - or of the given file"""
+    if rules_path is None:
+        project_directory = os.path.dirname(os.path.abspath(__file__))
+        rules_path = os.path.join(project_directory, "config", "filter_rules.json")
+    if not os.path.exists(rules_path):
+        return {}
+    with open(rules_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_filter_rule_engine() -> FilterRuleEngine:
+    """The engine shared by the scraper, so its counts cover the whole run"""
+    return FilterRuleEngine.from_rules(load_filter_rules())
+
+
+def report_filter_rules(rules_path: Optional[str] = None) -> FilterRuleEngine:
+    """Evaluate the rules against all stored job posts - both active and
+    archived - and log the counts of each rule. The titles of a worksheet are
+    evaluated for the domain of the worksheet."""
+    from manage_jobposts import GoogleSheetManager
+
+    engine = FilterRuleEngine.from_rules(load_filter_rules(rules_path))
+    for spreadsheet_name in ["Job_radar_aktiv", "Job_radar_inaktiv"]:
+        gsheet_mgr = GoogleSheetManager(spreadsheet_name)
+        for ws_idx, ws in enumerate(gsheet_mgr.sheet.worksheets()[1:]):
+            df = gsheet_mgr.get_worksheet_as_dataframe(ws)
+            engine.filter_titles(df["jobpost_title"].fillna("").astype(str), ws_idx)
+            engine.filter_attributes(df)
+    engine.log_statistics()
+    return engine
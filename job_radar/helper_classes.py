@@ -1,39 +1,34 @@
+import os
+import socket
 import logging
-import psutil
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
 
 from setup_gologin import start_remote_debug_gologin_browser
+from browser_allocator import BrowserProfileAllocator, terminate_browser_processes
+from resource_blocking import ResourceBlocker
+from metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 
 class BrowserManager:
-    def __init__(self):
+    """Runs one browser session at a time, on a GoLogin profile and debugging
+    port leased from the allocator, so several managers can run side by side.
+    In lean mode, images, fonts, media and trackers are not loaded."""
+
+    def __init__(self, allocator: BrowserProfileAllocator = None, is_lean=True):
         self.driver = None
         self.gl = None
+        self.allocator = allocator
+        self.lease = None
+        self.is_lean = is_lean
+        self.resource_blocker = None
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{id(self):x}"
 
+    @metrics.timed("webdriver.start_session")
     def start_browser_session(self):
-        # make sure old processes are shut down
-        def _terminate_activer_browser_instances(
-            process_name_to_shut, ppid_not_to_shut
-        ):
-            for process in psutil.process_iter(["pid", "name", "ppid"]):
-                if (
-                    process.info["name"] == process_name_to_shut
-                    and process.info["ppid"] != ppid_not_to_shut
-                ):
-                    try:
-                        process.terminate()
-                        print(
-                            f"Terminated process '{process_name_to_shut}' with PPID {process.info['ppid']}"
-                        )
-                    except psutil.NoSuchProcess as e:
-                        print(
-                            f"Error terminating process '{process_name_to_shut}': {e}"
-                        )
-
         def _ensure_only_one_webdriver_window(self):
             if len(self.driver.window_handles) > 1:
                 current_window_handle = driver.current_window_handle
@@ -43,10 +38,21 @@ class BrowserManager:
                         self.driver.close()
                 self.driver.switch_to.window(current_window_handle)
 
-        # shut any active chrome sessions
-        _terminate_activer_browser_instances("chrome.exe", None)
+        # shut down the previous session of this manager, e.g. after a crash
+        if self.lease is not None:
+            self.stop_browser_session()
 
-        driver, gl = start_remote_debug_gologin_browser()
+        if self.allocator is None:
+            self.allocator = BrowserProfileAllocator()
+        self.lease = self.allocator.lease(self.owner)
+        try:
+            driver, gl = start_remote_debug_gologin_browser(
+                self.lease.profile_id, self.lease.port
+            )
+        except Exception:
+            self.record_crash()
+            self.stop_browser_session()
+            raise
         driver.implicitly_wait(3)
         self.driver = driver
         self.gl = gl
@@ -54,12 +60,28 @@ class BrowserManager:
         # ensure only one webdriver window exist
         _ensure_only_one_webdriver_window(self)
 
+        self.resource_blocker = ResourceBlocker(driver)
+        if self.is_lean:
+            try:
+                self.resource_blocker.enable()
+            except Exception as e:
+                logger.warning(f"Resource blocking not available: {e}")
+
     def stop_browser_session(self):
         try:
             self.driver.quit()
             self.gl.stop()
         except Exception:
             pass
+        self.driver = None
+        self.gl = None
+        self.resource_blocker = None
+
+        # only clean up the browser processes started by this manager
+        if self.lease is not None:
+            terminate_browser_processes(self.lease.port)
+            self.allocator.release(self.lease, self.owner)
+            self.lease = None
 
     def restart_browser_session(self):
         self.stop_browser_session()
@@ -67,6 +89,27 @@ class BrowserManager:
         self.start_browser_session()
         logger.info("Started browser")
 
+    def measure_page_load(self):
+        """Record the transferred bytes and load time of the current page."""
+        if self.resource_blocker is None:
+            return
+        try:
+            self.resource_blocker.measure_page_load()
+        except Exception as e:
+            logger.warning(f"Page load not measured: {e}")
+
+    def record_page_load(self, seconds: float):
+        if self.lease is not None:
+            self.allocator.record_page_load(self.lease, self.owner, seconds)
+
+    def record_block(self):
+        if self.lease is not None:
+            self.allocator.record_block(self.lease)
+
+    def record_crash(self):
+        if self.lease is not None:
+            self.allocator.record_crash(self.lease)
+
 
 def try_except_decorator(func):
     def wrapper(*args, **kwargs):
@@ -83,17 +126,21 @@ class ElementFinder:
         self.driver = driver
 
     # @try_except_decorator
+    @metrics.timed("webdriver.find_element")
     def find_by_xpath(self, xpath):
         return self.driver.find_element(By.XPATH, xpath)
 
     # @try_except_decorator
+    @metrics.timed("webdriver.find_elements")
     def find_list_by_xpath(self, xpath):
         return self.driver.find_elements(By.XPATH, xpath)
 
     # @try_except_decorator
+    @metrics.timed("webdriver.find_element")
     def find_by_class(self, class_):
         return self.driver.find_element(By.CLASS_NAME, class_)
 
     # @try_except_decorator
+    @metrics.timed("webdriver.find_elements")
     def find_list_by_class(self, class_):
         return self.driver.find_elements(By.CLASS_NAME, class_)
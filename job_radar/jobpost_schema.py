@@ -0,0 +1,128 @@
+from typing import List
+
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Typed job post frames
+############################################################################
+"""
+Frames read from Google Sheets or built from DATACOLOUMNS hold every column as
+Python objects: IDs as floats, dates as strings and the job criteria as
+repeated strings. apply_jobpost_dtypes gives the job post columns compact,
+typed dtypes:
+
+    id, num_applicants      nullable Int64
+    date                    datetime64 (unparsable values become NaT)
+    job criteria            category
+    is_active               int8 (a missing value counts as active)
+    rating columns          numeric - num_years_exp and age_weeks Int64
+
+The deadline stays text, since deadlines without a date ("asap", "N/A") must be
+written back as they are - evaluate_activity_mask parses it where a date is
+needed. Date cells of a worksheet are read as serial numbers, independent of the
+locale of the sheet, and converted to dates - or to the text format of the
+deadline. to_sheet_dataframe formats the dates back into the text formats used
+in the worksheets before writing, and concat_jobpost_frames combines typed
+frames - e.g. chunks of a worksheet - without falling back to object columns.
+
+The rating columns hold the score components, the years of experience, the age
+and the similarity score of a rated job post. They are written to the worksheets
+after the data columns, and read back with them by name.
+"""
+
+INTEGER_COLUMNS = ["id", "num_applicants"]
+# date columns and their format in the worksheets
+DATE_COLUMNS = {"date": "%Y-%m-%d"}
+# text columns that can hold date cells, and the text format of their dates
+DATE_TEXT_COLUMNS = {"deadline": "%d-%m-%Y"}
+# day 0 of the serial numbers of date cells in Google Sheets
+SHEET_EPOCH = pd.Timestamp("1899-12-30")
+CATEGORICAL_COLUMNS = [
+    "Seniority level",
+    "Employment type",
+    "Job function",
+    "Industries",
+]
+# typed columns holding each score component
+SCORE_COLUMNS = {
+    "General Score": "general_score",
+    "Competence Score": "competence_score",
+    "Domain Score": "domain_score",
+    "# Applicants Score": "num_applicants_score",
+    "Industry Score": "industry_score",
+    "Job Function Score": "job_function_score",
+    "Seniority Score": "seniority_score",
+    "Age Score": "age_score",
+}
+RATING_INTEGER_COLUMNS = ["num_years_exp", "age_weeks"]
+RATING_NUMERIC_COLUMNS = list(SCORE_COLUMNS.values()) + ["similarity_score"]
+RATING_COLUMNS = RATING_NUMERIC_COLUMNS + RATING_INTEGER_COLUMNS
+
+
+def _from_serial_numbers(serials: pd.Series) -> pd.Series:
+    return SHEET_EPOCH + pd.to_timedelta(serials, unit="D")
+
+
+def apply_jobpost_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Return the frame with typed job post columns - columns not present are
+    skipped and other columns are left as they are."""
+    df = df.copy()
+    for column in INTEGER_COLUMNS + RATING_INTEGER_COLUMNS:
+        if column in df:
+            values = pd.to_numeric(df[column], errors="coerce")
+            df[column] = values.round().astype("Int64")
+    for column in RATING_NUMERIC_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    for column, date_format in DATE_COLUMNS.items():
+        if column in df and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            serials = pd.to_numeric(df[column], errors="coerce")
+            dates = pd.to_datetime(
+                df[column].where(serials.isna()), format=date_format, errors="coerce"
+            )
+            dates = dates.fillna(_from_serial_numbers(serials))
+            df[column] = dates.astype("datetime64[ns]")
+    for column, date_format in DATE_TEXT_COLUMNS.items():
+        if column in df:
+            serials = pd.to_numeric(df[column], errors="coerce")
+            if serials.notna().any():
+                date_texts = _from_serial_numbers(serials).dt.strftime(date_format)
+                df[column] = df[column].astype(object).where(serials.isna(), date_texts)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    if "is_active" in df:
+        is_active = pd.to_numeric(df["is_active"], errors="coerce").fillna(1)
+        df["is_active"] = is_active.astype("int8")
+    return df
+
+
+def to_sheet_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """Format the typed date columns as in the worksheets - missing values of
+    all columns are written as empty cells."""
+    df = df.copy()
+    for column, date_format in DATE_COLUMNS.items():
+        if column in df and pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime(date_format)
+    return df
+
+
+def concat_jobpost_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate typed frames, keeping the categorical columns categorical by
+    giving them the union of the categories of all frames."""
+    frames = [df.copy(deep=False) for df in frames]
+    for column in CATEGORICAL_COLUMNS:
+        if not all(
+            column in df and isinstance(df[column].dtype, pd.CategoricalDtype)
+            for df in frames
+        ):
+            continue
+        categories = pd.api.types.union_categoricals(
+            [df[column] for df in frames]
+        ).categories
+        for df in frames:
+            df[column] = df[column].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,122 @@
+from typing import Dict, List, Tuple
+import logging
+
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Batch keyword scoring
+############################################################################
+"""
+The keyword dictionaries of the score markers are compiled once into a
+multi-pattern matcher which finds every keyword contained in every description
+of a batch. The result is a sparse hit matrix (descriptions x keywords) in
+coordinate format, from which the score of each keyword group is computed with
+NumPy. Matching follows plain substring containment (`key in text`), so the
+scores are identical to scoring one description and one keyword at a time.
+
+If pyahocorasick is installed, an Aho-Corasick automaton scans each description
+once. Otherwise each keyword is tested for containment in each description,
+which is not faster than scoring one description at a time - so the rating only
+uses the batch scorer if pyahocorasick is installed.
+"""
+
+
+class KeywordScorer:
+    """Scores a batch of texts against a list of keyword -> score dictionaries
+    (keyword groups)."""
+
+    def __init__(self, keyword_groups: List[Dict[str, int]]):
+        self.num_groups = len(keyword_groups)
+
+        # one column per (group, keyword) - ordered as the dictionaries
+        self.column_keys = [key for group in keyword_groups for key in group]
+        self.column_groups = np.array(
+            [idx for idx, group in enumerate(keyword_groups) for _ in group],
+            dtype=np.int64,
+        )
+        column_scores = [score for group in keyword_groups for score in group.values()]
+        self.column_scores = np.array(column_scores) if column_scores else np.zeros(0)
+
+        self.key_columns: Dict[str, List[int]] = {}
+        for col_idx, key in enumerate(self.column_keys):
+            self.key_columns.setdefault(key, []).append(col_idx)
+
+        # the empty keyword is contained in any text
+        self.always_hit_columns = self.key_columns.pop("", [])
+
+        self.automaton = None
+        if ahocorasick is not None and self.key_columns:
+            self.automaton = ahocorasick.Automaton()
+            for key, col_idx_list in self.key_columns.items():
+                self.automaton.add_word(key, col_idx_list)
+            self.automaton.make_automaton()
+
+    def _find_hits_with_automaton(self, texts: List[str]) -> Tuple[List, List]:
+        row_idx_list, col_idx_list = [], []
+        for row_idx, text in enumerate(texts):
+            hit_columns = set()
+            for _, col_idx_sublist in self.automaton.iter(text):
+                hit_columns.update(col_idx_sublist)
+            row_idx_list.extend([row_idx] * len(hit_columns))
+            col_idx_list.extend(hit_columns)
+        return row_idx_list, col_idx_list
+
+    def _find_hits_with_search(self, texts: List[str]) -> Tuple[List, List]:
+        key_columns = list(self.key_columns.items())
+        row_idx_list, col_idx_list = [], []
+        for row_idx, text in enumerate(texts):
+            for key, col_idx_sublist in key_columns:
+                if key in text:
+                    row_idx_list.extend([row_idx] * len(col_idx_sublist))
+                    col_idx_list.extend(col_idx_sublist)
+        return row_idx_list, col_idx_list
+
+    def find_hits(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sparse hit matrix as row (text) and column (keyword)
+        indices, sorted by row and then by column."""
+
+        texts = [text if isinstance(text, str) else "" for text in texts]
+        if self.automaton is not None:
+            row_idx_list, col_idx_list = self._find_hits_with_automaton(texts)
+        else:
+            row_idx_list, col_idx_list = self._find_hits_with_search(texts)
+
+        for col_idx in self.always_hit_columns:
+            row_idx_list.extend(range(len(texts)))
+            col_idx_list.extend([col_idx] * len(texts))
+
+        rows = np.array(row_idx_list, dtype=np.int64)
+        cols = np.array(col_idx_list, dtype=np.int64)
+        order = np.lexsort((cols, rows))
+        return rows[order], cols[order]
+
+    def score(self, texts: List[str]) -> Tuple[np.ndarray, List[List[str]]]:
+        """Score a batch of texts.
+
+        Returns a matrix (texts x keyword groups) with the summed score of each
+        group and, per group, the score log of each text listing the found
+        keywords."""
+
+        rows, cols = self.find_hits(texts)
+
+        group_scores = np.zeros(
+            (len(texts), self.num_groups), dtype=self.column_scores.dtype
+        )
+        np.add.at(
+            group_scores, (rows, self.column_groups[cols]), self.column_scores[cols]
+        )
+
+        score_logs = [[""] * len(texts) for _ in range(self.num_groups)]
+        column_groups = self.column_groups.tolist()
+        for row_idx, col_idx in zip(rows.tolist(), cols.tolist()):
+            key = self.column_keys[col_idx]
+            score_logs[column_groups[col_idx]][row_idx] += f"{key} + "
+
+        return group_scores, score_logs
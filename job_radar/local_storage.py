@@ -0,0 +1,32 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def get_local_storage_path(file_name: str) -> str:
+    """Return the path of a file in the local storage directory, which holds
+    state that is persisted between runs of the job radar (caches, indices etc.)."""
+
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    project_directory = os.path.dirname(script_directory)
+    storage_directory = os.path.join(project_directory, "local_storage")
+    os.makedirs(storage_directory, exist_ok=True)
+    return os.path.join(storage_directory, file_name)
+
+
+@contextmanager
+def sqlite_transaction(file_path: str) -> Iterator[sqlite3.Connection]:
+    """Run a transaction on a SQLite file shared by threads and processes - a
+    connection per call, and BEGIN IMMEDIATE takes the write lock up front."""
+    connection = sqlite3.connect(file_path, timeout=60, isolation_level=None)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
@@ -5,42 +5,64 @@ from scrape_jobposts import scrape_and_store_new_jobposts
 from manage_jobposts import JobStorageManager, JobPostOrganizer
 from rate_jobposts import rate_all_jobpost, check_for_cool_jobs
 from send_mail import send_mail_with_notification
+from notification_store import NotificationStore
+from notification_outbox import NotificationOutbox
 from log_helpers import setup_log_file
+from metrics import metrics, export_run_metrics
+
+# number of processes rating job posts - rating results do not depend on it
+RATING_NUM_WORKERS = 4
 
 
 def main():
     setup_log_file()
     logging.info(f'Job radar started: {datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}')
 
+    # deliver notifications left over from earlier runs in the background
+    notification_outbox = NotificationOutbox()
+    notification_outbox.start()
+
     ############################################################################
     # Scrape and store new, relevant job posts
     ############################################################################
 
-    scrape_and_store_new_jobposts()
+    with metrics.timer("stage.scrape"):
+        scrape_and_store_new_jobposts()
 
     ############################################################################
     # Archiving inactive jobposts and reorganize remaining jobposts
     ############################################################################
 
     job_storage_manager = JobStorageManager(spreadsheet_name="Job_radar_aktiv")
-    job_storage_manager.find_inactive_jobposts()
-    job_storage_manager.archive_inactive_jobposts()
+    with metrics.timer("stage.check_liveness"):
+        job_storage_manager.find_inactive_jobposts()
+    with metrics.timer("stage.archive"):
+        job_storage_manager.archive_inactive_jobposts()
 
-    JobPostOrganizer(spreadsheet_name="Job_radar_aktiv").reorganize_jobposts()
+    with metrics.timer("stage.reorganize"):
+        JobPostOrganizer(spreadsheet_name="Job_radar_aktiv").reorganize_jobposts()
 
     ############################################################################
     # Analyze and rate stored job posts
     ############################################################################
 
-    rate_all_jobpost()
+    with metrics.timer("stage.rate"):
+        rate_all_jobpost(num_workers=RATING_NUM_WORKERS, cool_score=50)
 
     ############################################################################
     # Notify by email if cool jobs appears
     ############################################################################
 
-    cool_job_list = check_for_cool_jobs(cool_score=50)
-    if cool_job_list:
-        send_mail_with_notification(cool_job_list)
+    with metrics.timer("stage.notify"):
+        notification_store = NotificationStore()
+        cool_job_list = check_for_cool_jobs(notification_store)
+        if cool_job_list:
+            send_mail_with_notification(
+                cool_job_list, notification_store, notification_outbox
+            )
+        notification_outbox.stop()
+
+    export_run_metrics()
 
     logging.info("Job radar end")
 
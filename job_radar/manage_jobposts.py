@@ -1,53 +1,154 @@
 import os
+import re
 import time
-from typing import List
+from functools import lru_cache
+from typing import Iterator, List, TYPE_CHECKING
 import logging
 
+import numpy as np
 import pandas as pd
 import gspread
-from selenium.webdriver.remote.webdriver import WebDriver
-from gspread_dataframe import get_as_dataframe, set_with_dataframe
+from gspread.utils import rowcol_to_a1
+from gspread_dataframe import set_with_dataframe
 
-from helper_classes import BrowserManager, ElementFinder
 from config.datastructure import DATACOLOUMNS, DOMAIN_MARKERS
+from jobpost_schema import (
+    RATING_COLUMNS,
+    apply_jobpost_dtypes,
+    concat_jobpost_frames,
+    to_sheet_dataframe,
+)
 from log_helpers import log_big_separator, log_small_separator
+from metrics import metrics
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def get_gspread_client() -> gspread.Client:
+    """Authorize a gspread client once per process, shared by all sheet managers."""
+    # get the file path of the credentials_file and start a gspread client
+    project_directory = os.path.dirname(os.path.abspath(__file__))
+    credentials_path = os.path.join(project_directory, "config", "SA_credentials.json")
+    return gspread.service_account(filename=credentials_path)
+
+
+def _pad_rows(rows: List[List], num_rows: int) -> List[List]:
+    return list(rows) + [[] for _ in range(num_rows - len(rows))]
+
+
+def _pad_row(row: List, num_cols: int) -> List:
+    return list(row[:num_cols]) + [""] * (num_cols - len(row))
+
+
 class GoogleSheetManager:
     """A class for managing Google Sheets interactions via the Google Sheet API."""
 
     def __init__(self, spreadsheet_name: str):
-        # get the file path of the credentials_file and start a gspread client
-        project_directory = os.path.dirname(os.path.abspath(__file__))
-        credentials_path = os.path.join(
-            project_directory, "config", "SA_credentials.json"
-        )
-        self.client = gspread.service_account(filename=credentials_path)
+        self.client = get_gspread_client()
 
         self.sheet = self.client.open(spreadsheet_name)
 
+    def iter_worksheet_chunks(
+        self,
+        worksheet: gspread.worksheet.Worksheet,
+        id_column: str = "id",
+        chunk_size: int = 2000,
+    ) -> Iterator[pd.DataFrame]:
+        """Read the data and rating columns of a worksheet as typed frames of
+        up to chunk_size rows.
+
+        Only the used rows - up to the last filled cell of the ID column, named
+        id_column - and the columns up to the last data or rating column are
+        fetched, a row range at a time, so empty cells of the grid are neither
+        downloaded nor held in memory. The rating columns are picked by name
+        among the columns following the data columns."""
+        # dates are stored as date cells - read them as serial numbers, since
+        # the text shown in the sheet depends on its locale
+        render_options = {
+            "value_render_option": "FORMULA",
+            "date_time_render_option": "SERIAL_NUMBER",
+        }
+        with metrics.timer("sheets.read"):
+            (header_range,) = worksheet.batch_get(["1:1"], **render_options)
+        header = header_range[0] if header_range else []
+        if id_column not in header:
+            return
+
+        id_col_letter = rowcol_to_a1(1, header.index(id_column) + 1)[:-1]
+        with metrics.timer("sheets.read"):
+            (id_range,) = worksheet.batch_get(
+                [f"{id_col_letter}:{id_col_letter}"], **render_options
+            )
+        num_rows = len(id_range)
+
+        # the data columns come first - the rating columns follow, once rated
+        num_data_cols = min(len(DATACOLOUMNS), len(header))
+        column_idx_list = list(range(num_data_cols)) + [
+            col_idx
+            for col_idx in range(num_data_cols, len(header))
+            if header[col_idx] in RATING_COLUMNS
+        ]
+        num_cols = column_idx_list[-1] + 1
+        columns = [header[col_idx] for col_idx in column_idx_list]
+
+        for start_row in range(2, num_rows + 1, chunk_size):
+            end_row = min(start_row + chunk_size - 1, num_rows)
+            # formulas are read as written, as by gspread_dataframe
+            with metrics.timer("sheets.read"):
+                (value_range,) = worksheet.batch_get(
+                    [f"{rowcol_to_a1(start_row, 1)}:{rowcol_to_a1(end_row, num_cols)}"],
+                    **render_options,
+                )
+
+            # trailing empty rows and cells are left out by the API
+            num_chunk_rows = end_row - start_row + 1
+            rows = [
+                [padded_row[col_idx] for col_idx in column_idx_list]
+                for padded_row in (
+                    _pad_row(row, num_cols)
+                    for row in _pad_rows(value_range, num_chunk_rows)
+                )
+            ]
+
+            # parse as gspread_dataframe does, so numbers are typed as before
+            df_chunk = pd.io.parsers.TextParser(rows, names=columns, header=None).read()
+            df_chunk = df_chunk.dropna(how="all")
+            metrics.increment("sheets.rows_read", df_chunk.shape[0])
+            yield apply_jobpost_dtypes(df_chunk)
+
     def get_worksheet_as_dataframe(
-        self, worksheet: gspread.worksheet.Worksheet
+        self,
+        worksheet: gspread.worksheet.Worksheet,
+        id_column: str = "id",
+        chunk_size: int = 2000,
     ) -> pd.DataFrame:
-        df = get_as_dataframe(worksheet)
-        num_cols = len(DATACOLOUMNS)
-        df_cleaned_rows = df.dropna(how="all")
-        df_cleaned_columns = df_cleaned_rows.iloc[:, :num_cols]
-        return df_cleaned_columns
+        """Read the data columns of a worksheet as a typed frame - see
+        iter_worksheet_chunks"""
+        chunks = list(self.iter_worksheet_chunks(worksheet, id_column, chunk_size))
+        if not chunks:
+            return apply_jobpost_dtypes(pd.DataFrame(columns=DATACOLOUMNS))
+        return concat_jobpost_frames(chunks)
 
     def update_google_worksheet(
         self, ws: gspread.worksheet.Worksheet, df: pd.DataFrame
     ):
-        ws.clear()
+        df = to_sheet_dataframe(df)
+        with metrics.timer("sheets.clear"):
+            ws.clear()
         while 1:
             try:
-                set_with_dataframe(ws, df)
+                with metrics.timer("sheets.write"):
+                    set_with_dataframe(ws, df)
+                metrics.increment("sheets.rows_written", df.shape[0])
                 log_small_separator(logger, "Worksheet updated")
                 return
             except Exception:
                 logger.error("Too many request to api - timeout")
+                metrics.increment("sheets.rate_limited")
                 time.sleep(90)
                 continue
 
@@ -56,15 +157,26 @@ class JobStorageManager:
     """A class for managing new and existing job posts and their Google Sheets
     interactions."""
 
-    def __init__(self, spreadsheet_name: str):
+    def __init__(self, spreadsheet_name: str, browser_manager=None):
         self.gsheet_mgr = GoogleSheetManager(spreadsheet_name)
-        self.browser_manager = BrowserManager()
+        self._browser_manager = browser_manager
+
+    @property
+    def browser_manager(self):
+        # the browser stack is only imported by stages that use a browser
+        if self._browser_manager is None:
+            from helper_classes import BrowserManager
+
+            self._browser_manager = BrowserManager()
+        return self._browser_manager
 
     def find_inactive_jobposts(self):
+        from helper_classes import ElementFinder
+
         log_big_separator(logger, "FIND INACTIVE JOBPOSTS")
         start_time = time.time()
 
-        def _is_jobpost_inactive(driver: WebDriver) -> bool:
+        def _is_jobpost_inactive(driver: "WebDriver") -> bool:
             is_jobpost_inactive = 0
             try:
                 ele_text = (
@@ -100,8 +212,10 @@ class JobStorageManager:
                 jobpage_not_reached = 1
                 while jobpage_not_reached:
                     try:
-                        self.browser_manager.driver.get(row["href"])
+                        with metrics.timer("page_load"):
+                            self.browser_manager.driver.get(row["href"])
                     except Exception:
+                        metrics.increment("page_load.failed")
                         continue
 
                     try:
@@ -125,6 +239,8 @@ class JobStorageManager:
                             continue
                 time.sleep(5)
 
+            metrics.increment("rows.checked_liveness", df.shape[0])
+            metrics.increment("rows.inactive", int((df["is_active"] == 0).sum()))
             log_small_separator(logger, "Domain completed")
 
             self.gsheet_mgr.update_google_worksheet(ws, df)
@@ -159,7 +275,9 @@ class JobStorageManager:
 
             # delete archived rows from the active worksheet
             updated_archived_id_list = df_archive_updated["id"].tolist()
-            df_active = df_active[~df_active["id"].isin(updated_archived_id_list)]
+            is_archived = df_active["id"].isin(updated_archived_id_list)
+            metrics.increment("rows.archived", int(is_archived.sum()))
+            df_active = df_active[~is_archived]
 
             self.gsheet_mgr.update_google_worksheet(ws_a, df_active)
 
@@ -172,7 +290,7 @@ class JobStorageManager:
         jh_archive = JobStorageManager(spreadsheet_name="Job_radar_inaktiv")
 
         # archive new, inactive jobposts
-        if ws_idx:
+        if ws_idx is not None:
             ws_ina = jh_archive.gsheet_mgr.sheet.worksheets()[ws_idx + 1]
             _update_archive_worksheet(ws_idx, ws_ina)
         else:
@@ -234,6 +352,7 @@ class JobStorageManager:
             df_updated = df_new
 
         self.gsheet_mgr.update_google_worksheet(ws, df_updated)
+        metrics.increment("rows.stored", df_new.shape[0])
         return
 
 
@@ -244,97 +363,86 @@ class JobPostOrganizer:
         self.gsheet_mgr = GoogleSheetManager(spreadsheet_name)
 
     def determine_df_destination_indices(
-        self, df_source: pd.DataFrame, df_source_idx: int
-    ) -> pd.DataFrame:
-        # find out if any job post belong to another dataframe
-        df_destination = [
-            (
-                0
-                if (any(keyword in title for keyword in DOMAIN_MARKERS[0][0]))
-                else (
-                    1
-                    if any(keyword in title for keyword in DOMAIN_MARKERS[1][0])
-                    else (
-                        2
-                        if (
-                            any(keyword in title for keyword in DOMAIN_MARKERS[2][0])
-                            and any(
-                                keyword not in title for keyword in DOMAIN_MARKERS[2][1]
-                            )
-                        )
-                        else (
-                            3
-                            if any(keyword in title for keyword in DOMAIN_MARKERS[3][0])
-                            else (
-                                4
-                                if (
-                                    any(
-                                        keyword in title
-                                        for keyword in DOMAIN_MARKERS[4][0]
-                                    )
-                                    and any(
-                                        keyword not in title
-                                        for keyword in DOMAIN_MARKERS[4][1]
-                                    )
-                                )
-                                else (
-                                    5
-                                    if any(
-                                        keyword in title
-                                        for keyword in DOMAIN_MARKERS[5][0]
-                                    )
-                                    else df_source_idx
-                                )
-                            )
-                        )
-                    )
-                )
-            )
-            for title in df_source["jobpost_title"]
+        self, df_source: pd.DataFrame, df_source_idx
+    ) -> np.ndarray:
+        """Find the domain each job post belongs to according to the domain
+        markers. Job posts matching no domain stay in their source domain, which
+        can be given either as one index or as an index per row."""
+
+        def _contains_any(titles: pd.Series, keywords: List[str]) -> np.ndarray:
+            if not keywords:
+                return np.zeros(len(titles), dtype=bool)
+            pattern = "|".join(re.escape(keyword) for keyword in keywords)
+            return titles.str.contains(pattern, regex=True).to_numpy()
+
+        def _contains_all(titles: pd.Series, keywords: List[str]) -> np.ndarray:
+            is_all_found = np.ones(len(titles), dtype=bool)
+            for keyword in keywords:
+                is_all_found &= titles.str.contains(keyword, regex=False).to_numpy()
+            return is_all_found
+
+        titles = df_source["jobpost_title"].fillna("").astype(str)
+
+        # domain 2 and 4 also require that not all of their exclusion markers
+        # are present in the title
+        conditions = [
+            _contains_any(titles, DOMAIN_MARKERS[0][0]),
+            _contains_any(titles, DOMAIN_MARKERS[1][0]),
+            _contains_any(titles, DOMAIN_MARKERS[2][0])
+            & ~_contains_all(titles, DOMAIN_MARKERS[2][1]),
+            _contains_any(titles, DOMAIN_MARKERS[3][0]),
+            _contains_any(titles, DOMAIN_MARKERS[4][0])
+            & ~_contains_all(titles, DOMAIN_MARKERS[4][1]),
+            _contains_any(titles, DOMAIN_MARKERS[5][0]),
         ]
-        return df_destination
+        default = np.broadcast_to(np.asarray(df_source_idx), len(titles))
+        return np.select(conditions, list(range(len(conditions))), default=default)
 
-    def move_jobposts(
+    def repartition_jobposts(
         self, df_all_domains_list: List[pd.DataFrame]
     ) -> List[pd.DataFrame]:
-        for df_source_idx, df_source in enumerate(df_all_domains_list):
-            # find out if any jobpost belong to another dataframe
-            df_dest_idx_list = self.determine_df_destination_indices(
-                df_source, df_source_idx
-            )
+        """Move job posts to the domain they belong to and remove duplicates.
 
-            # move any wrong placed jobposts and remove from source df
-            for row_idx, row in df_source.iterrows():
-                df_dest = df_all_domains_list[df_dest_idx_list[row_idx]]
-                if (
-                    df_source_idx != df_dest_idx_list[row_idx]
-                    and row["id"] not in df_dest["id"].tolist()
-                ):
-                    logger.info("\nJobpost moved\n")
-                    row["jobpost_title"] += " - [moved]"
-                    df_all_domains_list[df_dest_idx_list[row_idx]] = pd.concat(
-                        [df_dest, pd.DataFrame([row])], ignore_index=True
-                    )
-                    df_all_domains_list[df_source_idx] = df_source.drop(
-                        row_idx
-                    ).reset_index(drop=True)
-        return df_all_domains_list
+        All domains are combined into one frame, the destination domain of every
+        job post is determined in one pass and duplicated IDs are resolved by
+        grouping on the ID, so the cost grows linearly with the number of posts.
+        For each ID the job post already placed in its destination domain is
+        kept, otherwise the first found copy is moved there."""
 
-    def remove_duplicates(
-        self, df_all_domains_list: List[pd.DataFrame]
-    ) -> List[pd.DataFrame]:
-        all_ids_list = [id_val for df in df_all_domains_list for id_val in df["id"]]
-
-        df_all_domains_list_updated = []
-        for df_domain in df_all_domains_list:
-            for row_idx, row in df_domain.iterrows():
-                if (all_ids_list.count(row["id"]) > 1) and (
-                    " - [moved]" not in row["jobpost_title"]
-                ):
-                    logger.info("\nDuplicate removed\n")
-                    df_domain = df_domain.drop(row_idx)
-            df_all_domains_list_updated.append(df_domain)
-        return df_all_domains_list_updated
+        num_domains = len(df_all_domains_list)
+        df_all = pd.concat(
+            df_all_domains_list, keys=range(num_domains), names=["source_domain"]
+        )
+        df_all = df_all.reset_index(level="source_domain").reset_index(drop=True)
+        if df_all.empty:
+            return [df.copy() for df in df_all_domains_list]
+
+        source_domain = df_all.pop("source_domain").to_numpy()
+        dest_domain = self.determine_df_destination_indices(df_all, source_domain)
+        is_misplaced = source_domain != dest_domain
+
+        # keep one job post per ID - correctly placed job posts are preferred
+        priority = pd.DataFrame(
+            {"id": df_all["id"], "is_misplaced": is_misplaced}
+        ).sort_values("is_misplaced", kind="stable")
+        is_kept = ~priority.duplicated(subset="id", keep="first").sort_index()
+        is_kept = is_kept.to_numpy() | df_all["id"].isna().to_numpy()
+        logger.info(f"Duplicates removed: {int((~is_kept).sum())}")
+
+        # mark moved job posts
+        is_moved = is_kept & is_misplaced
+        moved_titles = df_all.loc[is_moved, "jobpost_title"].astype(str)
+        df_all.loc[is_moved, "jobpost_title"] = moved_titles.where(
+            moved_titles.str.endswith(" - [moved]"), moved_titles + " - [moved]"
+        )
+        logger.info(f"Jobposts moved: {int(is_moved.sum())}")
+
+        df_all = df_all[is_kept]
+        dest_domain = dest_domain[is_kept]
+        return [
+            df_all[dest_domain == domain_idx].reset_index(drop=True)
+            for domain_idx in range(num_domains)
+        ]
 
     def reorganize_jobposts(self):
         """
@@ -350,8 +458,7 @@ class JobPostOrganizer:
             for ws in self.gsheet_mgr.sheet.worksheets()[1:]
         ]
 
-        df_all_domains_list_updated = self.move_jobposts(df_all_domains_list)
-        df_all_domains_list_updated = self.remove_duplicates(df_all_domains_list)
+        df_all_domains_list_updated = self.repartition_jobposts(df_all_domains_list)
 
         for domain_idx, df_domain in enumerate(df_all_domains_list_updated):
             ws = self.gsheet_mgr.sheet.worksheets()[domain_idx + 1]
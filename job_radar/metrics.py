@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Pipeline metrics
+############################################################################
+"""
+Lightweight timers and counters of the pipeline stages, page loads, WebDriver
+calls, Google Sheets API calls, translations and processed rows. The metrics of
+a run are written to the metrics directory, both as a json file per run (to
+track trends over time) and as a Prometheus textfile (job_radar.prom), which is
+overwritten each run and can be picked up by the node exporter's textfile
+collector.
+
+    with metrics.timer("sheets.read"):
+        ...
+    metrics.increment("rows.rated", df.shape[0])
+"""
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters and timers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.timers: Dict[str, Dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timer = self.timers.setdefault(
+                name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            timer["count"] += 1
+            timer["total_seconds"] += seconds
+            timer["max_seconds"] = max(timer["max_seconds"], seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time)
+
+    def timed(self, name: str):
+        """Decorator timing each call of a function."""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {name: dict(timer) for name, timer in self.timers.items()},
+            }
+
+    def merge(self, snapshot: Dict):
+        """Add the metrics of another registry, e.g. of a worker process."""
+        for name, value in snapshot["counters"].items():
+            self.increment(name, value)
+        with self._lock:
+            for name, other in snapshot["timers"].items():
+                timer = self.timers.setdefault(
+                    name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+                )
+                timer["count"] += other["count"]
+                timer["total_seconds"] += other["total_seconds"]
+                timer["max_seconds"] = max(timer["max_seconds"], other["max_seconds"])
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def to_prometheus(self, run_timestamp: float) -> str:
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP job_radar_duration_seconds Time spent per operation in the last run.",
+            "# TYPE job_radar_duration_seconds summary",
+        ]
+        for name, timer in sorted(snapshot["timers"].items()):
+            lines.append(
+                f'job_radar_duration_seconds_sum{{operation="{name}"}} '
+                f'{timer["total_seconds"]:.6f}'
+            )
+            lines.append(
+                f'job_radar_duration_seconds_count{{operation="{name}"}} '
+                f'{timer["count"]}'
+            )
+        lines += [
+            "# HELP job_radar_duration_seconds_max Slowest call per operation in the last run.",
+            "# TYPE job_radar_duration_seconds_max gauge",
+        ]
+        for name, timer in sorted(snapshot["timers"].items()):
+            lines.append(
+                f'job_radar_duration_seconds_max{{operation="{name}"}} '
+                f'{timer["max_seconds"]:.6f}'
+            )
+        lines += [
+            "# HELP job_radar_events Number of events in the last run.",
+            "# TYPE job_radar_events gauge",
+        ]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'job_radar_events{{event="{name}"}} {value:g}')
+        lines += [
+            "# HELP job_radar_last_run_timestamp_seconds Start time of the last run.",
+            "# TYPE job_radar_last_run_timestamp_seconds gauge",
+            f"job_radar_last_run_timestamp_seconds {run_timestamp:.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+_run_start_time = time.time()
+
+
+def get_metrics_directory() -> str:
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    project_directory = os.path.dirname(script_directory)
+    metrics_directory = os.path.join(project_directory, "metrics")
+    os.makedirs(metrics_directory, exist_ok=True)
+    return metrics_directory
+
+
+def export_run_metrics(stage: str = "all"):
+    """Write the metrics of this run as json and as a Prometheus textfile."""
+    metrics_directory = get_metrics_directory()
+    run_datetime = datetime.fromtimestamp(_run_start_time)
+
+    run_file_name = f"run_{run_datetime.strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    with open(os.path.join(metrics_directory, run_file_name), "w") as f:
+        json.dump(
+            {
+                "stage": stage,
+                "started": run_datetime.isoformat(),
+                "duration_seconds": time.time() - _run_start_time,
+                **metrics.snapshot(),
+            },
+            f,
+            indent=2,
+        )
+
+    # write to a temporary file first, so the collector never reads a partial file
+    textfile_path = os.path.join(metrics_directory, "job_radar.prom")
+    with open(textfile_path + ".tmp", "w") as f:
+        f.write(metrics.to_prometheus(_run_start_time))
+    os.replace(textfile_path + ".tmp", textfile_path)
+
+    logger.info(f"Metrics written to {run_file_name}")
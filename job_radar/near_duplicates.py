@@ -0,0 +1,148 @@
+import os
+import re
+import pickle
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+import logging
+
+import numpy as np
+import pandas as pd
+
+from local_storage import get_local_storage_path
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Near-duplicate detection of job posts
+############################################################################
+"""
+Recruiters often repost the same job under a new ID or for another city. Job
+posts are therefore compared on their descriptions: each description is split
+into word shingles, summarized by a MinHash signature and inserted into a
+locality sensitive hashing (LSH) index. Only job posts sharing at least one LSH
+band with a new job post are compared, so a lookup does not grow with the
+number of indexed job posts.
+"""
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 16
+SIMILARITY_THRESHOLD = 0.8
+
+# universal hashing (a * x + b) % p with a < 2^31 and 32 bit shingle hashes,
+# so that the products fit in unsigned 64 bit integers
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingle_description(text: str, shingle_size: int = SHINGLE_SIZE) -> Set[int]:
+    """Split a text into hashed shingles of consecutive, normalized words."""
+    words = _WORD_PATTERN.findall(str(text).lower())
+    if len(words) < shingle_size:
+        return {zlib.crc32(" ".join(words).encode())} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i : i + shingle_size]).encode())
+        for i in range(len(words) - shingle_size + 1)
+    }
+
+
+def compute_minhash_signature(shingles: Set[int]) -> np.ndarray:
+    if not shingles:
+        return np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint64)
+    hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME
+    return permuted.min(axis=0)
+
+
+def estimate_similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two shingle sets from their signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+
+class NearDuplicateIndex:
+    """LSH index of MinHash signatures of job post descriptions, persisted
+    between runs so new job posts are matched against both active and archived
+    job posts."""
+
+    def __init__(self, file_name: str = "near_duplicate_index.pkl"):
+        self.file_path = get_local_storage_path(file_name)
+        self.rows_per_band = NUM_PERMUTATIONS // NUM_BANDS
+        self.signatures: Dict[int, np.ndarray] = {}
+        self.buckets: List[Dict[bytes, Set[int]]] = [
+            defaultdict(set) for _ in range(NUM_BANDS)
+        ]
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, "rb") as f:
+                self.signatures, self.buckets = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Near-duplicate index could not be loaded: {e}")
+
+    def save(self):
+        with open(self.file_path, "wb") as f:
+            pickle.dump((self.signatures, self.buckets), f)
+        logger.info(f"Near-duplicate index saved - {len(self.signatures)} job posts")
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, job_id: int) -> bool:
+        return job_id in self.signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[i * self.rows_per_band : (i + 1) * self.rows_per_band].tobytes()
+            for i in range(NUM_BANDS)
+        ]
+
+    def add(self, job_id: int, description: str):
+        if job_id in self.signatures:
+            return
+        signature = compute_minhash_signature(shingle_description(description))
+        self.signatures[job_id] = signature
+        for band_idx, band_key in enumerate(self._band_keys(signature)):
+            self.buckets[band_idx][band_key].add(job_id)
+
+    def add_dataframe(self, df: pd.DataFrame):
+        for job_id, description in zip(df["id"], df["description"]):
+            if pd.notna(job_id) and isinstance(description, str):
+                self.add(int(job_id), description)
+
+    def find_near_duplicate(self, job_id: int, description: str) -> Optional[int]:
+        """Return the ID of the most similar, indexed job post if it is a near
+        duplicate of the given job post - otherwise None. A job post is never
+        considered a duplicate of itself."""
+
+        signature = compute_minhash_signature(shingle_description(description))
+        candidates = set()
+        for band_idx, band_key in enumerate(self._band_keys(signature)):
+            candidates |= self.buckets[band_idx].get(band_key, set())
+        candidates.discard(job_id)
+
+        best_id, best_similarity = None, SIMILARITY_THRESHOLD
+        for candidate_id in candidates:
+            similarity = estimate_similarity(signature, self.signatures[candidate_id])
+            if similarity >= best_similarity:
+                best_id, best_similarity = candidate_id, similarity
+        return best_id
+
+
+def seed_near_duplicate_index(index: NearDuplicateIndex):
+    """Index every stored job post, both active and archived."""
+    from manage_jobposts import GoogleSheetManager
+
+    for spreadsheet_name in ["Job_radar_aktiv", "Job_radar_inaktiv"]:
+        gsheet_mgr = GoogleSheetManager(spreadsheet_name)
+        for ws in gsheet_mgr.sheet.worksheets()[1:]:
+            index.add_dataframe(gsheet_mgr.get_worksheet_as_dataframe(ws))
+    logger.info(f"Near-duplicate index seeded - {len(index)} job posts")
@@ -0,0 +1,255 @@
+import time
+import sqlite3
+import smtplib
+import threading
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from local_storage import get_local_storage_path
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Outbox of cool job notifications
+############################################################################
+"""
+Notifications are enqueued in a persistent outbox, so enqueueing never blocks a
+pipeline stage on the mail server and a failed delivery is never lost. A
+background sender coalesces the due notifications into digest emails, sends
+them over one SMTP connection, retries failed deliveries with exponential
+backoff and records the delivered job post IDs.
+
+The SMTP server is configured by google_email_config (smtp_host, smtp_port,
+starttls). To test without sending real emails, run a local debugging server
+
+    python -m aiosmtpd -n -l localhost:1025
+
+and use smtp_host "localhost", smtp_port 1025 and starttls False.
+benchmarks/bench_notification_outbox checks delivery, backoff and
+de-duplication against a local SMTP sink.
+"""
+
+DEFAULT_SMTP_CONFIG = {
+    "smtp_host": "smtp.gmail.com",
+    "smtp_port": 587,
+    "starttls": True,
+}
+
+
+def compose_digest(
+    cool_jobs: List[Tuple], sender_email: str, receiver_email: str
+) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = sender_email
+    msg["To"] = receiver_email
+    msg["Subject"] = f"Cool jobs found: {str(len(cool_jobs))}"
+
+    body = f"Cool jobs found: \n -------------------"
+    for job in cool_jobs:
+        body += f"\n{job}\n"
+    body += f"-------------------"
+    msg.attach(MIMEText(body, "plain"))
+    return msg
+
+
+class NotificationOutbox:
+    """Persistent outbox of cool job notifications with a background sender."""
+
+    def __init__(
+        self,
+        file_name: str = "notification_outbox.sqlite",
+        email_config: Optional[Dict] = None,
+        max_jobs_per_digest: int = 25,
+        send_interval: float = 10.0,
+        backoff_base: float = 30.0,
+        max_backoff: float = 3600.0,
+    ):
+        if email_config is None:
+            from config.tokens import google_email_config
+
+            email_config = google_email_config
+        self.email_config = {**DEFAULT_SMTP_CONFIG, **email_config}
+        self.file_path = get_local_storage_path(file_name)
+        self.max_jobs_per_digest = max_jobs_per_digest
+        self.send_interval = send_interval
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+
+        self.num_digests_sent = 0
+        self.num_failed_attempts = 0
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._sender_thread = None
+
+        with self._connect() as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS outbox (
+                    job_id TEXT PRIMARY KEY,
+                    jobpost_title TEXT,
+                    enqueued_at REAL,
+                    attempts INTEGER,
+                    next_attempt_at REAL,
+                    delivered_at REAL
+                )"""
+            )
+
+    @contextmanager
+    def _connect(self):
+        # a connection per call, since the outbox is used from several threads
+        connection = sqlite3.connect(self.file_path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def enqueue(self, cool_jobs: List[Tuple]):
+        """Add notifications of (job_id, jobpost_title) to the outbox. Job posts
+        already in the outbox are ignored."""
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO outbox VALUES (?, ?, ?, 0, ?, NULL)",
+                [(str(job_id), str(title), now, now) for job_id, title in cool_jobs],
+            )
+        logger.info(f"Notifications enqueued: {len(cool_jobs)}")
+
+    def get_pending_jobs(self) -> List[Tuple[str, str]]:
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT job_id, jobpost_title FROM outbox "
+                "WHERE delivered_at IS NULL ORDER BY enqueued_at"
+            ).fetchall()
+
+    def get_delivered_ids(self) -> List[str]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT job_id FROM outbox WHERE delivered_at IS NOT NULL"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _open_smtp_connection(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(
+            self.email_config["smtp_host"], self.email_config["smtp_port"], timeout=60
+        )
+        if self.email_config["starttls"]:
+            server.starttls()
+        if self.email_config.get("password"):
+            server.login(self.email_config["email"], self.email_config["password"])
+        return server
+
+    def _mark_delivered(self, job_ids: List[str]):
+        with self._connect() as connection:
+            connection.executemany(
+                "UPDATE outbox SET delivered_at = ? WHERE job_id = ?",
+                [(time.time(), job_id) for job_id in job_ids],
+            )
+
+    def _reschedule(self, jobs: List[Tuple[str, str, int]]):
+        now = time.time()
+        self.num_failed_attempts += 1
+        with self._connect() as connection:
+            connection.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE job_id = ?",
+                [
+                    (
+                        attempts + 1,
+                        now + min(self.backoff_base * 2**attempts, self.max_backoff),
+                        job_id,
+                    )
+                    for job_id, _, attempts in jobs
+                ],
+            )
+
+    def deliver_due(self) -> int:
+        """Send all due notifications as digests over one SMTP connection.
+        Returns the number of delivered notifications."""
+        with self._connect() as connection:
+            due_jobs = connection.execute(
+                "SELECT job_id, jobpost_title, attempts FROM outbox "
+                "WHERE delivered_at IS NULL AND next_attempt_at <= ? "
+                "ORDER BY enqueued_at",
+                (time.time(),),
+            ).fetchall()
+        if not due_jobs:
+            return 0
+
+        digests = [
+            due_jobs[i : i + self.max_jobs_per_digest]
+            for i in range(0, len(due_jobs), self.max_jobs_per_digest)
+        ]
+        try:
+            server = self._open_smtp_connection()
+        except Exception as e:
+            logger.error(f"Error connecting to the mail server: {str(e)}")
+            self._reschedule(due_jobs)
+            return 0
+
+        sender_email = self.email_config["email"]
+        receiver_email = self.email_config.get("receiver", sender_email)
+        num_delivered = 0
+        try:
+            for digest in digests:
+                msg = compose_digest(
+                    [(job_id, title) for job_id, title, _ in digest],
+                    sender_email,
+                    receiver_email,
+                )
+                try:
+                    server.sendmail(sender_email, receiver_email, msg.as_string())
+                except Exception as e:
+                    logger.error(f"Error sending email: {str(e)}")
+                    self._reschedule(digest)
+                    continue
+                self._mark_delivered([job_id for job_id, _, _ in digest])
+                self.num_digests_sent += 1
+                num_delivered += len(digest)
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+        logger.info(f"Email sent successfully - notifications: {num_delivered}")
+        return num_delivered
+
+    def _run_sender(self):
+        while True:
+            try:
+                self.deliver_due()
+            except Exception as e:
+                logger.error(f"Notification sender failed: {str(e)}")
+            if self._stop_event.is_set():
+                return
+            self._wake_event.wait(self.send_interval)
+            self._wake_event.clear()
+
+    def start(self):
+        """Start the background sender."""
+        self._stop_event.clear()
+        self._sender_thread = threading.Thread(
+            target=self._run_sender, name="notification_sender", daemon=True
+        )
+        self._sender_thread.start()
+
+    def stop(self, timeout: Optional[float] = 120):
+        """Make a last delivery attempt of the due notifications and stop the
+        background sender. Undelivered notifications stay in the outbox until
+        the next run."""
+        if self._sender_thread is None:
+            return
+        self._stop_event.set()
+        self._wake_event.set()
+        self._sender_thread.join(timeout)
+        self._sender_thread = None
+        self.log_statistics()
+
+    def log_statistics(self):
+        logger.info(
+            f"Notification outbox - digests sent: {self.num_digests_sent} "
+            f"- failed attempts: {self.num_failed_attempts} "
+            f"- pending: {len(self.get_pending_jobs())}"
+        )
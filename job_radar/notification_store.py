@@ -0,0 +1,96 @@
+import os
+import json
+from typing import Dict, List, Set, Tuple
+import logging
+
+from local_storage import get_local_storage_path
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Store of cool job notifications
+############################################################################
+"""
+The rating stage records job posts crossing the cool job threshold as pending
+notifications. Once mailed, their IDs are moved to the set of notified IDs, so
+each job post is mailed at most once - without reading any sheets.
+"""
+
+
+def _make_key(job_id) -> str:
+    # IDs read from sheets may be floats (e.g. 3812345678.0)
+    try:
+        return str(int(float(job_id)))
+    except (TypeError, ValueError):
+        return str(job_id)
+
+
+class NotificationStore:
+    """Set of notified job post IDs and pending cool jobs, persisted as json."""
+
+    def __init__(self, file_name: str = "notification_store.json"):
+        self.file_path = get_local_storage_path(file_name)
+        self.notified_ids: Set[str] = set()
+        self.pending_jobs: Dict[str, str] = {}
+        self.is_new = not os.path.exists(self.file_path)
+        self.load()
+
+    def load(self):
+        if self.is_new:
+            return
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                content = json.load(f)
+            self.notified_ids = set(content["notified_ids"])
+            self.pending_jobs = content["pending_jobs"]
+        except Exception as e:
+            logger.error(f"Notification store could not be loaded: {e}")
+
+    def save(self):
+        # write to a temporary file first, so a crash never leaves a partial store
+        tmp_file_path = self.file_path + ".tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "notified_ids": sorted(self.notified_ids),
+                    "pending_jobs": self.pending_jobs,
+                },
+                f,
+                indent=1,
+            )
+        os.replace(tmp_file_path, self.file_path)
+        self.is_new = False
+
+    def __contains__(self, job_id) -> bool:
+        return _make_key(job_id) in self.notified_ids
+
+    def add_cool_job(self, job_id, jobpost_title: str) -> bool:
+        """Record a job post crossing the cool job threshold. Returns whether it
+        is a new pending notification."""
+        key = _make_key(job_id)
+        if key in self.notified_ids or key in self.pending_jobs:
+            return False
+        self.pending_jobs[key] = str(jobpost_title)
+        return True
+
+    def get_pending_jobs(self) -> List[Tuple[str, str]]:
+        return list(self.pending_jobs.items())
+
+    def mark_notified(self, job_ids: List):
+        for job_id in job_ids:
+            key = _make_key(job_id)
+            self.notified_ids.add(key)
+            self.pending_jobs.pop(key, None)
+
+
+def seed_notification_store(store: NotificationStore):
+    """Mark every job post in the legacy Mails_send sheet as notified."""
+    from manage_jobposts import GoogleSheetManager
+
+    gsheet_mgr = GoogleSheetManager("Mails_send")
+    df = gsheet_mgr.get_worksheet_as_dataframe(
+        gsheet_mgr.sheet.worksheets()[0], id_column="ID"
+    )
+    store.mark_notified(df["ID"].dropna().tolist())
+    store.save()
+    logger.info(f"Notification store seeded - {len(store.notified_ids)} job posts")
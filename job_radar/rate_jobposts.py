@@ -1,37 +1,123 @@
 import re
 import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import List, Union, Tuple
+from typing import Dict, List, Optional, Union, Tuple
 import logging
 
+import numpy as np
 import pandas as pd
-import langid
-from googletrans import Translator
-from deep_translator import GoogleTranslator
-import datefinder
-from nltk.tokenize import sent_tokenize
 
 from manage_jobposts import JobStorageManager
+from translation_cache import TranslationCache
+from rating_cache import RatingCache
+from keyword_scoring import KeywordScorer
+from deadline_extraction import DeadlineExtractor
+from experience_extraction import extract_years_of_experience
+from similarity_scoring import load_reference_profiles, score_similarity
+from notification_store import NotificationStore, seed_notification_store
+from metrics import metrics
+from jobpost_schema import SCORE_COLUMNS
 from config.score_markers import score_markers
 from log_helpers import log_big_separator, log_small_separator
 
 logger = logging.getLogger(__name__)
 
+# number of job posts sent to a rating worker at a time
+RATING_CHUNK_SIZE = 50
+
+# translation cache of a rating worker process - set by _init_rating_worker
+_worker_translation_cache = None
+
+# inputs that the static rating components depend on - a change in any of these,
+# or in the score markers, requires the job post to be rated again
+STATIC_RATING_ATTRIBUTES = [
+    "description",
+    "num_applicants",
+    "Industries",
+    "Job function",
+    "Seniority level",
+]
+SCORE_MARKERS_VERSION = hashlib.sha1(repr(score_markers).encode()).hexdigest()
+STATIC_RATING_VERSION = 3
+
+# keyword logs needed to render the scoreboard - not exported to the worksheet
+SCORE_LOG_COLUMNS = {
+    "General Score": "general_score_log",
+    "Competence Score": "competence_score_log",
+}
+
+
+############################################################################
+# Lazily loaded language models
+############################################################################
+"""
+The language identification model is slow to import and load, so it is only
+loaded - once per process - when a job post is actually rated. Stages that do not
+rate job posts never pay for it.
+"""
+
+
+@lru_cache(maxsize=None)
+def get_language_identifier():
+    import langid
+
+    return langid
+
 
 def detect_language(text: str) -> str:
-    lang, confidence = langid.classify(text)
+    lang, confidence = get_language_identifier().classify(text)
     return lang
 
 
 def translate_text(text: str, target_language="en") -> str:
+    from googletrans import Translator
+
     translator = Translator()
     translation = translator.translate(text, dest=target_language)
     return translation.text
 
 
+def translate_description(
+    description: str,
+    language: str,
+    translation_cache: TranslationCache,
+    job_id=None,
+    target_language="en",
+) -> str:
+    """Translate a job post description, reusing earlier translations of the same
+    text. Texts longer than the translator limit are translated in chunks."""
+
+    translated_description = translation_cache.get(
+        description, language, target_language
+    )
+    if translated_description is not None:
+        return translated_description
+
+    from deep_translator import GoogleTranslator
+
+    translator = GoogleTranslator(source=language, target=target_language)
+    chunk_size = 4999
+    chunks = [
+        description[i : i + chunk_size] for i in range(0, len(description), chunk_size)
+    ]
+    with metrics.timer("translation"):
+        translated_description = " ".join(translator.translate(x) for x in chunks)
+    metrics.increment("translation.characters", len(description))
+    logger.info("Language translated")
+
+    translation_cache.put(
+        description, language, target_language, translated_description, job_id
+    )
+    return translated_description
+
+
 def find_application_deadline(text: str) -> List[Union[datetime, str, None]]:
     """Find application deadline from job description, if it exists, using regular
     expressions and assumptions on how the deadline is presented in the text."""
+    import datefinder
 
     def _find_date_or_date_list(text: str) -> List[Union[datetime, str]]:
         # remove chars that can prevent datefinder finding dates
@@ -109,18 +195,67 @@ def find_application_deadline(text: str) -> List[Union[datetime, str, None]]:
         return "N/A"
 
 
-def is_valid_date_format(date_string):
-    try:
-        datetime.strptime(date_string, "%d-%m-%Y")
-        return True
-    except ValueError:
-        return False
-
+def find_years_of_experience(text: str) -> int:
+    # find statements regarding number of years of experience
+    required_experience = extract_years_of_experience(text)
+    if required_experience is None:
+        return 0
+    return required_experience.min_years
+
+
+@lru_cache(maxsize=None)
+def get_keyword_scorer() -> KeywordScorer:
+    """Compile the general and competence keyword markers once per process."""
+    return KeywordScorer([score_markers[0], score_markers[1]])
+
+
+@lru_cache(maxsize=None)
+def get_deadline_extractor() -> DeadlineExtractor:
+    return DeadlineExtractor()
+
+
+def batch_keyword_scoring(
+    descriptions: List[str],
+) -> List[Optional[Dict[str, Dict]]]:
+    """Provide the general and competence scores of a batch of descriptions at
+    once. The scores are identical to the ones of static_keyword_scoring.
+
+    Without pyahocorasick, scoring one description at a time is faster, so no
+    scores are given and static_keyword_scoring finds them itself."""
+
+    keyword_scorer = get_keyword_scorer()
+    if keyword_scorer.automaton is None:
+        return [None] * len(descriptions)
+    group_scores, score_logs = keyword_scorer.score(descriptions)
+    general_scores = group_scores[:, 0].tolist()
+    competence_scores = group_scores[:, 1].tolist()
+
+    keyword_score_list = []
+    for idx, description in enumerate(descriptions):
+        num_years_exp = find_years_of_experience(description)
+        competence_score = competence_scores[idx] - 10 * int(num_years_exp)
+        keyword_score_list.append(
+            {
+                "General Score": {
+                    "score": general_scores[idx] * 3,
+                    "score_log": score_logs[0][idx],
+                },
+                "Competence Score": {
+                    "score": competence_score * 2,
+                    "score_log": score_logs[1][idx] + f"num_years_exp: {num_years_exp}",
+                    "num_years_exp": num_years_exp,
+                },
+            }
+        )
+    return keyword_score_list
 
-def keyword_matching_scoring(row: pd.Series, current_domain) -> Tuple[int, str]:
-    """Provide scores to job posts based on simply keyword matching.
 
-    Returns the total score and a scorebard (string) containing the score details."""
+def static_keyword_scoring(
+    row: pd.Series, current_domain, keyword_scores: Dict[str, Dict] = None
+) -> Dict[str, Dict]:
+    """Provide the scores of a job post that only depend on its description and
+    attributes - i.e. all scores except the age score. The keyword based general
+    and competence scores can be given if already found by batch_keyword_scoring."""
 
     def calc_general_score(text: str):
         general_score, score_log = 0, ""
@@ -131,35 +266,19 @@ def keyword_matching_scoring(row: pd.Series, current_domain) -> Tuple[int, str]:
         return {"score": general_score * 3, "score_log": score_log}
 
     def calc_competence_score(text: str):
-        def _find_year_of_experience(text):
-            # find statements regarding number of years of experience
-            sentences = sent_tokenize(text)
-            years_of_experience = 0
-            for sentence in sentences:
-                if "experience" in sentence.lower() and "years" in sentence.lower():
-                    try:
-                        years_of_experience = int(re.findall(r"\b\d+\b", sentence)[0])
-                    except Exception:
-                        try:
-                            if re.findall(r"couple of years", sentence)[0]:
-                                years_of_experience = 2
-                        except Exception:
-                            pass
-
-            if years_of_experience >= 10:
-                years_of_experience = 0
-
-            return years_of_experience
-
         competence_score, score_log = 0, ""
         for key, score in score_markers[1].items():
             if key in text:
                 competence_score += score
                 score_log += f"{key} + "
-        num_years_exp = _find_year_of_experience(text)
+        num_years_exp = find_years_of_experience(text)
         competence_score -= 10 * int(num_years_exp)
         score_log += f"num_years_exp: {num_years_exp}"
-        return {"score": competence_score * 2, "score_log": score_log}
+        return {
+            "score": competence_score * 2,
+            "score_log": score_log,
+            "num_years_exp": num_years_exp,
+        }
 
     def calc_domain_score(domain: str):
         score = 0
@@ -170,7 +289,10 @@ def keyword_matching_scoring(row: pd.Series, current_domain) -> Tuple[int, str]:
     def calc_num_applicant_score(num_applicants: int):
         for range_, score in score_markers[3].items():
             lower_bound, upper_bound = range_
-            if lower_bound <= num_applicants <= upper_bound:
+            if (
+                pd.notna(num_applicants)
+                and lower_bound <= num_applicants <= upper_bound
+            ):
                 break
         return {"score": score, "score_log": str(num_applicants)}
 
@@ -192,32 +314,41 @@ def keyword_matching_scoring(row: pd.Series, current_domain) -> Tuple[int, str]:
             seniority_score += score_markers[6][senioritylevel]
         return {"score": seniority_score * 2, "score_log": f"{senioritylevel}"}
 
-    def calc_age_score(date_str: str):
-        date = datetime.strptime(date_str, "%Y-%m-%d")
-        current_date = date.now()
-        age = current_date - date
-        weeks_difference = age.days // 7
-        if weeks_difference > max(score_markers[7].keys()):
-            age_score = 4
-        else:
-            age_score = score_markers[7][weeks_difference]
-        return {"score": age_score, "score_log": f"{weeks_difference}"}
-
-    def _scoreboard_update(scoreboard: str, key: str, score_info: str) -> str:
-        scoreboard += f"{key} : {score_info['score']}\n"
-        scoreboard += score_info["score_log"]
-        scoreboard += "\n--------------------\n"
-        return scoreboard
-
     score_list = {}
-    score_list["General Score"] = calc_general_score(row["description"])
-    score_list["Competence Score"] = calc_competence_score(row["description"])
+    if keyword_scores is None:
+        score_list["General Score"] = calc_general_score(row["description"])
+        score_list["Competence Score"] = calc_competence_score(row["description"])
+    else:
+        score_list.update(keyword_scores)
     score_list["Domain Score"] = calc_domain_score(current_domain)
     score_list["# Applicants Score"] = calc_num_applicant_score(row["num_applicants"])
     score_list["Industry Score"] = calc_industry_score(row["Industries"])
     score_list["Job Function Score"] = calc_jobfunction_score(row["Job function"])
     score_list["Seniority Score"] = calc_seniority_score(row["Seniority level"])
-    score_list["Age Score"] = calc_age_score(row["date"])
+    return score_list
+
+
+def calc_age_score(date_str: Union[str, datetime]) -> Dict:
+    date = pd.to_datetime(date_str, format="%Y-%m-%d").to_pydatetime()
+    current_date = date.now()
+    age = current_date - date
+    weeks_difference = age.days // 7
+    if weeks_difference > max(score_markers[7].keys()):
+        age_score = 4
+    else:
+        age_score = score_markers[7][weeks_difference]
+    return {"score": age_score, "score_log": f"{weeks_difference}"}
+
+
+def compose_scoreboard(score_list: Dict[str, Dict]) -> Tuple[int, str]:
+    """Sum the score components and render the scoreboard (string) containing
+    the score details."""
+
+    def _scoreboard_update(scoreboard: str, key: str, score_info: str) -> str:
+        scoreboard += f"{key} : {score_info['score']}\n"
+        scoreboard += score_info["score_log"]
+        scoreboard += "\n--------------------\n"
+        return scoreboard
 
     total_score, scoreboard = 0, ""
     for key, score_info in score_list.items():
@@ -226,126 +357,361 @@ def keyword_matching_scoring(row: pd.Series, current_domain) -> Tuple[int, str]:
     return total_score, scoreboard
 
 
-def evaluate_if_active(deadline_date, industry_score_markers, df, row_idx):
-    job_inactive = False
+def keyword_matching_scoring(row: pd.Series, current_domain) -> Tuple[int, str]:
+    """Provide scores to job posts based on simply keyword matching.
+
+    Returns the total score and a scorebard (string) containing the score details."""
+
+    score_list = static_keyword_scoring(row, current_domain)
+    score_list["Age Score"] = calc_age_score(row["date"])
+    return compose_scoreboard(score_list)
+
+
+def calc_age_scores(dates: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Vectorized calc_age_score - returns the age in weeks and the age scores."""
+    age = datetime.now() - pd.to_datetime(dates, format="%Y-%m-%d")
+    age_weeks = age.dt.days // 7
+    age_scores = age_weeks.map(score_markers[7])
+    age_scores = age_scores.where(age_weeks <= max(score_markers[7].keys()), 4)
+    return age_weeks.astype("Int64"), pd.to_numeric(age_scores).astype("Int64")
+
 
+def add_score_columns(df: pd.DataFrame, static_rating_list: List[Dict]) -> pd.DataFrame:
+    """Store deadline, years of experience and each score component of the job
+    posts as typed columns and sum up the total score."""
+
+    df["deadline"] = [rating["deadline"] for rating in static_rating_list]
+    df["num_years_exp"] = pd.array(
+        [
+            rating["score_list"]["Competence Score"]["num_years_exp"]
+            for rating in static_rating_list
+        ],
+        dtype="Int64",
+    )
+    for key, column in SCORE_COLUMNS.items():
+        if key == "Age Score":
+            df["age_weeks"], df[column] = calc_age_scores(df["date"])
+        else:
+            df[column] = pd.to_numeric(
+                [rating["score_list"][key]["score"] for rating in static_rating_list]
+            )
+    for key, column in SCORE_LOG_COLUMNS.items():
+        df[column] = [
+            rating["score_list"][key]["score_log"] for rating in static_rating_list
+        ]
+
+    df["score"] = df[list(SCORE_COLUMNS.values())].sum(axis=1)
+    return df
+
+
+@lru_cache(maxsize=None)
+def get_industry_keepers() -> Tuple[str]:
     # industries to always include
-    industries = list(industry_score_markers.keys())
-    industry_keepers = [industries[i] for i in [1, 2, 3, 13, 29, 30, 31]]
-
-    # Retrieve the number of years of experience - if 2 or more -> inactive
-    pattern = r"num_years_exp: (\d+)"
-    match = re.search(pattern, df.loc[row_idx, "score_details"])
-    if (
-        match
-        and int(match.group(1)) >= 3
-        and df.loc[row_idx, "Industries"] not in industry_keepers
-    ):
-        df.loc[row_idx, "is_active"] = 0
-        job_inactive = True
-
-    # If deadline is after the current date or num applicants +110 -> inactive
-    if (
-        is_valid_date_format(deadline_date)
-        and (
-            datetime.strptime(deadline_date, "%d-%m-%Y").date() < datetime.now().date()
-            or df.loc[row_idx, "num_applicants"] > 110
+    industries = list(score_markers[4].keys())
+    return tuple(industries[i] for i in [1, 2, 3, 13, 29, 30, 31])
+
+
+def evaluate_activity_mask(df: pd.DataFrame) -> pd.Series:
+    """Find the job posts that should be marked inactive: 3 or more years of
+    experience required, a passed deadline or more than 110 applicants (if the
+    deadline is known) - unless the job post is in an industry to always include."""
+
+    is_keeper = df["Industries"].isin(get_industry_keepers())
+
+    is_too_experienced = (df["num_years_exp"] >= 3).fillna(False)
+
+    deadline = pd.to_datetime(df["deadline"], format="%d-%m-%Y", errors="coerce")
+    is_deadline_passed = deadline < pd.Timestamp(datetime.now().date())
+    is_crowded = pd.to_numeric(df["num_applicants"], errors="coerce") > 110
+    is_closed = deadline.notna() & (is_deadline_passed | is_crowded)
+
+    return ~is_keeper & (is_too_experienced | is_closed)
+
+
+def render_scoreboard(df: pd.DataFrame, current_domain: str) -> List[str]:
+    """Render the scoreboard (string) containing the score details of each job
+    post from its score columns, as done by compose_scoreboard."""
+
+    score_log_columns = {
+        "General Score": df[SCORE_LOG_COLUMNS["General Score"]],
+        "Competence Score": df[SCORE_LOG_COLUMNS["Competence Score"]],
+        "Domain Score": pd.Series(current_domain, index=df.index),
+        "# Applicants Score": df["num_applicants"],
+        "Industry Score": df["Industries"],
+        "Job Function Score": df["Job function"],
+        "Seniority Score": df["Seniority level"],
+        "Age Score": df["age_weeks"],
+    }
+
+    scoreboards = [""] * df.shape[0]
+    for key, column in SCORE_COLUMNS.items():
+        for idx, (score, score_log) in enumerate(
+            zip(df[column].tolist(), score_log_columns[key].tolist())
+        ):
+            scoreboards[idx] += f"{key} : {score}\n{score_log}\n--------------------\n"
+    return scoreboards
+
+
+def translate_to_english(row: pd.Series, translation_cache: TranslationCache) -> str:
+    # if description not in englist, tranlate it for uniform rate processing
+    description = row["description"]
+    language = detect_language(description)
+    if language != "en":
+        description = translate_description(
+            description, language, translation_cache, row["id"]
         )
-        and df.loc[row_idx, "Industries"] not in industry_keepers
-    ):
-        df.loc[row_idx, "is_active"] = 0
-        job_inactive = True
+    return description
+
+
+def rate_static_components_of_row(
+    row: pd.Series,
+    current_domain: str,
+    description_en: str,
+    keyword_scores: Dict[str, Dict],
+) -> Dict:
+    """Rate the static components of one job post, given its description in
+    english and its keyword scores from batch_keyword_scoring."""
+    return {
+        "deadline": get_deadline_extractor().extract(description_en),
+        "score_list": static_keyword_scoring(row, current_domain, keyword_scores),
+    }
+
+
+def rate_static_components(
+    df: pd.DataFrame, current_domain: str, translation_cache: TranslationCache
+) -> List[Dict]:
+    """Rate the parts of the job posts that only depend on their descriptions and
+    attributes: the application deadline and all scores except the age score."""
+
+    keyword_score_list = batch_keyword_scoring(df["description"].tolist())
+
+    static_rating_list = []
+    for (_, row), keyword_scores in zip(df.iterrows(), keyword_score_list):
+        description_en = translate_to_english(row, translation_cache)
+        static_rating_list.append(
+            rate_static_components_of_row(
+                row, current_domain, description_en, keyword_scores
+            )
+        )
+    return static_rating_list
+
 
-    return df, job_inactive
+def _init_rating_worker():
+    """Load language model and score markers once per rating worker process."""
+    global _worker_translation_cache
 
+    detect_language("warm up")
+    get_keyword_scorer()
+    get_deadline_extractor()
+    _worker_translation_cache = TranslationCache()
+
+
+def _rate_static_components_chunk(
+    chunk: Tuple[pd.DataFrame, str]
+) -> Tuple[List[Dict], int, int, Dict]:
+    df, current_domain = chunk
+    metrics.reset()
+    num_hits = _worker_translation_cache.num_hits
+    num_misses = _worker_translation_cache.num_misses
+    static_rating_list = rate_static_components(
+        df, current_domain, _worker_translation_cache
+    )
+    return (
+        static_rating_list,
+        _worker_translation_cache.num_hits - num_hits,
+        _worker_translation_cache.num_misses - num_misses,
+        metrics.snapshot(),
+    )
+
+
+def rate_static_components_in_parallel(
+    task_list: List[Tuple[pd.DataFrame, str]],
+    translation_cache: TranslationCache,
+    num_workers: int,
+) -> List[List[Dict]]:
+    """Rate the static components of several frames of job posts (with their
+    domain) by sending chunks of rows to a pool of worker processes. The results
+    are identical to rate_static_components."""
+
+    chunk_list, chunk_task_idx_list = [], []
+    for task_idx, (df, current_domain) in enumerate(task_list):
+        for start in range(0, df.shape[0], RATING_CHUNK_SIZE):
+            chunk_list.append(
+                (df.iloc[start : start + RATING_CHUNK_SIZE], current_domain)
+            )
+            chunk_task_idx_list.append(task_idx)
+
+    static_rating_lists = [[] for _ in task_list]
+    with ProcessPoolExecutor(
+        max_workers=num_workers, initializer=_init_rating_worker
+    ) as executor:
+        for task_idx, (static_rating_list, num_hits, num_misses, snapshot) in zip(
+            chunk_task_idx_list,
+            executor.map(_rate_static_components_chunk, chunk_list),
+        ):
+            static_rating_lists[task_idx].extend(static_rating_list)
+            translation_cache.num_hits += num_hits
+            translation_cache.num_misses += num_misses
+            metrics.merge(snapshot)
+    return static_rating_lists
+
+
+def score_similarity_of_worksheets(
+    df_list: List[pd.DataFrame], profile_texts: List[str]
+) -> List[np.ndarray]:
+    """Score the similarity of all active job posts to the reference profiles
+    with one TF-IDF model fitted over the descriptions of all worksheets."""
+    descriptions = pd.concat([df["description"] for df in df_list]).fillna("")
+    similarity = score_similarity(descriptions.tolist(), profile_texts)
+    split_indices = np.cumsum([df.shape[0] for df in df_list])[:-1]
+    return np.split(similarity, split_indices)
+
+
+def find_cool_jobs_mask(
+    df: pd.DataFrame, cool_score: int, cool_similarity: Optional[float] = None
+) -> pd.Series:
+    """Find the active job posts with a score above cool_score - or, if
+    cool_similarity is given, a similarity score above it."""
+    is_cool = df["score"] > cool_score
+    if cool_similarity is not None and "similarity_score" in df:
+        is_cool |= df["similarity_score"] > cool_similarity
+    return is_cool & (df["is_active"] != 0)
+
+
+def rate_all_jobpost(
+    num_workers: int = 1,
+    use_similarity: bool = True,
+    cool_score: int = 50,
+    cool_similarity: Optional[float] = None,
+):
+    """Rate all active job posts. With more than one worker, the static rating
+    components of new or changed job posts in all worksheets are rated in
+    parallel by a pool of worker processes. If reference profiles are given in
+    config/reference_profiles, the similarity of each job post to them is
+    written to the similarity_score column. Job posts crossing the cool job
+    threshold are recorded as pending notifications."""
 
-def rate_all_jobpost():
     log_big_separator(logger, "RATING JOBPOSTS")
     start_time = time.time()
 
     job_storage_manager = JobStorageManager(spreadsheet_name="Job_radar_aktiv")
+    translation_cache = TranslationCache()
+    rating_cache = RatingCache()
+    notification_store = NotificationStore()
+    if notification_store.is_new:
+        seed_notification_store(notification_store)
+
+    worksheets = job_storage_manager.gsheet_mgr.sheet.worksheets()[1:]
+    df_list = [
+        job_storage_manager.gsheet_mgr.get_worksheet_as_dataframe(worksheet)
+        for worksheet in worksheets
+    ]
+
+    similarity_lists = None
+    profile_texts = load_reference_profiles() if use_similarity else []
+    if profile_texts:
+        similarity_lists = score_similarity_of_worksheets(df_list, profile_texts)
+
+    # only rate static components of new or changed job posts
+    rating_keys_list, static_rating_lists, missing_idx_lists = [], [], []
+    for worksheet, df in zip(worksheets, df_list):
+        rating_keys = [
+            RatingCache.make_key(
+                worksheet.title,
+                SCORE_MARKERS_VERSION,
+                STATIC_RATING_VERSION,
+                list(values),
+            )
+            for values in df[STATIC_RATING_ATTRIBUTES].itertuples(index=False)
+        ]
+        static_rating_list = [rating_cache.get(key) for key in rating_keys]
+        rating_keys_list.append(rating_keys)
+        static_rating_lists.append(static_rating_list)
+        missing_idx_lists.append(
+            [idx for idx, rating in enumerate(static_rating_list) if rating is None]
+        )
 
-    for ws_idx, worksheet in enumerate(
-        job_storage_manager.google_sheet_manager.sheet.worksheets()[1:]
-    ):
-        df = job_storage_manager.google_sheet_manager.get_worksheet_as_dataframe(
-            worksheet
+    task_list = [
+        (df.iloc[missing_idx_list], worksheet.title)
+        for worksheet, df, missing_idx_list in zip(
+            worksheets, df_list, missing_idx_lists
+        )
+    ]
+    logger.info(
+        f"Job posts to rate: {sum(task[0].shape[0] for task in task_list)} "
+        f"/ {sum(df.shape[0] for df in df_list)} - workers: {num_workers}"
+    )
+    metrics.increment("rows.rated", sum(df.shape[0] for df in df_list))
+    metrics.increment("rows.rated_static", sum(task[0].shape[0] for task in task_list))
+    if num_workers > 1:
+        new_rating_lists = rate_static_components_in_parallel(
+            task_list, translation_cache, num_workers
         )
+    else:
+        new_rating_lists = [
+            rate_static_components(df_missing, current_domain, translation_cache)
+            for df_missing, current_domain in task_list
+        ]
 
+    inactive_ws_idx_list = []
+    for ws_idx, (worksheet, df) in enumerate(zip(worksheets, df_list)):
         logger.info("Rating of worksheet job posts started")
-        inactive_jobs_found = False
-        for row_idx, row in df.iterrows():
-            # if description not in englist, tranlate it for uniform rate processing
-            description = row["description"]
-            language = detect_language(description)
-            if len(description) > 5000 and language != "en":
-                language = detect_language(description)
-                chunk_size = 4999
-                chunks = [
-                    description[i : i + chunk_size]
-                    for i in range(0, len(description), chunk_size)
-                ]
-                chunks_translated = [
-                    GoogleTranslator(source=language, target="en").translate(x)
-                    for x in chunks
-                ]
-                description = " ".join(chunks_translated)
-                logger.info("Language translated")
-            elif language != "en":
-                description = GoogleTranslator(source=language, target="en").translate(
-                    description
-                )
-                logger.info("Language translated")
-
-            # finding application deadline
-            deadline_date = find_application_deadline(description)
-            df.loc[row_idx, "deadline"] = deadline_date
-
-            current_domain = worksheet.title
-
-            # rating based on simple keyword matching
-            total_score, scoreboard = keyword_matching_scoring(row, current_domain)
-            df.loc[row_idx, "score"] = total_score
-            df.loc[row_idx, "score_details"] = scoreboard
-
-            # Evalulate if jobpost should be marked inactive
-            df, job_inactive = evaluate_if_active(
-                deadline_date, score_markers[4], df, row_idx
+        static_rating_list = static_rating_lists[ws_idx]
+        for idx, static_rating in zip(
+            missing_idx_lists[ws_idx], new_rating_lists[ws_idx]
+        ):
+            static_rating_list[idx] = static_rating
+            rating_cache.put(
+                rating_keys_list[ws_idx][idx], static_rating, df["id"].iloc[idx]
             )
-            if job_inactive:
-                inactive_jobs_found = True
+        rating_cache.commit()
+
+        df = add_score_columns(df, static_rating_list)
+        if similarity_lists is not None:
+            df["similarity_score"] = similarity_lists[ws_idx]
+
+        # Evalulate if jobposts should be marked inactive
+        inactive_mask = evaluate_activity_mask(df)
+        df.loc[inactive_mask, "is_active"] = 0
+        if inactive_mask.any():
+            inactive_ws_idx_list.append(ws_idx)
+
+        cool_jobs = df[find_cool_jobs_mask(df, cool_score, cool_similarity)]
+        for job_id, jobpost_title in zip(cool_jobs["id"], cool_jobs["jobpost_title"]):
+            if notification_store.add_cool_job(job_id, jobpost_title):
+                logger.info(f"Cool job found: {job_id} - {jobpost_title}")
 
         logger.info("Updating worksheet job posts with ratings")
+        df["score_details"] = render_scoreboard(df, worksheet.title)
+        df = df.drop(columns=list(SCORE_LOG_COLUMNS.values()))
         df = df.sort_values(by="score", ascending=False)
-        job_storage_manager.google_sheet_manager.update_google_worksheet(worksheet, df)
-        if inactive_jobs_found:
-            job_storage_manager.archive_inactive_jobposts(ws_idx)
+        job_storage_manager.gsheet_mgr.update_google_worksheet(worksheet, df)
 
-    job_storage_manager.google_sheet_manager.sheet.worksheets()[0].update(
+    # archive once all worksheets are updated, since all were read up front
+    for ws_idx in inactive_ws_idx_list:
+        job_storage_manager.archive_inactive_jobposts(ws_idx)
+
+    job_storage_manager.gsheet_mgr.sheet.worksheets()[0].update(
         "B1", str(datetime.now())
     )
 
+    translation_cache.log_statistics()
+    translation_cache.close()
+    rating_cache.log_statistics()
+    rating_cache.close()
+    notification_store.save()
+
     completion_time = time.time() - start_time
     log_small_separator(
         logger, f"All job posts rated - completion time {completion_time}"
     )
 
 
-def check_for_cool_jobs(cool_score: int) -> List[str]:
+def check_for_cool_jobs(notification_store: NotificationStore) -> List[Tuple]:
+    """Return the cool jobs recorded by the rating stage, not yet notified about."""
     log_small_separator(logger, "checking for cool jobs")
 
-    job_storage_manager = JobStorageManager(spreadsheet_name="Job_radar_aktiv")
-    cool_job_list = []
-    for worksheet in job_storage_manager.google_sheet_manager.sheet.worksheets()[1:]:
-        df = job_storage_manager.google_sheet_manager.get_worksheet_as_dataframe(
-            worksheet
-        )
-        cool_job_list.extend(
-            [
-                (row["id"], row["jobpost_title"])
-                for _, row in df.iterrows()
-                if row["score"] > cool_score
-            ]
-        )
+    cool_job_list = notification_store.get_pending_jobs()
+    logger.info(f"Cool jobs pending notification: {len(cool_job_list)}")
 
     return cool_job_list
@@ -0,0 +1,83 @@
+import time
+import json
+import sqlite3
+import hashlib
+from typing import Dict, Optional
+import logging
+
+import pandas as pd
+
+from local_storage import get_local_storage_path
+
+logger = logging.getLogger(__name__)
+
+
+class RatingCache:
+    """A persistent cache of the static rating components of job posts.
+
+    The static components (keyword scores, competence, industry, job function,
+    seniority, deadline etc.) only depend on the description and attributes of a
+    job post, so they are keyed by a hash of those inputs and of the score
+    markers in use. Entries not used for max_age_days are evicted."""
+
+    def __init__(self, file_name: str = "rating_cache.sqlite", max_age_days: int = 60):
+        self.max_age_days = max_age_days
+        self.num_hits = 0
+        self.num_misses = 0
+
+        self.connection = sqlite3.connect(get_local_storage_path(file_name))
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS ratings (
+                key TEXT PRIMARY KEY,
+                job_id INTEGER,
+                static_rating TEXT,
+                last_used REAL
+            )"""
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(*inputs) -> str:
+        serialized_inputs = json.dumps(inputs, default=str, sort_keys=True)
+        return hashlib.sha1(serialized_inputs.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.connection.execute(
+            "SELECT static_rating FROM ratings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.num_misses += 1
+            return None
+
+        self.num_hits += 1
+        self.connection.execute(
+            "UPDATE ratings SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        return json.loads(row[0])
+
+    def put(self, key: str, static_rating: Dict, job_id: Optional[int] = None):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO ratings VALUES (?, ?, ?, ?)",
+            (
+                key,
+                None if pd.isna(job_id) else int(job_id),
+                json.dumps(static_rating, default=str),
+                time.time(),
+            ),
+        )
+
+    def commit(self):
+        """Persist pending changes and evict entries that have not been used for
+        a long time, e.g. ratings of archived job posts."""
+        oldest_allowed = time.time() - self.max_age_days * 24 * 3600
+        self.connection.execute(
+            "DELETE FROM ratings WHERE last_used < ?", (oldest_allowed,)
+        )
+        self.connection.commit()
+
+    def log_statistics(self):
+        logger.info(f"Rating cache - hits: {self.num_hits} - misses: {self.num_misses}")
+
+    def close(self):
+        self.commit()
+        self.connection.close()
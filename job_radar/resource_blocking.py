@@ -0,0 +1,191 @@
+import os
+import json
+from fnmatch import fnmatch
+from typing import Dict, List, NamedTuple, Optional
+import logging
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Lean browsing by blocking resources
+############################################################################
+"""
+The scraper only needs the DOM of the search result list and of the job details,
+so images, fonts, media and tracking requests are blocked through the Chrome
+DevTools Protocol (Network.setBlockedURLs). Blocking rules are given as resource
+types - matched by file extension - and URL patterns with * wildcards, and can
+be overridden in config/resource_blocking.json with the keys of
+DEFAULT_BLOCKING_RULES.
+
+URLs matching the allowlist are never blocked: a blocking pattern overlapping
+an allowlisted pattern is dropped. The allowlist keeps the scripts and the guest
+API that lazily load more jobs into the search result list. Stylesheets are not
+blocked by default, since WebElement.text only returns visible text.
+
+The transferred bytes and load time of each page are read from the Performance
+API and recorded as metrics per mode (lean or full). Cross-origin resources
+without a Timing-Allow-Origin header report no size, so the bytes are a lower
+bound. compare_page_loads loads pages in both modes to report the savings.
+"""
+
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+    "stylesheet": ["*.css*"],
+}
+
+DEFAULT_BLOCKING_RULES = {
+    "resource_types": ["image", "font", "media"],
+    "url_patterns": [
+        "*media.licdn.com/*",
+        "*px.ads.linkedin.com/*",
+        "*linkedin.com/li/track*",
+        "*linkedin.com/litms/*",
+        "*doubleclick.net/*",
+        "*google-analytics.com/*",
+        "*googletagmanager.com/*",
+        "*googlesyndication.com/*",
+        "*facebook.net/*",
+    ],
+    "allowlist": [
+        "*linkedin.com/jobs-guest/jobs/api/*",
+        "*linkedin.com/jobs/search*",
+        "*linkedin.com/jobs/view/*",
+        "*static.licdn.com/*.js",
+    ],
+}
+
+PAGE_LOAD_STATS_SCRIPT = """
+const navigation = performance.getEntriesByType("navigation")[0];
+const resources = performance.getEntriesByType("resource");
+let transferBytes = navigation ? navigation.transferSize : 0;
+for (const resource of resources) {
+    transferBytes += resource.transferSize;
+}
+return {
+    transfer_bytes: transferBytes,
+    num_resources: resources.length,
+    load_seconds: navigation ? navigation.duration / 1000 : null,
+};
+"""
+
+
+class PageLoadStats(NamedTuple):
+    transfer_bytes: int
+    num_resources: int
+    load_seconds: Optional[float]
+
+
+def load_blocking_rules() -> Dict[str, List[str]]:
+    """The default blocking rules, updated with config/resource_blocking.json"""
+    project_directory = os.path.dirname(os.path.abspath(__file__))
+    rules_path = os.path.join(project_directory, "config", "resource_blocking.json")
+    rules = dict(DEFAULT_BLOCKING_RULES)
+    if os.path.exists(rules_path):
+        with open(rules_path, encoding="utf-8") as f:
+            rules.update(json.load(f))
+    return rules
+
+
+def compile_blocked_url_patterns(rules: Dict[str, List[str]]) -> List[str]:
+    """Turn the rules into URL patterns, without those overlapping the allowlist"""
+    patterns = list(rules.get("url_patterns", []))
+    for resource_type in rules.get("resource_types", []):
+        patterns += RESOURCE_TYPE_PATTERNS[resource_type]
+
+    allowlist = rules.get("allowlist", [])
+    blocked_url_patterns = []
+    for pattern in patterns:
+        overlapping = [
+            allowed
+            for allowed in allowlist
+            if fnmatch(allowed, pattern) or fnmatch(pattern, allowed)
+        ]
+        if overlapping:
+            logger.warning(
+                f"Blocking of {pattern} dropped - allowlisted: {overlapping}"
+            )
+            continue
+        blocked_url_patterns.append(pattern)
+    return blocked_url_patterns
+
+
+class ResourceBlocker:
+    """Blocks resources of the pages loaded by a driver and measures the pages."""
+
+    def __init__(self, driver: WebDriver, rules: Optional[Dict[str, List[str]]] = None):
+        self.driver = driver
+        self.blocked_url_patterns = compile_blocked_url_patterns(
+            load_blocking_rules() if rules is None else rules
+        )
+        self.is_enabled = False
+
+    def enable(self):
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": self.blocked_url_patterns}
+        )
+        self.is_enabled = True
+        logger.info(
+            f"Resource blocking enabled - patterns: {len(self.blocked_url_patterns)}"
+        )
+
+    def disable(self):
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
+        self.is_enabled = False
+
+    def measure_page_load(self) -> PageLoadStats:
+        """Read the transferred bytes and load time of the current page and
+        record them as metrics of the current mode."""
+        stats = PageLoadStats(**self.driver.execute_script(PAGE_LOAD_STATS_SCRIPT))
+        mode = "lean" if self.is_enabled else "full"
+        metrics.increment(f"page.{mode}.pages")
+        metrics.increment(f"page.{mode}.transfer_bytes", stats.transfer_bytes)
+        metrics.increment(f"page.{mode}.resources", stats.num_resources)
+        if stats.load_seconds is not None:
+            metrics.observe(f"page.{mode}.load", stats.load_seconds)
+        return stats
+
+
+def compare_page_loads(blocker: ResourceBlocker, urls: List[str]) -> List[Dict]:
+    """Load each page in full and lean mode, with the browser cache disabled, and
+    return the bytes and time saved per page."""
+    was_enabled = blocker.is_enabled
+    blocker.driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+    comparisons = []
+    try:
+        for url in urls:
+            stats = {}
+            for mode, set_mode in [("full", blocker.disable), ("lean", blocker.enable)]:
+                set_mode()
+                blocker.driver.get(url)
+                stats[mode] = blocker.measure_page_load()
+            comparison = {
+                "url": url,
+                "bytes_saved": stats["full"].transfer_bytes
+                - stats["lean"].transfer_bytes,
+                "resources_saved": stats["full"].num_resources
+                - stats["lean"].num_resources,
+                "seconds_saved": (stats["full"].load_seconds or 0)
+                - (stats["lean"].load_seconds or 0),
+            }
+            logger.info(
+                f"{url} - saved {comparison['bytes_saved'] / 1e3:.0f} kB, "
+                f"{comparison['resources_saved']} resources, "
+                f"{comparison['seconds_saved']:.2f} s"
+            )
+            comparisons.append(comparison)
+    finally:
+        blocker.driver.execute_cdp_cmd(
+            "Network.setCacheDisabled", {"cacheDisabled": False}
+        )
+        if was_enabled:
+            blocker.enable()
+        else:
+            blocker.disable()
+    return comparisons
@@ -1,9 +1,10 @@
 import time
+import itertools
 import numpy as np
 import re
 import logging
-import sys
-from typing import Dict, List, Tuple
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
@@ -21,16 +22,32 @@ from config.scraping_paths import (
     PATHS_POPUP_BUTTONS,
     HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST,
 )
-from search_criteria import title_filtering, attribute_filtering, SEARCH_KEYWORDS
+from search_criteria import SEARCH_KEYWORDS
 from manage_jobposts import JobStorageManager
 from helper_classes import BrowserManager, ElementFinder
+from near_duplicates import NearDuplicateIndex, seed_near_duplicate_index
 from config.datastructure import DATACOLOUMNS
+from filter_rules import get_filter_rule_engine
+from jobpost_schema import apply_jobpost_dtypes
 from log_helpers import log_big_separator, log_small_separator
+from metrics import metrics
+from search_result_loader import (
+    ListedJobPost,
+    RateLimiter,
+    SearchResultLoader,
+    SeenJobPostIds,
+)
 
 
 logger = logging.getLogger(__name__)
 
 
+class ScrapeAbortedError(RuntimeError):
+    """Raised when scraping cannot continue, e.g. as a job page or the search
+    result list cannot be reached - ends the run, the daemon stage or the task
+    of a scrape worker, without exiting the process."""
+
+
 class PageLoader:
     """Class responsible for loading and preparing job search pages for scraping"""
 
@@ -90,7 +107,7 @@ class PageLoader:
                     )
                 except Exception as e:
                     logger.error(f"{e}")
-                    sys.exit()
+                    raise ScrapeAbortedError(f"End of joblist not found: {e}")
             if (
                 ele_txt == "You've viewed all jobs for this search"
                 or ele_txt == "Du har set alle jobbene for denne søgning"
@@ -155,6 +172,8 @@ class PageLoader:
                             time.sleep(1)
                             pass
 
+                    except ScrapeAbortedError:
+                        raise
                     except Exception:
                         self.page_scroll("up")
                         time.sleep(1)
@@ -170,18 +189,21 @@ class PageLoader:
 
         logger.info("Full joblist loaded")
 
-    def search_and_prepare_page_for_scraping(self, url):
+    def search_and_prepare_page_for_scraping(self, url, load_full_joblist=True):
         """
-        Search for jobs, wait for page loading and prepare for scraping.
+        Search for jobs, wait for page loading and prepare for scraping. The
+        joblist is only loaded in full by scrolling if load_full_joblist is set.
         """
         log_big_separator(logger, "Prepare page for scraping")
 
         self.driver.maximize_window()
-        self.driver.get(url)
+        with metrics.timer("page_load"):
+            self.driver.get(url)
 
         # check that a page with a joblist is retreived
         while 1:
-            self.driver.get(url)
+            with metrics.timer("page_load"):
+                self.driver.get(url)
             time.sleep(3)
             try:
                 self.element_finder.find_by_class("results-context-header")
@@ -202,9 +224,128 @@ class PageLoader:
             except NoSuchElementException as e:
                 pass
 
-        self.ensure_page_has_fully_loaded_joblist()
+        if load_full_joblist:
+            self.ensure_page_has_fully_loaded_joblist()
         return
 
+    def stream_listed_pages(
+        self,
+        kw_idx: int,
+        loc_idx: int,
+        is_known: Callable[[int], bool],
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> Optional[Iterator[List[ListedJobPost]]]:
+        """
+        Open the job search page and stream the listed job posts of each result
+        page, as the result pages are fetched directly. Falls back to loading the
+        full joblist in the page by scrolling, and returns None, if no result page
+        could be fetched.
+        """
+        self.search_and_prepare_page_for_scraping(
+            make_job_search_url(kw_idx, loc_idx), load_full_joblist=False
+        )
+        listed_pages = SearchResultLoader(self.driver, rate_limiter).iter_listed_pages(
+            kw_idx, loc_idx, is_known
+        )
+
+        # the first page tells whether the result pages can be fetched
+        first_page = next(listed_pages, None)
+        if first_page is None:
+            logger.warning("No result pages fetched - loading joblist by scrolling")
+            metrics.increment("search.scroll_fallbacks")
+            self.ensure_page_has_fully_loaded_joblist()
+            return None
+        return itertools.chain([first_page], listed_pages)
+
+    def load_listed_jobposts(
+        self,
+        kw_idx: int,
+        loc_idx: int,
+        is_known: Callable[[int], bool],
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> Optional[List[ListedJobPost]]:
+        """Load all listed job posts of the search - see stream_listed_pages"""
+        with metrics.timer("load_search_results"):
+            listed_pages = self.stream_listed_pages(
+                kw_idx, loc_idx, is_known, rate_limiter
+            )
+            if listed_pages is None:
+                return None
+            return [jobpost for page in listed_pages for jobpost in page]
+
+
+def parse_job_attributes(html: str) -> Dict:
+    """Parse the job attributes (title, company, location, number of applicants,
+    description and job criteria) from the html of an extended job post."""
+
+    # retreive individual job attributes from static html element using bs4
+    soup = BeautifulSoup(html, "html.parser")
+
+    logger.info(soup.text[:20])
+
+    job_attributes = [
+        "jobpost_title",
+        "company",
+        "location",
+        "num_applicants",
+        "description",
+    ]
+
+    attributes = {}
+    for att in job_attributes:
+        ele = soup.find(
+            HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST[att][0],
+            HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST[att][1],
+        )
+
+        if ele is None and att == "num_applicants":
+            ele = soup.find(
+                HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST["num_applicants_alt"][0],
+                HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST["num_applicants_alt"][1],
+            )
+
+        # choose suitable bs4 output
+        if att != "description":
+            content = ele.text
+        else:
+            content_list = ele.contents
+
+        # extract num applicants with regex
+        if att == "num_applicants":
+            content = re.findall(r"\d+\.\d+|\d+", content)[0].replace(".", "")
+
+        # convert description from html to text and clean
+        elif att == "description":
+            content = " ".join(
+                [BeautifulSoup(str(x), "html.parser").text for x in content_list]
+            )
+
+        # clean and format content
+        if att != "num_applicants":
+            val = content.strip().replace("\n", "").replace("*", "")
+        else:
+            val = int(content)
+
+        attributes[att] = val
+
+    # get job criteria attributes from span elements - number of elements vary
+    job_criteria_key_ele = soup.find_all(
+        JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_key"][0],
+        JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_key"][1],
+    )
+
+    job_criteria_val_el = soup.find_all(
+        JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_value"][0],
+        JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_value"][1],
+    )
+
+    for jdx, ele in enumerate(job_criteria_val_el):
+        clean_key = job_criteria_key_ele[jdx].text.strip().replace("\n", "")
+        clean_val = ele.text.strip().replace("\n", "")
+        attributes[clean_key] = clean_val
+
+    return attributes
+
 
 class JobElementHandler:
     """Class for handling job post elements in either listed or extended format."""
@@ -308,6 +449,15 @@ class JobElementHandler:
 
         return df
 
+    def stage_listed_jobpost(self, listed_jobpost: ListedJobPost, df, job_idx: int):
+        """Insert the metadata of a job post loaded from a result page"""
+        df.loc[job_idx] = [None] * len(df.columns)
+        df.loc[job_idx, "id"] = listed_jobpost.id
+        df.loc[job_idx, "is_active"] = 1
+        df.loc[job_idx, "date"] = listed_jobpost.date
+        df.loc[job_idx, "href"] = listed_jobpost.href
+        return df
+
     def scrape_job_attributes(self, df, job_idx) -> Dict:
         """Scrape job attributes from the extended job element"""
 
@@ -326,77 +476,8 @@ class JobElementHandler:
         except Exception as e:
             logger.error(f"Error: {e}")
 
-        # retreive individual job attributes from static html element using bs4
-        soup = BeautifulSoup(ele_outerHTML, "html.parser")
-
-        logger.info(soup.text[:20])
-
-        job_attributes = [
-            "jobpost_title",
-            "company",
-            "location",
-            "num_applicants",
-            "description",
-        ]
-
-        logger.info("Here2")
-
-        for att in job_attributes:
-            ele = soup.find(
-                HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST[att][0],
-                HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST[att][1],
-            )
-
-            if ele is None and att == "num_applicants":
-                ele = soup.find(
-                    HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST["num_applicants_alt"][0],
-                    HEADLESS_JOBATTRUBUTE_HTML_TAG_CLASS_LIST["num_applicants_alt"][1],
-                )
-
-            logger.info("Here3")
-
-            # choose suitable bs4 output
-            if att != "description":
-                content = ele.text
-            else:
-                content_list = ele.contents
-
-            # extract num applicants with regex
-            if att == "num_applicants":
-                content = re.findall(r"\d+\.\d+|\d+", content)[0].replace(".", "")
-
-            # convert description from html to text and clean
-            elif att == "description":
-                content = " ".join(
-                    [BeautifulSoup(str(x), "html.parser").text for x in content_list]
-                )
-
-            # clean and format content
-            if att != "num_applicants":
-                val = content.strip().replace("\n", "").replace("*", "")
-            else:
-                val = int(content)
-
-            logger.info("Here4")
-
-            df.loc[job_idx, att] = val
-
-        # get job criteria attributes from span elements - number of elements vary
-        job_criteria_key_ele = soup.find_all(
-            JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_key"][0],
-            JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_key"][1],
-        )
-
-        job_criteria_val_el = soup.find_all(
-            JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_value"][0],
-            JOBATTRUBUTE_HTML_TAG_CLASS_LIST["criteria_value"][1],
-        )
-
-        for jdx, ele in enumerate(job_criteria_val_el):
-            clean_key = job_criteria_key_ele[jdx].text.strip().replace("\n", "")
-            clean_val = ele.text.strip().replace("\n", "")
-            df.loc[job_idx, clean_key] = clean_val
-            logger.info("Here2")
+        for key, val in parse_job_attributes(ele_outerHTML).items():
+            df.loc[job_idx, key] = val
 
         expected_keys = [
             "Seniority level",
@@ -416,39 +497,87 @@ class JobElementHandler:
 
 
 class ScrapeHandler:
-    def __init__(self, browser_manager, page_loader):
+    def __init__(self, browser_manager, page_loader, near_duplicate_index):
         self.driver = browser_manager.driver
         self.browser_manager = browser_manager
         self.page_loader = page_loader
+        self.near_duplicate_index = near_duplicate_index
         self.element_finder = ElementFinder(browser_manager.driver)
         self.job_ele_handler = JobElementHandler(browser_manager.driver)
+        self.filter_rule_engine = get_filter_rule_engine()
+
+    def iter_relevant_listed_jobposts(
+        self, search_idx: int, listed_pages: Iterable[List[ListedJobPost]]
+    ) -> Iterator[ListedJobPost]:
+        """Filter a stream of result pages on the titles of their job posts as
+        they are loaded - a page at once - skipping job posts that are already
+        known."""
+        log_big_separator(logger, "Retreiving relevant results")
+
+        num_listed, num_relevant = 0, 0
+        for page in listed_pages:
+            num_listed += len(page)
+            is_relevant_list = self.filter_rule_engine.filter_titles(
+                [listed_jobpost.title for listed_jobpost in page], search_idx
+            )
+            for listed_jobpost, is_relevant in zip(page, is_relevant_list):
+                if not is_relevant or listed_jobpost.id in self.near_duplicate_index:
+                    continue
+                num_relevant += 1
+                yield listed_jobpost
+
+        logger.info(f"Number of relevant results: {num_relevant} / {num_listed}")
 
     def extract_relevant_search_results(
-        self, search_idx: int, df_new_jobposts
+        self,
+        search_idx: int,
+        df_new_jobposts,
+        listed_jobposts: Optional[Iterable[ListedJobPost]] = None,
     ) -> Tuple[List[int], List[int]]:
         """Extract the relevant listed job elements based on title filtering.
+        The job posts loaded from the result pages are filtered instead of the
+        job elements of the page, if given.
 
         Returns a list of the search list idx of the relevant job posting and
         a list of their IDs.
         """
+        if listed_jobposts is not None:
+            for listed_jobpost in self.iter_relevant_listed_jobposts(
+                search_idx, [list(listed_jobposts)]
+            ):
+                df_new_jobposts = self.job_ele_handler.stage_listed_jobpost(
+                    listed_jobpost, df_new_jobposts, len(df_new_jobposts)
+                )
+            return df_new_jobposts
 
         def _retreive_relevant_result_idx(
             job_element_list: List[WebElement], current_domain_idx: int, df_new_jobposts
         ) -> Tuple[List[int], List[str]]:
             log_big_separator(logger, "Retreiving relevant results")
 
+            titles = [
+                JobElementHandler(job_ele_driver)
+                .element_finder.find_by_class("base-search-card__title")
+                .text
+                for job_ele_driver in job_element_list
+            ]
+            is_relevant_list = self.filter_rule_engine.filter_titles(
+                titles, current_domain_idx
+            )
+
             num_relevant = 0
-            for job_ele_driver in job_element_list:
-                job_ele_handler = JobElementHandler(job_ele_driver)
-                title = job_ele_handler.element_finder.find_by_class(
-                    "base-search-card__title"
-                ).text
-                if title_filtering(title, current_domain_idx):
+            for job_ele_driver, is_relevant in zip(job_element_list, is_relevant_list):
+                if is_relevant:
                     # scrape metadata from listed job element
                     df_new_jobposts = self.job_ele_handler.scrape_metadata(
                         job_ele_driver, df_new_jobposts
                     )
 
+                    # skip job posts that are already known
+                    if df_new_jobposts.iloc[-1]["id"] in self.near_duplicate_index:
+                        df_new_jobposts = df_new_jobposts.iloc[:-1]
+                        continue
+
                     num_relevant += 1
 
             logger.info(
@@ -477,22 +606,127 @@ class ScrapeHandler:
         log_small_separator(logger, "Staging jobpost for storage")
 
         # only store job positions that fulfill designated criteria
-        if not attribute_filtering(df_new_jobposts, job_idx):
+        if not self.filter_rule_engine.filter_attributes(
+            df_new_jobposts.loc[[job_idx]]
+        )[0]:
             df_new_jobposts = df_new_jobposts.drop(job_idx)
         else:
-            logger.info("\nJob collected")
+            # collapse reposts of already known jobs before they are stored and rated
+            job_id = int(df_new_jobposts.loc[job_idx, "id"])
+            description = str(df_new_jobposts.loc[job_idx, "description"])
+            duplicate_id = self.near_duplicate_index.find_near_duplicate(
+                job_id, description
+            )
+            if duplicate_id is not None:
+                logger.info(f"\nJob is a near-duplicate of {duplicate_id} - skipped")
+                df_new_jobposts = df_new_jobposts.drop(job_idx)
+            else:
+                self.near_duplicate_index.add(job_id, description)
+                logger.info("\nJob collected")
 
         logger.info(str(job_idx + 1) + " / " + str(num_relevant_results) + "\n")
         return df_new_jobposts
 
-    def scrape_search_results(self, search_idx: int):
-        """Find, scrape and store relevant job posts."""
+    def go_to_jobpage(self, href: str, max_attempts: int = 5) -> bool:
+        """Load an extended job page, starting a new browser session if the
+        browser crashes. Returns False if the page was not reached."""
+        jobpage_not_reached = 1
+        attempts = 0
+        while jobpage_not_reached:
+            logger.warning("Search for jobpage")
+            try:
+                start_time = time.perf_counter()
+                with metrics.timer("page_load"):
+                    self.driver.get(href)
+                self.browser_manager.record_page_load(time.perf_counter() - start_time)
+            except WebDriverException:
+                logger.error("Browser crashed - starting new session")
+                metrics.increment("browser.crashed")
+                self.browser_manager.record_crash()
+                self.driver.save_screenshot("screenshots/crash1.png")
+                self.browser_manager.start_browser_session()
+                pass
+            time.sleep(3)
+            try:
+                ElementFinder(self.driver).find_by_xpath(
+                    """//*[@id="main-content"]/section[1]/div/section[2]/div/div[1]"""
+                )
+                jobpage_not_reached = 0
+                self.browser_manager.measure_page_load()
+            except Exception:
+                # the job page is usually missing when LinkedIn blocks the profile
+                logger.warning("Did not find jobpage - retrying")
+                self.browser_manager.record_block()
+                try:
+                    self.driver.back()
+                    time.sleep(3)
+                    continue
+                except WebDriverException:
+                    logger.error("Browser crashed - starting new session")
+                    metrics.increment("browser.crashed")
+                    self.browser_manager.record_crash()
+                    self.driver.save_screenshot("screenshots/crash2.png")
+                    self.browser_manager.start_browser_session()
+                    pass
+            attempts += 1
+            if attempts >= max_attempts:
+                return False
+        return True
+
+    def _scrape_staged_jobpost(
+        self,
+        df_new_jobposts: pd.DataFrame,
+        job_idx: int,
+        num_relevant_results: int,
+        on_jobpost: Optional[Callable[[Dict], None]],
+    ) -> pd.DataFrame:
+        """Scrape the extended job page of a staged job post and filter it"""
+        log_small_separator(logger, "Scraping new job attributes")
+
+        # go to extended jobpage
+        if not self.go_to_jobpage(df_new_jobposts.loc[job_idx, "href"]):
+            logger.error("Exiting")
+            raise ScrapeAbortedError(
+                f"Job page not reached: {df_new_jobposts.loc[job_idx, 'href']}"
+            )
+        logger.info("Jobpage reached")
+
+        with metrics.timer("scrape_job_attributes"):
+            df_new_jobposts = self.job_ele_handler.scrape_job_attributes(
+                df_new_jobposts, job_idx
+            )
+        metrics.increment("rows.scraped")
+
+        df_new_jobposts = self.filter_jobpost(
+            df_new_jobposts, job_idx, num_relevant_results
+        )
+        if on_jobpost is not None and job_idx in df_new_jobposts.index:
+            on_jobpost(df_new_jobposts.loc[job_idx].to_dict())
+        return df_new_jobposts
+
+    def scrape_search_results(
+        self,
+        search_idx: int,
+        on_jobpost: Optional[Callable[[Dict], None]] = None,
+        listed_pages: Optional[Iterable[List[ListedJobPost]]] = None,
+    ):
+        """Find, scrape and store relevant job posts. Each collected job post is
+        also passed to on_jobpost as soon as it is scraped, if given.
+
+        A stream of result pages is scraped while it is loading, if given: the
+        job posts of each page are title filtered at once as the page is listed,
+        and their job pages are scraped in a separate tab right away."""
 
         logger.info("Start job scraping")
 
         # setup df for staging jobposts
         df_new_jobposts = pd.DataFrame(columns=DATACOLOUMNS)
 
+        if listed_pages is not None:
+            return self._scrape_listed_jobposts(
+                search_idx, df_new_jobposts, listed_pages, on_jobpost
+            )
+
         df_new_jobposts = self.extract_relevant_search_results(
             search_idx, df_new_jobposts
         )
@@ -501,76 +735,95 @@ class ScrapeHandler:
 
         # loop through the relevant jobpost elements
         for job_idx in np.arange(num_relevant_results):
-            log_small_separator(logger, "Scraping new job attributes")
-            # time.sleep(5)
-
-            # go to extended jobpage
-            jobpage_not_reached = 1
-            attempts = 0
-            while jobpage_not_reached:
-                logger.warning("Search for jobpage")
-                try:
-                    self.driver.get(df_new_jobposts.loc[job_idx, "href"])
-                except WebDriverException:
-                    logger.error("Browser crashed - starting new session")
-                    self.driver.save_screenshot("screenshots/crash1.png")
-                    self.browser_manager.start_browser_session()
-                    pass
-                time.sleep(3)
-                try:
-                    ElementFinder(self.driver).find_by_xpath(
-                        """//*[@id="main-content"]/section[1]/div/section[2]/div/div[1]"""
-                    )
-                    jobpage_not_reached = 0
-                except Exception:
-                    logger.warning("Did not find jobpage - retrying")
-                    try:
-                        self.driver.back()
-                        time.sleep(3)
-                        continue
-                    except WebDriverException:
-                        logger.error("Browser crashed - starting new session")
-                        self.driver.save_screenshot("screenshots/crash2.png")
-                        self.browser_manager.start_browser_session()
-                        pass
-                attempts += 1
-                if attempts > 4:
-                    logger.error("Exiting")
-                    sys.exit(1)
-            logger.info("Jobpage reached")
-
-            df_new_jobposts = self.job_ele_handler.scrape_job_attributes(
-                df_new_jobposts, job_idx
+            df_new_jobposts = self._scrape_staged_jobpost(
+                df_new_jobposts, job_idx, num_relevant_results, on_jobpost
             )
 
-            df_new_jobposts = self.filter_jobpost(
-                df_new_jobposts, job_idx, num_relevant_results
+        return apply_jobpost_dtypes(df_new_jobposts)
+
+    def _scrape_listed_jobposts(
+        self,
+        search_idx: int,
+        df_new_jobposts: pd.DataFrame,
+        listed_pages: Iterable[List[ListedJobPost]],
+        on_jobpost: Optional[Callable[[Dict], None]],
+    ) -> pd.DataFrame:
+        start_time = time.perf_counter()
+
+        # the search page is kept open in its own tab for loading result pages
+        search_window = self.driver.current_window_handle
+        self.driver.switch_to.new_window("tab")
+
+        job_idx = 0
+        for listed_jobpost in self.iter_relevant_listed_jobposts(
+            search_idx, listed_pages
+        ):
+            df_new_jobposts = self.job_ele_handler.stage_listed_jobpost(
+                listed_jobpost, df_new_jobposts, job_idx
+            )
+            # the number of relevant results is unknown until loading finishes
+            df_new_jobposts = self._scrape_staged_jobpost(
+                df_new_jobposts, job_idx, job_idx + 1, on_jobpost
             )
+            if job_idx == 0:
+                metrics.observe(
+                    "search.time_to_first_jobpost", time.perf_counter() - start_time
+                )
+            job_idx += 1
 
-        return df_new_jobposts
+        try:
+            self.driver.close()
+            self.driver.switch_to.window(search_window)
+        except WebDriverException as e:
+            logger.warning(f"Job page tab could not be closed: {e}")
 
+        return apply_jobpost_dtypes(df_new_jobposts)
 
-def scrape_and_store_new_jobposts():
-    log_big_separator(logger, "SEARCH 'N' SCRAPE LOOP STARTED")
-    start_time = time.time()
+
+def make_job_search_url(kw_idx: int, loc_idx: int) -> str:
+    return 'https://www.linkedin.com/jobs/search?keywords={}&{}&"pageNum=0"'.format(
+        SEARCH_KEYWORDS[0][kw_idx], SEARCH_KEYWORDS[1][loc_idx]
+    )
+
+
+def scrape_new_jobposts(
+    near_duplicate_index: NearDuplicateIndex,
+    on_jobpost: Optional[Callable[[int, Dict], None]] = None,
+    browser_manager: Optional[BrowserManager] = None,
+) -> List[pd.DataFrame]:
+    """Run all searches and scrape their new, relevant job posts - one frame per
+    search. Each collected job post is also passed to on_jobpost together with
+    the number of its search, as soon as it is scraped, if given. A given
+    browser manager is left running afterwards, so it can be reused."""
 
     # Initialize the browser manager
-    browser_manager = BrowserManager()
+    is_own_browser_manager = browser_manager is None
+    if is_own_browser_manager:
+        browser_manager = BrowserManager()
 
     kws1 = SEARCH_KEYWORDS[0]
     kws2 = SEARCH_KEYWORDS[1]
 
+    # result pages are loaded newest first until a page holds only known jobs
+    seen_jobpost_ids = SeenJobPostIds()
+    rate_limiter = RateLimiter()
+
+    def _is_known(job_id: int) -> bool:
+        return job_id in near_duplicate_index or job_id in seen_jobpost_ids
+
     scrape_result_list = []
 
     # for kw_idx in np.arange(len(kws1)):
     for kw_idx in np.arange(0, 1):
         for loc_idx in np.arange(len(kws2)):
-            if kw_idx == 0:
+            if kw_idx == 0 and loc_idx == 0 and browser_manager.driver is not None:
+                logger.info("Reusing running browser session")
+            elif kw_idx == 0:
                 try:
                     browser_manager.start_browser_session()
                 except Exception as e:
                     logger.error(f"An exception occurred 2: {e}")
-                    sys.exit()
+                    raise ScrapeAbortedError(f"Browser session not started: {e}")
             else:
                 # restart browser session after each search for better stability
                 browser_manager.restart_browser_session()
@@ -579,22 +832,65 @@ def scrape_and_store_new_jobposts():
             # initialize pageloader, avigate to the job search page and prepare page for scraping
             page_loader = PageLoader(browser_manager.driver)
             logger.info("Pageloader started")
-            job_search_url = 'https://www.linkedin.com/jobs/search?keywords={}&{}&"pageNum=0"'.format(
-                kws1[kw_idx], kws2[loc_idx]
+            listed_pages = page_loader.stream_listed_pages(
+                kw_idx, loc_idx, _is_known, rate_limiter
             )
-            page_loader.search_and_prepare_page_for_scraping(job_search_url)
+            if listed_pages is not None:
+                listed_pages = seen_jobpost_ids.track(listed_pages)
 
             # initialize scrape handler and scrape search results
-            scrape_handler = ScrapeHandler(browser_manager, page_loader)
-            df_new_jobposts = scrape_handler.scrape_search_results(kw_idx)
+            scrape_handler = ScrapeHandler(
+                browser_manager, page_loader, near_duplicate_index
+            )
+            df_new_jobposts = scrape_handler.scrape_search_results(
+                kw_idx,
+                None
+                if on_jobpost is None
+                else partial(on_jobpost, len(scrape_result_list)),
+                listed_pages,
+            )
             scrape_result_list.append(df_new_jobposts)
+            metrics.increment("rows.collected", df_new_jobposts.shape[0])
+
+            seen_jobpost_ids.save()
+
+    get_filter_rule_engine().log_statistics()
+    if is_own_browser_manager:
+        browser_manager.stop_browser_session()
+        browser_manager.allocator.log_statistics()
+    return scrape_result_list
+
+
+def scrape_and_store_new_jobposts(
+    near_duplicate_index: Optional[NearDuplicateIndex] = None,
+    browser_manager: Optional[BrowserManager] = None,
+) -> int:
+    """Scrape and store new, relevant job posts. Returns the number of job posts
+    stored. A loaded near-duplicate index and a running browser manager can be
+    given to reuse them between runs."""
+    log_big_separator(logger, "SEARCH 'N' SCRAPE LOOP STARTED")
+    start_time = time.time()
+
+    # load the index used to detect reposts of already known jobs
+    if near_duplicate_index is None:
+        near_duplicate_index = NearDuplicateIndex()
+    if not len(near_duplicate_index):
+        seed_near_duplicate_index(near_duplicate_index)
+
+    scrape_result_list = scrape_new_jobposts(
+        near_duplicate_index, browser_manager=browser_manager
+    )
 
     for search_idx, df in enumerate(scrape_result_list):
         j_storage_mgr = JobStorageManager(spreadsheet_name="Job_radar_aktiv")
         j_storage_mgr.store_new_jobposts(df, search_idx + 1)
 
-    browser_manager.stop_browser_session()
-    completion_time = start_time - time.time()
+    # saved only once stored - the IDs of job posts lost by a failed store must
+    # not be known to later runs
+    near_duplicate_index.save()
+
+    completion_time = time.time() - start_time
     log_big_separator(
         logger, f"All searches are completed - completion time {completion_time}"
     )
+    return sum(df.shape[0] for df in scrape_result_list)
@@ -0,0 +1,327 @@
+import os
+import time
+import socket
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+import pandas as pd
+
+from config.datastructure import DATACOLOUMNS
+from search_criteria import SEARCH_KEYWORDS
+from filter_rules import get_filter_rule_engine
+from helper_classes import BrowserManager
+from jobpost_schema import apply_jobpost_dtypes
+from log_helpers import log_big_separator, log_small_separator
+from manage_jobposts import JobStorageManager
+from metrics import metrics
+from near_duplicates import NearDuplicateIndex, seed_near_duplicate_index
+from scrape_jobposts import PageLoader, ScrapeHandler
+from search_result_loader import RateLimiter, SeenJobPostIds
+from task_queue import Task, TaskQueue, PENDING, LEASED
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Scrape workers and coordinator
+############################################################################
+"""
+Scraping is split into tasks shared through a TaskQueue, so several workers -
+each driving its own browser, on one or several hosts - scrape at once:
+
+    search   run one job search and list its relevant job posts
+    jobpage  scrape the extended job page of one listed job post
+
+The coordinator enqueues the searches of a run, turns the job posts listed by
+the searches into job page tasks - skipping known job posts - and filters and
+merges the scraped job posts into storage. Storing merges on the job post ID, so results
+merged again after a crash of the coordinator are not duplicated.
+
+    python cli.py scrape-coordinator --queue /shared/task_queue.sqlite
+    python cli.py scrape-worker --queue /shared/task_queue.sqlite
+"""
+
+SEARCH, JOBPAGE = "search", "jobpage"
+
+# shared by the searches of a worker, so its result page requests are limited
+rate_limiter = RateLimiter()
+
+
+class LeaseHeartbeat:
+    """Renew the lease of a task in a background thread while it is worked on."""
+
+    def __init__(self, task_queue: TaskQueue, task: Task, worker_id: str):
+        self.task_queue = task_queue
+        self.task = task
+        self.worker_id = worker_id
+        self.interval = task_queue.lease_duration / 3
+        self.is_lease_lost = False
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            if not self.task_queue.heartbeat(self.task.task_id, self.worker_id):
+                logger.warning(f"Lease of task {self.task.task_id} lost")
+                self.is_lease_lost = True
+                return
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._run, name="lease_heartbeat", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+
+
+############################################################################
+# Worker
+############################################################################
+
+
+def scrape_search_task(browser_manager: BrowserManager, payload: Dict) -> List[Dict]:
+    """Run a search and return the metadata of its relevant, listed job posts."""
+    # restart browser session before each search for better stability
+    if browser_manager.driver is None:
+        browser_manager.start_browser_session()
+    else:
+        browser_manager.restart_browser_session()
+
+    # known job posts are skipped by the coordinator, which holds the index -
+    # result pages are loaded until a page holds only job posts listed before
+    seen_jobpost_ids = SeenJobPostIds()
+    page_loader = PageLoader(browser_manager.driver)
+    listed_jobposts = page_loader.load_listed_jobposts(
+        payload["kw_idx"],
+        payload["loc_idx"],
+        seen_jobpost_ids.__contains__,
+        rate_limiter,
+    )
+
+    scrape_handler = ScrapeHandler(browser_manager, page_loader, frozenset())
+    df_listed = scrape_handler.extract_relevant_search_results(
+        payload["kw_idx"], pd.DataFrame(columns=DATACOLOUMNS), listed_jobposts
+    )
+    if listed_jobposts is not None:
+        seen_jobpost_ids.update(jobpost.id for jobpost in listed_jobposts)
+        seen_jobpost_ids.save()
+    return [
+        {"id": int(job_id), "href": href, "date": date}
+        for job_id, href, date in zip(
+            df_listed["id"], df_listed["href"], df_listed["date"]
+        )
+    ]
+
+
+def scrape_jobpage_task(browser_manager: BrowserManager, payload: Dict) -> Dict:
+    """Scrape the extended job page of a listed job post. The attribute
+    filtering is left to the coordinator, which filters all results at once."""
+    if browser_manager.driver is None:
+        browser_manager.start_browser_session()
+
+    scrape_handler = ScrapeHandler(
+        browser_manager, PageLoader(browser_manager.driver), frozenset()
+    )
+    if not scrape_handler.go_to_jobpage(payload["href"]):
+        raise RuntimeError(f"Job page not reached: {payload['href']}")
+
+    df = pd.DataFrame(columns=DATACOLOUMNS)
+    df.loc[0] = [None] * len(df.columns)
+    df.loc[0, "id"] = payload["id"]
+    df.loc[0, "is_active"] = 1
+    df.loc[0, "date"] = payload["date"]
+    df.loc[0, "href"] = payload["href"]
+    with metrics.timer("scrape_job_attributes"):
+        df = scrape_handler.job_ele_handler.scrape_job_attributes(df, 0)
+    metrics.increment("rows.scraped")
+    return df.loc[0].to_dict()
+
+
+TASK_FUNCTIONS = {SEARCH: scrape_search_task, JOBPAGE: scrape_jobpage_task}
+
+
+def run_worker(
+    task_queue: TaskQueue,
+    worker_id: Optional[str] = None,
+    idle_timeout: Optional[float] = None,
+    poll_interval: float = 5.0,
+) -> int:
+    """Claim and run tasks until no task was available for idle_timeout seconds
+    - or forever, if no idle timeout is given. Returns the number of tasks run."""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    log_big_separator(logger, f"SCRAPE WORKER {worker_id} STARTED")
+
+    browser_manager = BrowserManager()
+    num_tasks = 0
+    idle_since = time.time()
+    try:
+        while True:
+            task = task_queue.claim(worker_id, list(TASK_FUNCTIONS))
+            if task is None:
+                if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            log_small_separator(
+                logger, f"Task {task.task_id}: {task.kind} - attempt {task.attempts}"
+            )
+            try:
+                with LeaseHeartbeat(task_queue, task, worker_id):
+                    with metrics.timer(f"task.{task.kind}"):
+                        result = TASK_FUNCTIONS[task.kind](
+                            browser_manager, task.payload
+                        )
+            # a task exiting the process would hold its lease until it expires
+            except (Exception, SystemExit) as e:
+                logger.exception(f"Task {task.task_id} failed")
+                metrics.increment("tasks.failed")
+                task_queue.fail(task.task_id, worker_id, repr(e))
+                continue
+            finally:
+                num_tasks += 1
+                idle_since = time.time()
+
+            if not task_queue.complete(task.task_id, worker_id, result):
+                logger.warning(f"Lease of task {task.task_id} lost - result dropped")
+                metrics.increment("tasks.lease_lost")
+            metrics.increment(f"tasks.{task.kind}")
+    finally:
+        if browser_manager.driver is not None:
+            browser_manager.stop_browser_session()
+        if browser_manager.allocator is not None:
+            browser_manager.allocator.log_statistics()
+
+    logger.info(f"Scrape worker {worker_id} idle - tasks run: {num_tasks}")
+    return num_tasks
+
+
+############################################################################
+# Coordinator
+############################################################################
+
+
+def enqueue_searches(task_queue: TaskQueue, run_id: str):
+    # only the first keyword is searched, as in scrape_new_jobposts
+    kw_idx = 0
+    for search_idx, loc_idx in enumerate(range(len(SEARCH_KEYWORDS[1]))):
+        task_queue.enqueue(
+            SEARCH,
+            {
+                "run_id": run_id,
+                "search_idx": search_idx,
+                "kw_idx": kw_idx,
+                "loc_idx": loc_idx,
+            },
+            key=f"{run_id}:search:{search_idx}",
+        )
+
+
+def merge_search_results(
+    task_queue: TaskQueue, near_duplicate_index: NearDuplicateIndex
+) -> int:
+    """Enqueue a job page task for every new job post listed by the searches.
+    Returns the number of job page tasks added."""
+    num_enqueued = 0
+    for task_id, payload, listed_jobposts in task_queue.get_unmerged_results(SEARCH):
+        for jobpost in listed_jobposts:
+            if jobpost["id"] in near_duplicate_index:
+                continue
+            # the key makes enqueueing again after a crash a no-op
+            num_enqueued += task_queue.enqueue(
+                JOBPAGE,
+                {**jobpost, "search_idx": payload["search_idx"]},
+                key=f"{payload['run_id']}:jobpage:{jobpost['id']}",
+            )
+        task_queue.mark_merged([task_id])
+    return num_enqueued
+
+
+def merge_jobpage_results(
+    task_queue: TaskQueue,
+    near_duplicate_index: NearDuplicateIndex,
+    job_storage_manager: JobStorageManager,
+) -> int:
+    """Store the scraped job posts, which pass the attribute filtering and are
+    not near-duplicates of known job posts, in the worksheet of their search.
+    Returns the number stored."""
+    results = task_queue.get_unmerged_results(JOBPAGE)
+    if not results:
+        return 0
+
+    # filter all scraped job posts at once - results of older workers are None
+    # for job posts they filtered themselves
+    scraped_results = [
+        (payload, jobpost) for _, payload, jobpost in results if jobpost is not None
+    ]
+    df_scraped = pd.DataFrame.from_records(
+        [jobpost for _, jobpost in scraped_results], columns=DATACOLOUMNS
+    )
+    is_relevant_list = get_filter_rule_engine().filter_attributes(df_scraped)
+
+    records_by_search = defaultdict(list)
+    for (payload, jobpost), is_relevant in zip(scraped_results, is_relevant_list):
+        if not is_relevant:
+            continue
+        job_id, description = int(jobpost["id"]), str(jobpost["description"])
+        duplicate_id = near_duplicate_index.find_near_duplicate(job_id, description)
+        if duplicate_id is not None:
+            logger.info(f"Job {job_id} is a near-duplicate of {duplicate_id} - skipped")
+            continue
+        near_duplicate_index.add(job_id, description)
+        records_by_search[payload["search_idx"]].append(jobpost)
+
+    for search_idx, records in records_by_search.items():
+        df_new = apply_jobpost_dtypes(
+            pd.DataFrame.from_records(records, columns=DATACOLOUMNS)
+        )
+        job_storage_manager.store_new_jobposts(df_new, search_idx + 1)
+    near_duplicate_index.save()
+
+    # marked only once stored - a result stored twice is merged on its ID
+    task_queue.mark_merged([task_id for task_id, _, _ in results])
+    return sum(len(records) for records in records_by_search.values())
+
+
+def run_coordinator(task_queue: TaskQueue, poll_interval: float = 10.0) -> int:
+    """Enqueue the searches of a run and merge the results of the workers until
+    all tasks of the run are finished. Returns the number of job posts stored."""
+    log_big_separator(logger, "SCRAPE COORDINATOR STARTED")
+    start_time = time.time()
+    run_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+    near_duplicate_index = NearDuplicateIndex()
+    if not len(near_duplicate_index):
+        seed_near_duplicate_index(near_duplicate_index)
+    job_storage_manager = JobStorageManager(spreadsheet_name="Job_radar_aktiv")
+
+    enqueue_searches(task_queue, run_id)
+    num_stored = 0
+    while True:
+        merge_search_results(task_queue, near_duplicate_index)
+        num_stored += merge_jobpage_results(
+            task_queue, near_duplicate_index, job_storage_manager
+        )
+        counts = task_queue.count_by_state(run_id)
+        if (
+            not counts.get(PENDING)
+            and not counts.get(LEASED)
+            and not task_queue.count_unmerged(run_id)
+        ):
+            break
+        time.sleep(poll_interval)
+
+    task_queue.log_statistics(run_id)
+    get_filter_rule_engine().log_statistics()
+    metrics.increment("rows.collected", num_stored)
+    completion_time = time.time() - start_time
+    log_big_separator(
+        logger, f"All search tasks are completed - completion time {completion_time}"
+    )
+    return num_stored
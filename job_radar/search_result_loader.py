@@ -0,0 +1,367 @@
+import re
+import time
+import html
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+import logging
+
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.common.exceptions import WebDriverException
+
+from local_storage import get_local_storage_path, sqlite_transaction
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Direct loading of search result pages
+############################################################################
+"""
+Instead of clicking "see more jobs" and scrolling until all results are shown,
+the result pages are requested by offset from LinkedIn's guest search API - the
+endpoint the result list itself loads more jobs from. The pages are fetched
+from within the search page (fetch with a relative URL), so the requests carry
+the cookies, proxy and fingerprint of the browser profile. Several pages are
+fetched concurrently, each request waiting for the rate limiter.
+
+The listed job posts are streamed: while the caller filters the job posts of a
+batch of pages and scrapes the relevant ones - in another tab, as the fetches
+run in the search page - the next batch of pages is already downloading.
+
+Results are requested newest first, so loading stops early at the first page
+holding only known job posts - job posts stored before or listed by an earlier
+search (SeenJobPostIds).
+"""
+
+GUEST_SEARCH_API_PATH = (
+    "/jobs-guest/jobs/api/seeMoreJobPostings/search?keywords={}&{}&sortBy=DD&start={}"
+)
+PAGE_SIZE = 25
+# LinkedIn lists at most 1000 results per search
+MAX_RESULTS = 1000
+
+# the fetches are started and collected by separate scripts, so the next pages
+# download while the caller scrapes the job posts of the last pages
+START_FETCH_SCRIPT = """
+window.jobRadarPages = Promise.all(arguments[0].map(url =>
+    fetch(url, {credentials: "include"})
+        .then(response => response.text().then(text => [response.status, text]))
+        .catch(error => [0, String(error)])
+));
+"""
+COLLECT_FETCH_SCRIPT = """
+const done = arguments[arguments.length - 1];
+window.jobRadarPages.then(done);
+"""
+
+
+class ListedJobPost(NamedTuple):
+    id: int
+    title: str
+    href: str
+    date: Optional[str]
+
+
+def parse_listed_jobposts(page_html: str) -> List[ListedJobPost]:
+    """Parse the job post cards of a search result page - with the same patterns
+    used for the listed job elements in the search page."""
+    listed_jobposts = []
+    for card_html in re.split(r"<li[ >]", page_html)[1:]:
+        urn_match = re.search(r'data-entity-urn="[^"]*?(\d+)"', card_html)
+        href_match = re.search(r'href="(.*?)"', card_html)
+        if urn_match is None or href_match is None:
+            continue
+        title_match = re.search(
+            r'class="base-search-card__title"[^>]*>(.*?)<', card_html, re.DOTALL
+        )
+        date_match = re.search(r'datetime="([^"]+)"', card_html)
+        listed_jobposts.append(
+            ListedJobPost(
+                id=int(urn_match.group(1)),
+                title=html.unescape(title_match.group(1)).strip()
+                if title_match
+                else "",
+                href=html.unescape(href_match.group(1)),
+                date=date_match.group(1) if date_match else None,
+            )
+        )
+    return listed_jobposts
+
+
+class RateLimiter:
+    """Token bucket limiting requests to rate per second, with bursts of up to
+    burst requests. After a rejected request, all requests pause."""
+
+    def __init__(self, rate: float = 1.0, burst: int = 4):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last_time = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last_time) * self.rate
+                )
+                self._last_time = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = max(
+                    self._paused_until - now, (1 - self._tokens) / self.rate
+                )
+            time.sleep(wait_time)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class SeenJobPostIds:
+    """IDs of the job posts listed by earlier searches, forgotten after
+    max_age_days. The IDs are stored in a SQLite file shared by the scrape
+    workers on the host - IDs seen since the last save are kept in memory and
+    written in one transaction by save(), which also picks up the IDs saved by
+    other workers in the meantime."""
+
+    def __init__(self, file_name: str = "seen_jobpost_ids.sqlite", max_age_days=60):
+        self.file_path = get_local_storage_path(file_name)
+        self.max_age_days = max_age_days
+        self.unsaved: Dict[int, float] = {}
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS seen_jobposts (
+                    id INTEGER PRIMARY KEY,
+                    seen_at REAL NOT NULL
+                )"""
+            )
+            self.saved_ids = self._load_ids(connection)
+
+    def _load_ids(self, connection: sqlite3.Connection) -> set:
+        min_seen_at = time.time() - self.max_age_days * 24 * 3600
+        rows = connection.execute(
+            "SELECT id FROM seen_jobposts WHERE seen_at >= ?", (min_seen_at,)
+        )
+        return {job_id for (job_id,) in rows}
+
+    def __contains__(self, job_id) -> bool:
+        return job_id in self.unsaved or job_id in self.saved_ids
+
+    def __len__(self) -> int:
+        return len(self.saved_ids | self.unsaved.keys())
+
+    def update(self, job_ids):
+        now = time.time()
+        for job_id in job_ids:
+            self.unsaved[int(job_id)] = now
+
+    def track(
+        self, listed_pages: Iterable[List[ListedJobPost]]
+    ) -> Iterator[List[ListedJobPost]]:
+        """Pass on a stream of result pages, recording their job posts as seen."""
+        for page in listed_pages:
+            self.update(jobpost.id for jobpost in page)
+            yield page
+
+    def save(self):
+        min_seen_at = time.time() - self.max_age_days * 24 * 3600
+        with sqlite_transaction(self.file_path) as connection:
+            connection.executemany(
+                """INSERT INTO seen_jobposts (id, seen_at) VALUES (?, ?)
+                ON CONFLICT (id) DO UPDATE
+                SET seen_at = MAX(seen_at, excluded.seen_at)""",
+                self.unsaved.items(),
+            )
+            connection.execute(
+                "DELETE FROM seen_jobposts WHERE seen_at < ?", (min_seen_at,)
+            )
+            self.saved_ids = self._load_ids(connection)
+        self.unsaved = {}
+
+
+class SearchResultLoader:
+    """Loads the listed job posts of a search by fetching its result pages from
+    the search page open in the driver."""
+
+    def __init__(
+        self,
+        driver: WebDriver,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency: int = 4,
+        max_results: int = MAX_RESULTS,
+        max_retries: int = 3,
+        backoff: float = 30.0,
+        script_timeout: float = 120.0,
+    ):
+        self.driver = driver
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.concurrency = concurrency
+        self.max_results = max_results
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # the fetches of a batch of pages must finish within the script timeout
+        self.driver.set_script_timeout(script_timeout)
+        self.search_window = driver.current_window_handle
+
+    @contextmanager
+    def _in_search_window(self):
+        """Run scripts in the search page, even if the caller switched tabs."""
+        current_window = self.driver.current_window_handle
+        if current_window == self.search_window:
+            yield
+            return
+        self.driver.switch_to.window(self.search_window)
+        try:
+            yield
+        finally:
+            self.driver.switch_to.window(current_window)
+
+    def start_fetch(self, urls: List[str]):
+        """Start fetching pages concurrently in the browser."""
+        for _ in urls:
+            self.rate_limiter.acquire()
+        with self._in_search_window():
+            self.driver.execute_script(START_FETCH_SCRIPT, urls)
+        metrics.increment("search.pages_fetched", len(urls))
+
+    def collect_fetch(self) -> List[Tuple[int, str]]:
+        """Wait for the started fetches - returns (status, html) per page."""
+        with metrics.timer("search.fetch_pages"):
+            with self._in_search_window():
+                return self.driver.execute_async_script(COLLECT_FETCH_SCRIPT)
+
+    def fetch_pages(self, urls: List[str]) -> List[Tuple[int, str]]:
+        self.start_fetch(urls)
+        return self.collect_fetch()
+
+    def _retry_failed_pages(
+        self, urls: List[str], responses: List[Tuple[int, str]]
+    ) -> List[Tuple[int, str]]:
+        for attempt in range(self.max_retries):
+            failed_idx_list = [
+                idx
+                for idx, (status, _) in enumerate(responses)
+                if status == 0 or status == 429 or status >= 500
+            ]
+            if not failed_idx_list:
+                break
+            logger.warning(
+                f"Result pages failed: {len(failed_idx_list)} - "
+                f"status: {responses[failed_idx_list[0]][0]} - retrying"
+            )
+            metrics.increment("search.pages_failed", len(failed_idx_list))
+            self.rate_limiter.pause(self.backoff * 2**attempt)
+            retried = self.fetch_pages([urls[idx] for idx in failed_idx_list])
+            for idx, response in zip(failed_idx_list, retried):
+                responses[idx] = response
+        return responses
+
+    def _parse_batch(
+        self,
+        offsets: List[int],
+        responses: List[Tuple[int, str]],
+        is_known: Callable[[int], bool],
+    ) -> Tuple[List[List[ListedJobPost]], bool]:
+        """Parse a batch of pages, up to the page where loading should stop.
+        Returns the parsed pages and whether loading should continue."""
+        pages = []
+        for offset, (status, page_html) in zip(offsets, responses):
+            if status != 200:
+                logger.error(f"Result page {offset} failed - status: {status}")
+                return pages, False
+            listed_jobposts = parse_listed_jobposts(page_html)
+            if not listed_jobposts:
+                logger.info(f"Results end at {offset}")
+                return pages, False
+            pages.append(listed_jobposts)
+            if all(is_known(jobpost.id) for jobpost in listed_jobposts):
+                logger.info(f"Only known job posts at {offset} - stopping")
+                metrics.increment("search.early_stops")
+                return pages, False
+        return pages, True
+
+    def iter_result_pages(
+        self, kw_idx: int, loc_idx: int, is_known: Callable[[int], bool]
+    ) -> Iterator[List[ListedJobPost]]:
+        """Yield the listed job posts of each result page, newest first, until
+        the results end or a page holds only known job posts. The next batch of
+        pages is fetched while the pages of the last batch are consumed."""
+        from search_criteria import SEARCH_KEYWORDS
+
+        kws1, kws2 = SEARCH_KEYWORDS[0], SEARCH_KEYWORDS[1]
+
+        def _batch(start: int) -> Tuple[List[int], List[str]]:
+            offsets = list(
+                range(
+                    start,
+                    min(start + self.concurrency * PAGE_SIZE, self.max_results),
+                    PAGE_SIZE,
+                )
+            )
+            urls = [
+                GUEST_SEARCH_API_PATH.format(kws1[kw_idx], kws2[loc_idx], offset)
+                for offset in offsets
+            ]
+            return offsets, urls
+
+        offsets, urls = _batch(0)
+        try:
+            self.start_fetch(urls)
+            while offsets:
+                responses = self._retry_failed_pages(urls, self.collect_fetch())
+                pages, is_continued = self._parse_batch(offsets, responses, is_known)
+                if is_continued:
+                    offsets, urls = _batch(offsets[-1] + PAGE_SIZE)
+                    if offsets:
+                        self.start_fetch(urls)
+                else:
+                    offsets = []
+                yield from pages
+        except WebDriverException as e:
+            # e.g. the browser session was restarted while scraping job pages
+            logger.error(f"Result pages could not be fetched: {e}")
+            metrics.increment("search.fetch_errors")
+
+    def iter_listed_pages(
+        self, kw_idx: int, loc_idx: int, is_known: Callable[[int], bool]
+    ) -> Iterator[List[ListedJobPost]]:
+        """Yield the job posts of each result page as it is loaded - without the
+        job posts listed on an earlier page of the search."""
+        listed_ids = set()
+        for page in self.iter_result_pages(kw_idx, loc_idx, is_known):
+            unique_page = []
+            for jobpost in page:
+                if jobpost.id not in listed_ids:
+                    listed_ids.add(jobpost.id)
+                    unique_page.append(jobpost)
+            if unique_page:
+                yield unique_page
+        logger.info(f"Listed job posts loaded: {len(listed_ids)}")
+
+    def iter_listed_jobposts(
+        self, kw_idx: int, loc_idx: int, is_known: Callable[[int], bool]
+    ) -> Iterator[ListedJobPost]:
+        """Yield the unique listed job posts of a search as they are loaded."""
+        for page in self.iter_listed_pages(kw_idx, loc_idx, is_known):
+            yield from page
+
+    def load(
+        self, kw_idx: int, loc_idx: int, is_known: Callable[[int], bool]
+    ) -> List[ListedJobPost]:
+        """The unique listed job posts of a search."""
+        return list(self.iter_listed_jobposts(kw_idx, loc_idx, is_known))
@@ -21,25 +21,25 @@ remote controlled using selenium and chromedriver.
 """
 
 
-def _provide_gl_browser_profile():
-    # Generate a random port within the privat port range
-    random_client_port = random.randint(49152, 65535)
+def _provide_gl_browser_profile(profile_id: str = None, port: int = None):
+    # without a leased profile and port, pick a random profile and a random port
+    # within the privat port range
+    if port is None:
+        port = random.randint(49152, 65535)
 
     token = gologin_tokens["token"]
-    profile_id_list = gologin_tokens["profile_id_list"]
-    random_profile_id = random.choice(profile_id_list)
+    if profile_id is None:
+        profile_id = random.choice(gologin_tokens["profile_id_list"])
 
-    gl = GoLogin(
-        {"token": token, "profile_id": random_profile_id, "port": random_client_port}
-    )
+    gl = GoLogin({"token": token, "profile_id": profile_id, "port": port})
 
     return gl
 
 
-def start_remote_debug_gologin_browser():
+def start_remote_debug_gologin_browser(profile_id: str = None, port: int = None):
     logger.info("Starting new browser session")
     # start gologin-profile-browser as a remote debugging instance
-    gl = _provide_gl_browser_profile()
+    gl = _provide_gl_browser_profile(profile_id, port)
 
     try:
         debugger_address = gl.start()
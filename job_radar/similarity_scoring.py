@@ -0,0 +1,129 @@
+import os
+import re
+import glob
+import zlib
+from typing import List, NamedTuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# TF-IDF similarity scoring
+############################################################################
+"""
+Job posts are ranked by their overall fit to one or more reference profile texts
+(e.g. a CV or a description of a dream job). Descriptions are represented by
+hashed word n-grams weighted by TF-IDF, fitted once over all active
+descriptions and stored as a sparse matrix. The reference profiles are combined
+into one vector, so all job posts are scored by a single sparse matrix-vector
+product.
+"""
+
+PROFILE_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "config", "reference_profiles"
+)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class SparseRows(NamedTuple):
+    """A sparse matrix in compressed sparse row format."""
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    num_cols: int
+
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """Sparse matrix-vector product."""
+        row_lengths = np.diff(self.indptr)
+        rows = np.repeat(np.arange(len(row_lengths)), row_lengths)
+        return np.bincount(
+            rows, weights=self.data * vector[self.indices], minlength=len(row_lengths)
+        )
+
+
+class HashedTfidfModel:
+    """TF-IDF model of hashed word n-grams. Terms are hashed into num_features
+    columns, so no vocabulary has to be stored."""
+
+    def __init__(self, num_features: int = 2**20, ngram_range=(1, 2)):
+        self.num_features = num_features
+        self.ngram_range = ngram_range
+        self.idf = None
+
+    def _hash_terms(self, text: str) -> np.ndarray:
+        words = _WORD_PATTERN.findall(str(text).lower())
+        terms = [
+            " ".join(words[i : i + n])
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1)
+            for i in range(len(words) - n + 1)
+        ]
+        return np.array(
+            [zlib.crc32(term.encode()) % self.num_features for term in terms],
+            dtype=np.int64,
+        )
+
+    def _count_terms(self, texts: List[str]) -> SparseRows:
+        indptr, indices_list, counts_list = [0], [], []
+        for text in texts:
+            features, counts = np.unique(self._hash_terms(text), return_counts=True)
+            indices_list.append(features)
+            counts_list.append(counts)
+            indptr.append(indptr[-1] + len(features))
+        return SparseRows(
+            np.array(indptr, dtype=np.int64),
+            np.concatenate(indices_list) if texts else np.zeros(0, dtype=np.int64),
+            np.concatenate(counts_list).astype(float) if texts else np.zeros(0),
+            self.num_features,
+        )
+
+    def _weight(self, term_counts: SparseRows) -> SparseRows:
+        # sublinear term frequency times idf, normalized to unit length per row
+        data = (1 + np.log(term_counts.data)) * self.idf[term_counts.indices]
+        row_lengths = np.diff(term_counts.indptr)
+        rows = np.repeat(np.arange(len(row_lengths)), row_lengths)
+        norms = np.sqrt(
+            np.bincount(rows, weights=data**2, minlength=len(row_lengths))
+        )
+        data = data / np.maximum(norms, 1e-12)[rows]
+        return term_counts._replace(data=data)
+
+    def fit_transform(self, texts: List[str]) -> SparseRows:
+        term_counts = self._count_terms(texts)
+        document_frequency = np.bincount(
+            term_counts.indices, minlength=self.num_features
+        )
+        self.idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        return self._weight(term_counts)
+
+    def transform(self, texts: List[str]) -> SparseRows:
+        return self._weight(self._count_terms(texts))
+
+    def combine_profiles(self, profile_texts: List[str]) -> np.ndarray:
+        """Combine the reference profiles into one dense unit vector."""
+        profiles = self.transform(profile_texts)
+        profile_vector = np.zeros(self.num_features)
+        np.add.at(profile_vector, profiles.indices, profiles.data)
+        return profile_vector / max(np.linalg.norm(profile_vector), 1e-12)
+
+
+def load_reference_profiles(profile_directory: str = PROFILE_DIRECTORY) -> List[str]:
+    profile_texts = []
+    for file_path in sorted(glob.glob(os.path.join(profile_directory, "*.txt"))):
+        with open(file_path, encoding="utf-8") as f:
+            profile_texts.append(f.read())
+    return profile_texts
+
+
+def score_similarity(descriptions: List[str], profile_texts: List[str]) -> np.ndarray:
+    """Score the similarity (0-100) of each description to the reference
+    profiles, with a TF-IDF model fitted over the descriptions."""
+    model = HashedTfidfModel()
+    description_matrix = model.fit_transform(descriptions)
+    profile_vector = model.combine_profiles(profile_texts)
+    similarity = description_matrix.dot(profile_vector)
+    logger.info(f"Similarity scored for {len(descriptions)} job posts")
+    return np.round(100 * similarity, 1)
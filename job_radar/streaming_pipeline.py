@@ -0,0 +1,451 @@
+import time
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+from jobpost_schema import apply_jobpost_dtypes
+from log_helpers import log_big_separator, log_small_separator
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Streaming pipeline
+############################################################################
+"""
+Job posts flow from the scraper through a chain of stages, each running in its
+own thread and connected by bounded queues:
+
+    scrape -> dedup -> classify -> translate -> rate -> store
+
+so rating and storage of the first job posts overlap with the browser waiting on
+the network for the next ones. A full queue blocks the stage feeding it, which
+keeps memory bounded if a later stage falls behind. Storage is flushed in
+batches, and cool jobs are handed to the notification outbox at each flush, so a
+job post can be notified about minutes after it is scraped.
+
+Liveness checks, archiving, reorganizing and the full rating of all stored job
+posts still run as separate stages afterwards.
+"""
+
+# marks the end of the stream of a queue
+_END = object()
+
+
+class PipelineFailedError(RuntimeError):
+    """A stage of the streaming pipeline failed - job posts it received after
+    the failure were not stored."""
+
+
+class PipelineStage(threading.Thread):
+    """A thread taking batches of items from its input queue, processing them
+    with a step and putting the resulting items on its output queue.
+
+    A step is a callable taking a list of items and returning a list of items.
+    It can implement open() and close(), which are called from within the thread
+    (e.g. to create sqlite connections), and flush(), which returns the last
+    items once the input has ended. Steps are also called with an empty batch
+    when no item arrived within poll_interval, e.g. to flush on time.
+
+    If a step fails, the stage keeps draining its input until the end, so the
+    stages before it never block on a full queue. flush() and close() are still
+    called, so items the step buffered before the failure are not lost."""
+
+    def __init__(
+        self,
+        name: str,
+        step: Callable[[List], List],
+        input_queue: queue.Queue,
+        output_queue: Optional[queue.Queue] = None,
+        batch_size: int = 1,
+        poll_interval: float = 5.0,
+    ):
+        super().__init__(name=f"pipeline_{name}", daemon=True)
+        self.stage_name = name
+        self.step = step
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.is_failed = False
+
+    def _next_batch(self):
+        """Wait for the next item and add any further waiting items, up to the
+        batch size. Returns the batch and whether the input has ended."""
+        try:
+            item = self.input_queue.get(timeout=self.poll_interval)
+        except queue.Empty:
+            return [], False
+        if item is _END:
+            return [], True
+
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                item = self.input_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _call(self, method: Callable, *args, after_failure: bool = False):
+        if self.is_failed and not after_failure:
+            return
+        try:
+            with metrics.timer(f"pipeline.{self.stage_name}"):
+                results = method(*args)
+        except Exception:
+            logger.exception(f"Pipeline stage {self.stage_name} failed")
+            metrics.increment("pipeline.failed")
+            self.is_failed = True
+            return
+        if self.output_queue is not None:
+            for result in results or []:
+                self.output_queue.put(result)
+
+    def run(self):
+        if hasattr(self.step, "open"):
+            self._call(self.step.open)
+
+        is_ended = False
+        while not is_ended:
+            batch, is_ended = self._next_batch()
+            metrics.increment(f"pipeline.{self.stage_name}.items", len(batch))
+            self._call(self.step, batch)
+
+        if hasattr(self.step, "flush"):
+            self._call(self.step.flush, after_failure=True)
+        if hasattr(self.step, "close"):
+            self._call(self.step.close, after_failure=True)
+        if self.output_queue is not None:
+            self.output_queue.put(_END)
+
+
+def _to_frame(records: List[Dict]) -> pd.DataFrame:
+    return apply_jobpost_dtypes(pd.DataFrame.from_records(records))
+
+
+class DedupStep:
+    """Drop job posts already stored (active or archived) or already seen in
+    this run."""
+
+    def __init__(self, known_ids: set):
+        self.known_ids = known_ids
+        self.num_dropped = 0
+        self.num_invalid = 0
+
+    def __call__(self, records: List[Dict]) -> List[Dict]:
+        new_records = []
+        for record in records:
+            try:
+                job_id = int(record.get("id"))
+            except (TypeError, ValueError):
+                # a job post without an ID cannot be stored - skip it only
+                logger.warning(
+                    f"Streaming dedup - invalid job post ID: {record.get('id')!r}"
+                )
+                self.num_invalid += 1
+                continue
+            if job_id in self.known_ids:
+                self.num_dropped += 1
+                continue
+            self.known_ids.add(job_id)
+            new_records.append(record)
+        return new_records
+
+    def close(self):
+        logger.info(
+            f"Streaming dedup - known job posts dropped: {self.num_dropped} - "
+            f"invalid IDs dropped: {self.num_invalid}"
+        )
+
+
+class ClassifyStep:
+    """Find the domain each job post belongs to, starting from the domain of
+    the search it was found by."""
+
+    def __init__(self, job_post_organizer):
+        self.job_post_organizer = job_post_organizer
+
+    def __call__(self, records: List[Dict]) -> List[Dict]:
+        if not records:
+            return []
+        df = _to_frame(records)
+        domain_indices = self.job_post_organizer.determine_df_destination_indices(
+            df, df["search_idx"].to_numpy()
+        )
+        for record, domain_idx in zip(records, domain_indices):
+            record["domain_idx"] = int(domain_idx)
+        return records
+
+
+class TranslateStep:
+    """Translate the descriptions of job posts not in english."""
+
+    def open(self):
+        from translation_cache import TranslationCache
+
+        self.translation_cache = TranslationCache()
+
+    def __call__(self, records: List[Dict]) -> List[Dict]:
+        from rate_jobposts import translate_to_english
+
+        for record in records:
+            record["description_en"] = translate_to_english(
+                pd.Series(record), self.translation_cache
+            )
+        return records
+
+    def close(self):
+        self.translation_cache.log_statistics()
+        self.translation_cache.close()
+
+
+class RateStep:
+    """Rate job posts in batches and cache their static ratings, so the full
+    rating stage does not rate them again."""
+
+    def __init__(self, domain_names: List[str]):
+        self.domain_names = domain_names
+
+    def open(self):
+        from rating_cache import RatingCache
+
+        self.rating_cache = RatingCache()
+
+    def __call__(self, records: List[Dict]) -> List[Dict]:
+        import rate_jobposts as rating
+        from rating_cache import RatingCache
+
+        if not records:
+            return []
+        df_all = _to_frame(records)
+        rated_records = []
+        for domain_idx, df in df_all.groupby("domain_idx"):
+            current_domain = self.domain_names[domain_idx]
+            keyword_score_list = rating.batch_keyword_scoring(
+                df["description"].tolist()
+            )
+            static_rating_list = []
+            for (_, row), keyword_scores in zip(df.iterrows(), keyword_score_list):
+                static_rating = rating.rate_static_components_of_row(
+                    row, current_domain, row["description_en"], keyword_scores
+                )
+                self.rating_cache.put(
+                    RatingCache.make_key(
+                        current_domain,
+                        rating.SCORE_MARKERS_VERSION,
+                        rating.STATIC_RATING_VERSION,
+                        list(row[rating.STATIC_RATING_ATTRIBUTES]),
+                    ),
+                    static_rating,
+                    row["id"],
+                )
+                static_rating_list.append(static_rating)
+
+            df = rating.add_score_columns(df, static_rating_list)
+            df.loc[rating.evaluate_activity_mask(df), "is_active"] = 0
+            df["score_details"] = rating.render_scoreboard(df, current_domain)
+            df = df.drop(
+                columns=list(rating.SCORE_LOG_COLUMNS.values()) + ["description_en"]
+            )
+            rated_records.extend(df.to_dict("records"))
+        self.rating_cache.commit()
+        return rated_records
+
+    def close(self):
+        self.rating_cache.close()
+
+
+class StoreStep:
+    """Store rated job posts in their domain worksheets in batches, and hand the
+    cool jobs among them to the notification outbox."""
+
+    def __init__(
+        self,
+        job_storage_manager,
+        notification_outbox,
+        flush_size: int = 25,
+        flush_interval: float = 300.0,
+        cool_score: int = 50,
+    ):
+        self.job_storage_manager = job_storage_manager
+        self.notification_outbox = notification_outbox
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.cool_score = cool_score
+        self.buffer: List[Dict] = []
+        self.last_flush_time = time.time()
+
+    def open(self):
+        from notification_store import NotificationStore, seed_notification_store
+
+        self.notification_store = NotificationStore()
+        if self.notification_store.is_new:
+            seed_notification_store(self.notification_store)
+
+    def __call__(self, records: List[Dict]) -> List[Dict]:
+        self.buffer.extend(records)
+        is_flush_due = time.time() - self.last_flush_time >= self.flush_interval
+        if len(self.buffer) >= self.flush_size or (self.buffer and is_flush_due):
+            self.flush()
+        return []
+
+    def flush(self) -> List[Dict]:
+        from rate_jobposts import find_cool_jobs_mask, check_for_cool_jobs
+        from send_mail import send_mail_with_notification
+
+        self.last_flush_time = time.time()
+        if not self.buffer:
+            return []
+        df_all = _to_frame(self.buffer)
+
+        gsheet_mgr = self.job_storage_manager.gsheet_mgr
+        worksheets = gsheet_mgr.sheet.worksheets()
+        for domain_idx, df_new in df_all.groupby("domain_idx"):
+            df_new = df_new.drop(columns=["domain_idx", "search_idx"])
+            ws = worksheets[domain_idx + 1]
+            df_existing = gsheet_mgr.get_worksheet_as_dataframe(ws)
+            df_updated = self.job_storage_manager.update_existing_dataframe(
+                df_existing, df_new.copy()
+            )
+            df_updated = df_updated.sort_values(by="score", ascending=False)
+            gsheet_mgr.update_google_worksheet(ws, df_updated)
+            metrics.increment("rows.stored", df_new.shape[0])
+
+            cool_jobs = df_new[find_cool_jobs_mask(df_new, self.cool_score)]
+            for job_id, jobpost_title in zip(
+                cool_jobs["id"], cool_jobs["jobpost_title"]
+            ):
+                self.notification_store.add_cool_job(job_id, jobpost_title)
+        # clear the buffer only once stored, so a failed flush is retried at the
+        # next one - job posts stored twice are merged by update_existing_dataframe
+        self.buffer = []
+        log_small_separator(logger, f"Streamed job posts stored: {df_all.shape[0]}")
+
+        cool_job_list = check_for_cool_jobs(self.notification_store)
+        if cool_job_list:
+            send_mail_with_notification(
+                cool_job_list, self.notification_store, self.notification_outbox
+            )
+        self.notification_store.save()
+        return []
+
+
+def load_known_jobpost_ids() -> set:
+    """IDs of all stored job posts, both active and archived."""
+    from manage_jobposts import GoogleSheetManager
+
+    known_ids = set()
+    for spreadsheet_name in ["Job_radar_aktiv", "Job_radar_inaktiv"]:
+        gsheet_mgr = GoogleSheetManager(spreadsheet_name)
+        for ws in gsheet_mgr.sheet.worksheets()[1:]:
+            ids = gsheet_mgr.get_worksheet_as_dataframe(ws)["id"]
+            known_ids.update(
+                pd.to_numeric(ids, errors="coerce").dropna().astype(np.int64)
+            )
+    return known_ids
+
+
+def run_streaming_pipeline(
+    queue_size: int = 100,
+    rating_batch_size: int = 20,
+    flush_size: int = 25,
+    flush_interval: float = 300.0,
+    cool_score: int = 50,
+):
+    """Scrape new job posts and store, rate and notify about them while the
+    scraping is still running."""
+    from manage_jobposts import JobStorageManager, JobPostOrganizer
+    from near_duplicates import NearDuplicateIndex, seed_near_duplicate_index
+    from notification_outbox import NotificationOutbox
+    from scrape_jobposts import scrape_new_jobposts
+
+    log_big_separator(logger, "STREAMING PIPELINE STARTED")
+    start_time = time.time()
+
+    job_storage_manager = JobStorageManager(spreadsheet_name="Job_radar_aktiv")
+    job_post_organizer = JobPostOrganizer(spreadsheet_name="Job_radar_aktiv")
+    domain_names = [
+        ws.title for ws in job_storage_manager.gsheet_mgr.sheet.worksheets()[1:]
+    ]
+
+    near_duplicate_index = NearDuplicateIndex()
+    if not len(near_duplicate_index):
+        seed_near_duplicate_index(near_duplicate_index)
+
+    notification_outbox = NotificationOutbox()
+    notification_outbox.start()
+
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(5)]
+    stages = [
+        PipelineStage(
+            "dedup", DedupStep(load_known_jobpost_ids()), queues[0], queues[1]
+        ),
+        PipelineStage(
+            "classify",
+            ClassifyStep(job_post_organizer),
+            queues[1],
+            queues[2],
+            batch_size=rating_batch_size,
+        ),
+        PipelineStage("translate", TranslateStep(), queues[2], queues[3]),
+        PipelineStage(
+            "rate",
+            RateStep(domain_names),
+            queues[3],
+            queues[4],
+            batch_size=rating_batch_size,
+        ),
+        PipelineStage(
+            "store",
+            StoreStep(
+                job_storage_manager,
+                notification_outbox,
+                flush_size,
+                flush_interval,
+                cool_score,
+            ),
+            queues[4],
+            batch_size=flush_size,
+        ),
+    ]
+    for stage in stages:
+        stage.start()
+
+    def _on_jobpost(search_idx: int, record: Dict):
+        record["search_idx"] = search_idx
+        queues[0].put(record)
+
+    # scrape in this thread - the end of the stream is always signalled, also
+    # if the scraper fails, so the stages store the job posts scraped before
+    # the error is raised
+    try:
+        scrape_new_jobposts(near_duplicate_index, on_jobpost=_on_jobpost)
+    except BaseException as e:
+        logger.error(f"Scraping stopped: {e!r}")
+        raise
+    finally:
+        queues[0].put(_END)
+        for stage in stages:
+            stage.join()
+        notification_outbox.stop()
+
+    failed_stages = [stage.stage_name for stage in stages if stage.is_failed]
+    if failed_stages:
+        raise PipelineFailedError(f"Failed pipeline stages: {failed_stages}")
+
+    # the index holds every scraped job post - saved only if all were stored, so
+    # job posts dropped by a failed stage are scraped again by the next run
+    near_duplicate_index.save()
+
+    completion_time = time.time() - start_time
+    log_big_separator(
+        logger, f"Streaming pipeline completed - completion time {completion_time}"
+    )
@@ -0,0 +1,203 @@
+import json
+import time
+from typing import Dict, List, NamedTuple, Optional
+import logging
+
+from local_storage import get_local_storage_path, sqlite_transaction
+
+logger = logging.getLogger(__name__)
+
+############################################################################
+# Shared task queue
+############################################################################
+"""
+A task queue in a SQLite file shared by the scrape workers and the
+coordinator. A worker claims a task by taking a lease on it, which it renews by
+heartbeats while working. When a worker dies, its lease expires and the task is
+handed to the next worker claiming one - until it has been attempted
+max_attempts times, after which it is marked failed.
+
+Every state change happens in an immediate transaction, so a task is never
+leased by two workers at once. Results are only accepted from the worker holding
+the lease, and the coordinator marks the results it has merged, so each result
+is merged once.
+
+Workers on several hosts can share the queue file on a network drive, as long
+as the file system supports file locks.
+"""
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+
+class Task(NamedTuple):
+    task_id: int
+    kind: str
+    payload: Dict
+    attempts: int
+
+
+class TaskQueue:
+    """Persistent queue of tasks with leases and heartbeats."""
+
+    def __init__(
+        self,
+        file_path: Optional[str] = None,
+        lease_duration: float = 300.0,
+        max_attempts: int = 3,
+    ):
+        self.file_path = file_path or get_local_storage_path("task_queue.sqlite")
+        self.lease_duration = lease_duration
+        self.max_attempts = max_attempts
+
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS tasks (
+                    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT UNIQUE,
+                    kind TEXT,
+                    payload TEXT,
+                    state TEXT,
+                    worker_id TEXT,
+                    lease_expires_at REAL,
+                    attempts INTEGER,
+                    result TEXT,
+                    error TEXT,
+                    enqueued_at REAL,
+                    finished_at REAL,
+                    merged_at REAL
+                )"""
+            )
+
+    def enqueue(self, kind: str, payload: Dict, key: str) -> bool:
+        """Add a task. Returns False if a task with the key was already added."""
+        with sqlite_transaction(self.file_path) as connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO tasks "
+                "(key, kind, payload, state, attempts, enqueued_at) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (key, kind, json.dumps(payload), PENDING, time.time()),
+            )
+        return cursor.rowcount > 0
+
+    def claim(self, worker_id: str, kinds: List[str]) -> Optional[Task]:
+        """Lease the oldest pending task of the given kinds - or a leased task
+        whose lease has expired."""
+        now = time.time()
+        placeholders = ", ".join("?" * len(kinds))
+        with sqlite_transaction(self.file_path) as connection:
+            # tasks of dead workers, which were attempted too often, are failed
+            connection.execute(
+                "UPDATE tasks SET state = ?, error = 'lease expired', finished_at = ? "
+                "WHERE state = ? AND lease_expires_at < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts),
+            )
+            row = connection.execute(
+                "SELECT task_id, kind, payload, attempts FROM tasks "
+                f"WHERE kind IN ({placeholders}) AND (state = ? "
+                "OR (state = ? AND lease_expires_at < ?)) "
+                "ORDER BY task_id LIMIT 1",
+                (*kinds, PENDING, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, kind, payload, attempts = row
+            connection.execute(
+                "UPDATE tasks SET state = ?, worker_id = ?, lease_expires_at = ?, "
+                "attempts = ? WHERE task_id = ?",
+                (LEASED, worker_id, now + self.lease_duration, attempts + 1, task_id),
+            )
+        return Task(task_id, kind, json.loads(payload), attempts + 1)
+
+    def heartbeat(self, task_id: int, worker_id: str) -> bool:
+        """Renew the lease of a task. Returns False if the lease was lost."""
+        with sqlite_transaction(self.file_path) as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET lease_expires_at = ? "
+                "WHERE task_id = ? AND worker_id = ? AND state = ?",
+                (time.time() + self.lease_duration, task_id, worker_id, LEASED),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, task_id: int, worker_id: str, result) -> bool:
+        """Store the result of a task. Returns False, and drops the result, if
+        the lease was lost to another worker."""
+        with sqlite_transaction(self.file_path) as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET state = ?, result = ?, finished_at = ? "
+                "WHERE task_id = ? AND worker_id = ? AND state = ?",
+                (
+                    DONE,
+                    json.dumps(result, default=str),
+                    time.time(),
+                    task_id,
+                    worker_id,
+                    LEASED,
+                ),
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, task_id: int, worker_id: str, error: str):
+        """Release a task after an error, to be retried - or mark it failed
+        after max_attempts attempts."""
+        with sqlite_transaction(self.file_path) as connection:
+            connection.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_expires_at = NULL, finished_at = ? "
+                "WHERE task_id = ? AND worker_id = ? AND state = ?",
+                (
+                    self.max_attempts,
+                    FAILED,
+                    PENDING,
+                    error,
+                    time.time(),
+                    task_id,
+                    worker_id,
+                    LEASED,
+                ),
+            )
+
+    def get_unmerged_results(self, kind: str) -> List[tuple]:
+        """(task_id, payload, result) of the done tasks not merged yet."""
+        with sqlite_transaction(self.file_path) as connection:
+            rows = connection.execute(
+                "SELECT task_id, payload, result FROM tasks "
+                "WHERE kind = ? AND state = ? AND merged_at IS NULL ORDER BY task_id",
+                (kind, DONE),
+            ).fetchall()
+        return [
+            (task_id, json.loads(payload), json.loads(result))
+            for task_id, payload, result in rows
+        ]
+
+    def mark_merged(self, task_ids: List[int]):
+        with sqlite_transaction(self.file_path) as connection:
+            connection.executemany(
+                "UPDATE tasks SET merged_at = ? WHERE task_id = ?",
+                [(time.time(), task_id) for task_id in task_ids],
+            )
+
+    def count_by_state(self, key_prefix: str = "") -> Dict[str, int]:
+        with sqlite_transaction(self.file_path) as connection:
+            rows = connection.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE key LIKE ? GROUP BY state",
+                (key_prefix + "%",),
+            ).fetchall()
+        return dict(rows)
+
+    def count_unmerged(self, key_prefix: str = "") -> int:
+        with sqlite_transaction(self.file_path) as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM tasks "
+                "WHERE key LIKE ? AND state = ? AND merged_at IS NULL",
+                (key_prefix + "%", DONE),
+            ).fetchone()[0]
+
+    def log_statistics(self, key_prefix: str = ""):
+        counts = self.count_by_state(key_prefix)
+        logger.info(
+            "Task queue - "
+            + " - ".join(
+                f"{state}: {counts.get(state, 0)}"
+                for state in [PENDING, LEASED, DONE, FAILED]
+            )
+        )
@@ -0,0 +1,121 @@
+import time
+import sqlite3
+import hashlib
+from typing import Optional
+import logging
+
+import pandas as pd
+
+from local_storage import get_local_storage_path
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationCache:
+    """A persistent cache of translated job post descriptions.
+
+    Translations are keyed by a hash of the original text and the language pair
+    and stored together with the ID of the job post they belong to. When the
+    total size of the stored translations exceeds max_size_bytes, the least
+    recently used translations are evicted."""
+
+    def __init__(
+        self,
+        file_name: str = "translation_cache.sqlite",
+        max_size_bytes: int = 200 * 1024 * 1024,
+    ):
+        self.max_size_bytes = max_size_bytes
+        self.num_hits = 0
+        self.num_misses = 0
+
+        # several rating workers may share the cache file
+        self.connection = sqlite3.connect(get_local_storage_path(file_name), timeout=60)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                source_language TEXT,
+                target_language TEXT,
+                job_id INTEGER,
+                translated_text TEXT,
+                size_bytes INTEGER,
+                last_used REAL
+            )"""
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(text: str, source_language: str, target_language: str) -> str:
+        text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return f"{source_language}:{target_language}:{text_hash}"
+
+    def get(
+        self, text: str, source_language: str, target_language: str
+    ) -> Optional[str]:
+        key = self.make_key(text, source_language, target_language)
+        row = self.connection.execute(
+            "SELECT translated_text FROM translations WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.num_misses += 1
+            return None
+
+        self.num_hits += 1
+        self.connection.execute(
+            "UPDATE translations SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self.connection.commit()
+        return row[0]
+
+    def put(
+        self,
+        text: str,
+        source_language: str,
+        target_language: str,
+        translated_text: str,
+        job_id: Optional[int] = None,
+    ):
+        key = self.make_key(text, source_language, target_language)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                source_language,
+                target_language,
+                None if pd.isna(job_id) else int(job_id),
+                translated_text,
+                len(translated_text.encode("utf-8")),
+                time.time(),
+            ),
+        )
+        self.connection.commit()
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used translations until the cache fits
+        within its size limit."""
+        total_size = self.connection.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM translations"
+        ).fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+
+        num_evicted = 0
+        rows = self.connection.execute(
+            "SELECT key, size_bytes FROM translations ORDER BY last_used ASC"
+        ).fetchall()
+        for key, size_bytes in rows:
+            if total_size <= self.max_size_bytes:
+                break
+            self.connection.execute("DELETE FROM translations WHERE key = ?", (key,))
+            total_size -= size_bytes
+            num_evicted += 1
+        self.connection.commit()
+        logger.info(f"Translation cache evicted {num_evicted} translations")
+
+    def log_statistics(self):
+        logger.info(
+            f"Translation cache - hits: {self.num_hits} - misses: {self.num_misses}"
+        )
+
+    def close(self):
+        self.connection.close()